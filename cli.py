@@ -0,0 +1,228 @@
+"""Command line interface, to scrape big lists of components (e.g. in scheduled jobs)."""
+
+# Usage:
+#   python cli.py parts.csv -o results.jsonl --workers 4 --hints molex.com
+#   python cli.py parts.jsonl --job weekly-parts      # resumes the job, if interrupted
+#   cat codes.txt | python cli.py - > results.jsonl
+#
+# Input formats (detected from the file extension, or set with --input-format):
+# - csv: header with "manuCode" column, and optional "hints" column (separated by spaces or ";")
+# - jsonl: every line is a manuCode string, or an object {"manuCode": "...", "hints": ["..."]}
+# - text: every line is a manuCode (default for stdin)
+# Per-row hints are added to the common hints (--hints).
+#
+# Results are written as JSON lines as soon as every component is scraped (completion order),
+# with the "index" of the input row. Input is read while scraping, so memory usage is bounded.
+# Logs and progress are written to stderr.
+#
+# Exit codes:
+# 0: all components scraped successfully
+# 1: some components failed (not found, or errors)
+# 2: invalid arguments, input or configuration
+# 3: scraping stopped by an unexpected error
+# 130: interrupted by the user (resume it with --job)
+
+import re
+import csv
+import sys
+import json
+import time
+import argparse
+import logging as log
+import typing as t
+
+from src.config import ReadConfig
+from src.scraper import IterScrapeResults
+from src.browser import BROWSER_WORKERS
+from src.type_hints import ComponentInput
+
+
+# exit codes
+EXIT_SUCCESS = 0
+EXIT_FAILED_COMPONENTS = 1
+EXIT_INVALID = 2
+EXIT_ERROR = 3
+EXIT_INTERRUPTED = 130
+
+# interval between progress reports, in seconds
+PROGRESS_INTERVAL = 30
+
+
+class InputError(Exception):
+    """Raised when the input file is not valid."""
+    pass
+
+
+
+# INPUT
+# =====
+
+
+def ParseHints(value: t.Any) -> list[str]:
+    """Parses the hints of a row: list, or string separated by spaces or ";"."""
+    if isinstance(value, list):
+        return [str(hint) for hint in value]
+    return [hint for hint in re.split(r"[;\s]+", str(value or "")) if hint]
+
+
+def ReadComponents(lines: t.Iterable[str], inputFormat: str) -> t.Iterator[ComponentInput]:
+    """Reads components from the input lines, one at a time.
+    Raises InputError for invalid rows, with their line number.
+    """
+
+    # csv: manuCode and hints columns
+    if inputFormat == "csv":
+        reader = csv.DictReader(lines)
+        if "manuCode" not in (reader.fieldnames or []):
+            raise InputError("CSV input must have a header with 'manuCode' column")
+        for row in reader:
+            if not (row["manuCode"] or "").strip():
+                raise InputError(f"Missing manuCode at line {reader.line_num}")
+            hints = ParseHints(row.get("hints"))
+            yield (row["manuCode"].strip(), hints) if hints else row["manuCode"].strip()
+        return
+
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+
+        # text: a manuCode for each line
+        if inputFormat == "text":
+            yield line
+            continue
+
+        # jsonl: manuCode string, or object with manuCode and hints
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise InputError(f"Invalid JSON at line {number}: {e}")
+        if isinstance(row, str):
+            yield row
+        elif isinstance(row, dict) and isinstance(row.get("manuCode"), str):
+            hints = ParseHints(row.get("hints"))
+            yield (row["manuCode"], hints) if hints else row["manuCode"]
+        else:
+            raise InputError(f"Invalid row at line {number}: expected manuCode string, or object with manuCode")
+
+
+def GetInputFormat(path: str, inputFormat: str) -> str:
+    """Gets the input format, detecting it from the file extension if not specified."""
+    if inputFormat != "auto":
+        return inputFormat
+    if path.lower().endswith(".csv"):
+        return "csv"
+    if path.lower().endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return "text"
+
+
+
+# SCRAPING
+# ========
+
+
+def ConfigureLogging(quiet: bool) -> None:
+    """Logs to stderr (results may be written to stdout): only warnings and errors, if quiet.
+    NOTE: loggers of the modules set their own level, so quiet mode filters the handlers.
+    """
+    log.basicConfig(format="%(name)s: %(message)s", stream=sys.stderr)
+    for handler in log.getLogger().handlers:
+        handler.setLevel(log.WARNING if quiet else log.NOTSET)
+
+
+def Main(argv: t.Optional[list[str]] = None) -> int:
+    """Scrapes components from the input, writing results as JSON lines. Returns the exit code."""
+
+    parser = argparse.ArgumentParser(description="Scrapes data of electric components, from a list of parts.")
+    parser.add_argument("input", help="input file (csv, jsonl or text), or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output JSONL file (default = stdout)")
+    parser.add_argument("--input-format", choices=["auto", "csv", "jsonl", "text"], default="auto")
+    parser.add_argument("--hints", nargs="*", default=[], help="hints for all components")
+    parser.add_argument("--files", nargs="*", help="file tags to scrape (default = all configured files)")
+    parser.add_argument("--base-path", default="", help="base path to save files")
+    parser.add_argument("--format", choices=["html", "md", "txt"], default="txt", help="format of fields")
+    parser.add_argument("--workers", type=int, default=BROWSER_WORKERS, help="browsers scraping in parallel")
+    parser.add_argument("--race", type=int, default=1, help="candidate websites scraped at the same time")
+    parser.add_argument("--cache", choices=["use", "refresh", "bypass"], default="use")
+    parser.add_argument("--timings", action="store_true", help="include timings of every phase in results")
+    parser.add_argument("--job", default="", help="id of a checkpointed job, resumed if interrupted")
+    parser.add_argument("--quiet", action="store_true", help="log only warnings and errors")
+    args = parser.parse_args(argv)
+
+    ConfigureLogging(args.quiet)
+
+    # checks configuration before starting
+    try:
+        ReadConfig()
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return EXIT_INVALID
+
+    # opens input and output
+    # NOTE: newline="" is required by the csv module
+    inputFormat = GetInputFormat(args.input, args.input_format)
+    try:
+        inputFile = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8-sig", newline="")
+        outputFile = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    except OSError as e:
+        print(f"Unable to open file: {e}", file=sys.stderr)
+        return EXIT_INVALID
+
+    succeeded, failed = 0, 0
+    start = lastReport = time.monotonic()
+
+    def Report(final: bool = False) -> None:
+        """Writes a progress summary to stderr."""
+        elapsed = time.monotonic() - start
+        rate = (succeeded + failed) / elapsed * 60 if elapsed > 0 else 0
+        print(f"{'Completed' if final else 'Progress'}: {succeeded + failed} components " +
+            f"({succeeded} succeeded, {failed} failed) in {elapsed:.0f} seconds ({rate:.1f}/min)",
+            file=sys.stderr, flush=True)
+
+    try:
+        results = IterScrapeResults(ReadComponents(inputFile, inputFormat), args.hints, args.files,
+            args.base_path, args.format, closeBrowser=True, workers=args.workers, race=args.race,
+            cache=args.cache, timings=args.timings, jobId=args.job)
+
+        # writes every result as soon as it is ready
+        for index, result in results:
+            outputFile.write(json.dumps({"index": index, **result}, ensure_ascii=False) + "\n")
+            outputFile.flush()
+            if result.get("result", "").startswith("error"):
+                failed += 1
+            else:
+                succeeded += 1
+
+            # reports progress, from time to time
+            if time.monotonic() - lastReport >= PROGRESS_INTERVAL:
+                Report()
+                lastReport = time.monotonic()
+
+    except InputError as e:
+        Report(final=True)
+        print(f"Invalid input: {e}", file=sys.stderr)
+        return EXIT_INVALID
+    except ValueError as e:
+        Report(final=True)
+        print(e, file=sys.stderr)
+        return EXIT_INVALID
+    except KeyboardInterrupt:
+        Report(final=True)
+        print("Interrupted" + (f": run again with --job {args.job} to resume" if args.job else ""), file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        Report(final=True)
+        print(f"Scraping stopped by an unexpected error: {type(e).__name__}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        for file in [inputFile, outputFile]:
+            if file not in [sys.stdin, sys.stdout]:
+                file.close()
+
+    Report(final=True)
+    return EXIT_FAILED_COMPONENTS if failed else EXIT_SUCCESS
+
+
+if __name__ == "__main__":
+    sys.exit(Main())
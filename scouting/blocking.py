@@ -0,0 +1,57 @@
+"""Page-load time with and without resource blocking, using selenium."""
+
+import sys
+import time
+import statistics
+import pathlib as pl
+
+from selenium import webdriver
+
+# adds the parent directory to the path, to use the scraper modules
+sys.path.append(str(pl.Path(__file__).parent.parent))
+from src.config import ReadConfig
+from src.browser import OpenBrowser, NavigateTo, WaitElements, SetResourceBlocking, GetBlockedCount, BLOCK_DEFAULT
+
+
+# test pages (website in config file -> manufacturer codes)
+TEST_PARTS = {
+    "molex.com": ["428160212", "428160612", "428180512"],
+    "te.com": ["1-2141540-1", "282834-2"],
+}
+
+# blocking configurations to compare
+BLOCK_ALL = {**BLOCK_DEFAULT, "types": ["image", "font", "stylesheet", "media"]}
+CONFIGS = {"none": {}, "default": BLOCK_DEFAULT, "all": BLOCK_ALL}
+
+
+def LoadPage(driver: webdriver.Firefox, url: str, wait: str) -> float:
+    """Loads a page until the wait element appears, returning the elapsed time in seconds."""
+    start = time.perf_counter()
+    NavigateTo(driver, url)
+    WaitElements(driver, [wait], "normal")
+    return time.perf_counter() - start
+
+
+# opens browser
+print("Opening browser...")
+driver = OpenBrowser()
+config = ReadConfig()
+
+for domain, parts in TEST_PARTS.items():
+    entry = config[domain]
+    urlConfig = entry["url"] # type: ignore  # required field
+    waitSelector = entry["wait"] # type: ignore  # required field
+    for name, block in CONFIGS.items():
+        SetResourceBlocking(driver, block) # type: ignore
+
+        # loads every page twice: the first load fills the browser cache
+        times = []
+        for part in parts:
+            url = urlConfig.format(manuCode=part)
+            LoadPage(driver, url, waitSelector)
+            times.append(LoadPage(driver, url, waitSelector))
+        
+        print(f"{domain:12} {name:8} median {statistics.median(times):.2f} s, " +
+            f"max {max(times):.2f} s, {GetBlockedCount()} requests blocked")
+
+driver.quit()
@@ -1,11 +1,19 @@
 """MCP server entry point."""
 
 import glob
+import json
+import asyncio
+import threading
+import typing as t
 from pathlib import Path
-from fastmcp import FastMCP
+from fastmcp import FastMCP, Context
 
 from src.config import ReadConfigSafe, WriteConfig
-from src.scraper import ScrapeComponents
+from src.scraper import ScrapeComponents, IterScrapeResults, ReExtractComponents
+from src.browser import BROWSER_WORKERS
+from src.cache import CacheMode
+from src.timings import SummarizeTimings
+from src.type_hints import ScrapedComponentData, ScrapingReport
 
 
 def ReadDocs():
@@ -26,15 +34,72 @@ def ReadNewWebsiteGuide(step: int = 0) -> str:
         return file.read()
 
 
+async def ScrapeComponentsWithProgress(
+    ctx: Context,
+    manuCodes: list[str],
+    hints: list[str] = [],
+    files: t.Optional[list[str]] = None,
+    basePath: str = "",
+    format: t.Literal["html", "md", "txt"] = "txt",
+    closeBrowser: bool = True,
+    workers: int = BROWSER_WORKERS,
+    race: int = 1,
+    cache: CacheMode = "use",
+    timings: bool = False,
+    jobId: str = "",
+) -> list[ScrapedComponentData] | ScrapingReport:
+    """Scrapes data of components, like ScrapeComponents, reporting progress to the client.
+    Every progress notification includes the result of the component just scraped,
+    so that clients can start using partial results.
+    With timings, returns also a summary of timings for each website (see ScrapingReport).
+    """
+
+    # scrapes in a separate thread, to keep the server responsive
+    iterator = IterScrapeResults(manuCodes, hints, files, basePath, format,
+        closeBrowser, workers, race, cache, timings, jobId)
+    results: list[ScrapedComponentData] = [{} for _ in manuCodes]
+    completed = 0
+
+    # NOTE: a running generator cannot be closed, so closing waits for the component being scraped
+    iteratorLock = threading.Lock()
+    def Next() -> t.Optional[tuple[int, ScrapedComponentData]]:
+        with iteratorLock:
+            return next(iterator, None)
+    def Close() -> None:
+        with iteratorLock:
+            iterator.close()
+
+    try:
+        while True:
+            item = await asyncio.to_thread(Next)
+            if item is None:
+                break
+            index, result = item
+            results[index] = result
+
+            # reports progress, with the partial result
+            completed += 1
+            await ctx.report_progress(completed, len(manuCodes), json.dumps(result))
+
+    # stops workers and closes browsers (if configured), also if the client cancels or disconnects
+    finally:
+        await asyncio.to_thread(Close)
+
+    if timings:
+        return {"components": results, "timings": SummarizeTimings(results)}
+    return results
+
+
 mcp = FastMCP(
     name="Electric Components Scraper",
 
     # TODO: remove this once fastmcp.json works properly
-    dependencies=["fastmcp", "selenium", "requests", "html2text", "jsonschema", "ddgs"],
+    dependencies=["fastmcp", "selenium", "requests", "html2text", "jsonschema", "ddgs", "beautifulsoup4", "lxml"],
 )
 
 # MCP tools
-mcp.tool("scrape_components")(ScrapeComponents)
+mcp.tool("scrape_components", description=ScrapeComponents.__doc__)(ScrapeComponentsWithProgress)
+mcp.tool("reextract_components")(ReExtractComponents)
 mcp.tool("read_config")(ReadConfigSafe)
 mcp.tool("write_config")(WriteConfig)
 mcp.tool("read_docs")(ReadDocs)
@@ -0,0 +1,212 @@
+"""Content-addressed store of downloaded files, shared by all components."""
+
+# Many components share the same files (e.g. the datasheet of a product family).
+# With BLOB_STORE enabled, every downloaded file is stored only once, addressed by the
+# sha256 of its content, and its configured path is a link to the stored blob:
+# 1. reflink (copy-on-write clone), on filesystems supporting it (e.g. Btrfs, XFS)
+# 2. hardlink, if the blob store and the path are on the same filesystem
+# 3. copy, otherwise
+# An index maps urls of direct downloads to blobs, so that a url downloaded recently
+# (in this run, or in a previous one) is linked again without downloading it.
+# Removing blobs never affects linked paths (see PruneBlobs).
+#
+# Blob store directory structure:
+# - index.sqlite: index of downloaded urls
+# - objects/<first 2 chars of hash>/<hash>: stored files
+#
+# NOTE: hardlinked paths share data with their blob, so files are always replaced
+# (written to a new file, then renamed), never written in place.
+
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+import logging as log
+import pathlib as pl
+import typing as t
+from contextlib import closing
+
+try:
+    import fcntl
+except ImportError: # not available on Windows
+    fcntl = None # type: ignore
+
+
+logger = log.getLogger(__name__)
+logger.setLevel(log.INFO)
+
+
+# blob store directory in the root of the project
+BLOB_DIR = pl.Path(__file__).parent.parent / "blobs"
+
+# whether to store downloaded files as blobs, linked to their paths
+BLOB_STORE = False
+
+# time-to-live of downloaded urls in the index, in seconds (older urls are downloaded again)
+BLOB_URL_TTL = 7 * 24 * 3600
+
+# ioctl request cloning a file (Linux FICLONE), for reflinks
+FICLONE = 0x40049409
+
+# serializes index access from multiple threads
+blobsLock = threading.Lock()
+
+# whether blobs of expired urls were pruned, in this run (see PruneBlobs)
+pruned = False
+
+
+def OpenIndex() -> sqlite3.Connection:
+    """Opens the index of downloaded urls, creating it if needed."""
+    BLOB_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(BLOB_DIR / "index.sqlite", timeout=30)
+    conn.execute("""CREATE TABLE IF NOT EXISTS urls (
+        url TEXT NOT NULL PRIMARY KEY,
+        hash TEXT NOT NULL,
+        created REAL NOT NULL
+    )""")
+    return conn
+
+
+def GetBlobPath(hash: str) -> pl.Path:
+    """Gets the path of the blob with the specified hash."""
+    return BLOB_DIR / "objects" / hash[:2] / hash
+
+
+def HashFile(path: str | pl.Path) -> str:
+    """Hashes the content of a file (sha256), reading it in chunks."""
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+
+# STORING AND LINKING
+# ===================
+
+
+def StoreBlob(path: str | pl.Path, hash: str = "") -> str:
+    """Moves a file into the blob store, unless an identical blob is already stored
+    (then the file is removed, and the blob is marked as recently used). Returns the hash of the blob.
+    The hash of the file is computed, if not provided.
+    """
+    hash = hash or HashFile(path)
+    blobPath = GetBlobPath(hash)
+    if blobPath.exists():
+        os.remove(path)
+        os.utime(blobPath)
+    else:
+        blobPath.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(path, blobPath) # NOTE: copies the file, if on another filesystem
+    return hash
+
+
+def CloneFile(sourcePath: str | pl.Path, targetPath: str | pl.Path) -> str:
+    """Creates a new file with the content of the source file, sharing data if possible.
+    Returns the method used: "reflink", "hardlink" or "copy".
+    """
+
+    # copy-on-write clone, sharing data until one of the files changes
+    if fcntl is not None:
+        try:
+            with open(sourcePath, "rb") as source, open(targetPath, "wb") as target:
+                fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            return "reflink"
+        except OSError:
+            os.remove(targetPath)
+
+    # hardlink, on the same filesystem
+    try:
+        os.link(sourcePath, targetPath)
+        return "hardlink"
+    except OSError:
+        pass
+
+    shutil.copyfile(sourcePath, targetPath)
+    return "copy"
+
+
+def LinkBlob(hash: str, targetPath: str | pl.Path) -> None:
+    """Links the blob to the target path, replacing the existing file, if any.
+    NOTE: links to a temporary path first, so that the target path is replaced at once.
+    """
+    os.makedirs(os.path.dirname(targetPath) or ".", exist_ok=True)
+    linkPath = f"{targetPath}.link"
+    if os.path.exists(linkPath):
+        os.remove(linkPath)
+    method = CloneFile(GetBlobPath(hash), linkPath)
+    os.replace(linkPath, targetPath)
+    logger.debug(f"Linked blob {hash[:12]} to {targetPath} ({method})")
+
+
+def PlaceFile(path: str | pl.Path, targetPath: str | pl.Path, url: str = "", hash: str = "") -> None:
+    """Moves a downloaded file to its target path, replacing the existing file, if any.
+    With BLOB_STORE, stores the file as a blob (with the hash, if already computed)
+    and links it to the target path, indexing the url of the file
+    (only for direct downloads: other methods may change the data).
+    """
+    if not BLOB_STORE:
+        os.replace(path, targetPath)
+        return
+
+    hash = StoreBlob(path, hash)
+    LinkBlob(hash, targetPath)
+
+    # indexes url, replacing older blob
+    if url:
+        with blobsLock, closing(OpenIndex()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO urls VALUES (?, ?, ?)", (url, hash, time.time()))
+        logger.info(f"Stored blob {hash[:12]} of url: {url}")
+
+
+def LinkUrlBlob(url: str, targetPath: str | pl.Path) -> bool:
+    """Links the blob of a url downloaded recently to the target path, if any (with BLOB_STORE).
+    Returns False if the url must be downloaded.
+    """
+    global pruned
+    if not BLOB_STORE:
+        return False
+
+    # removes blobs of expired urls, once in every run
+    if not pruned:
+        pruned = True
+        PruneBlobs()
+
+    # reads blob of url, if not expired
+    with blobsLock, closing(OpenIndex()) as conn:
+        row = conn.execute("SELECT hash, created FROM urls WHERE url = ?", (url,)).fetchone()
+    if row is None or time.time() - row[1] > BLOB_URL_TTL:
+        return False
+
+    # links blob, unless removed
+    try:
+        LinkBlob(row[0], targetPath)
+    except FileNotFoundError:
+        logger.warning(f"Blob {row[0][:12]} of url missing: {url}")
+        return False
+
+    logger.info(f"Using blob {row[0][:12]} of url: {url}")
+    return True
+
+
+def PruneBlobs(ttl: t.Optional[float] = None) -> int:
+    """Removes expired urls from the index, and blobs not indexed by any url nor stored recently.
+    Linked paths keep their data (reflinks and copies are independent, hardlinks keep the data alive).
+    Returns the number of removed blobs.
+    """
+    ttl = BLOB_URL_TTL if ttl is None else ttl
+    with blobsLock, closing(OpenIndex()) as conn, conn:
+        conn.execute("DELETE FROM urls WHERE created < ?", (time.time() - ttl,))
+        hashes = {row[0] for row in conn.execute("SELECT hash FROM urls")}
+
+        # removes blobs not indexed, unless stored recently (e.g. being linked)
+        # NOTE: blobs of other download methods are not indexed, and are removed when old
+        removed = 0
+        for blobPath in (BLOB_DIR / "objects").glob("*/*"):
+            if blobPath.name not in hashes and time.time() - blobPath.stat().st_mtime > ttl:
+                blobPath.unlink(missing_ok=True)
+                removed += 1
+
+    if removed:
+        logger.info(f"Removed {removed} unused blobs")
+    return removed
@@ -1,14 +1,19 @@
 """Browser operations."""
 
+import time
+import fnmatch
 import tempfile
+import urllib.parse
 import logging
+import threading
+import contextlib
 import typing as t
 
 from selenium import webdriver
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import JavascriptException, WebDriverException
+
+from src.tracing import Traced
+from src.type_hints import BlockConfig, PageLoadStrategy
 
 
 # Configure logging
@@ -19,6 +24,56 @@ logger = logging.getLogger(__name__)
 SHOW_BROWSER = True
 BROWSER_TIMEOUT = 10
 
+# maximum time waiting for the page to load, before waiting for elements (seconds)
+# NOTE: the same as the default page-load timeout of the browser
+PAGE_LOAD_TIMEOUT = 300
+
+# maximum time waiting in the page, before checking cancellation (seconds)
+WAIT_SLICE = 1
+
+# waits for any of the selectors (arguments[0]) to match an element, up to a timeout in ms (arguments[2]),
+# in a page with one of the ready states (arguments[1]), and not replaced by a new navigation (see NavigateTo)
+# resolves with the first matching selector, as soon as the page changes, or null on timeout
+WAIT_SCRIPT = """
+const [selectors, states, timeout, done] = arguments;
+const Match = () => {
+    if (document.scraperStale || !states.includes(document.readyState)) return null;
+    return selectors.find(selector => document.querySelector(selector) !== null) ?? null;
+};
+
+const found = Match();
+if (found !== null) return done(found);
+
+const Check = () => {
+    const found = Match();
+    if (found !== null) Finish(found);
+};
+const observer = new MutationObserver(Check);
+const timer = setTimeout(() => Finish(null), timeout);
+function Finish(result) {
+    observer.disconnect();
+    document.removeEventListener("readystatechange", Check);
+    clearTimeout(timer);
+    done(result);
+}
+observer.observe(document, {childList: true, subtree: true, attributes: true});
+document.addEventListener("readystatechange", Check);
+"""
+
+# errors of browsers without the WebDriver BiDi command, or without BiDi (see SetDownloadDirectory)
+UNSUPPORTED_ERRORS = ["unknown command", "unsupported operation", "unable to find url", "bidi support"]
+
+# document ready states accepted by every page-load strategy
+# NOTE: the browser never waits for pages to load (strategy "none"), strategies are applied while waiting elements
+READY_STATES: dict[PageLoadStrategy, list[str]] = {
+    "normal": ["complete"],
+    "eager": ["interactive", "complete"],
+    "none": ["loading", "interactive", "complete"],
+}
+
+# number of browsers used in parallel by default, when scraping multiple components
+BROWSER_WORKERS = 1
+
 # these MIME types will be downloaded
 DOWNLOAD_FILES = ",".join([
     "application/pdf",
@@ -33,38 +88,168 @@ DOWNLOAD_FILES = ",".join([
     "image/svg+xml"
 ])
 
-# browser driver instance
-browser = None
-downloadPath = ""
+# resources blocked on websites without "block" configuration (see BlockConfig)
+# NOTE: images are allowed anyway when an image file is requested
+BLOCK_DEFAULT: BlockConfig = {
+    "types": ["font", "media"],
+    "urls": [
+        "*://*.google-analytics.com/*",
+        "*://*.googletagmanager.com/*",
+        "*://*.doubleclick.net/*",
+        "*://*.hotjar.com/*",
+        "*://*.facebook.net/*",
+    ],
+}
+
+# file extensions of resource types, used when the browser does not report the type
+RESOURCE_EXTENSIONS: dict[str, list[str]] = {
+    "image": ["png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"],
+    "font": ["woff", "woff2", "ttf", "otf", "eot"],
+    "stylesheet": ["css"],
+    "script": ["js", "mjs"],
+    "media": ["mp4", "webm", "ogg", "mp3", "wav", "m3u8"],
+}
+
+# browser driver instances, one for each slot
+# every thread uses the browser of its own slot, by default the "main" slot
+# parallel scraping leases pool slots, returned idle (with browser open) after use
+MAIN_SLOT = "main"
+browsers: dict[str, webdriver.Firefox] = {}
+downloadPaths: dict[str, str] = {}
+idleSlots: list[str] = []
+blockHandlers: dict[str, tuple[BlockConfig, t.Any]] = {} # slot -> (config, request handler id)
+blockedCounts: dict[str, int] = {} # slot -> requests blocked since last navigation
+slotsCount = 0
+downloadDirectories: t.Optional[bool] = None # whether the browser supports a directory for every download
+browsersLock = threading.Lock()
+slotLocal = threading.local()
+
+
+class ScrapingCancelledError(Exception):
+    """Raised when a scraping attempt is cancelled from another thread."""
+    pass
+
+
+# BROWSER POOL SLOTS
+# ==================
+
+
+def GetBrowserSlot() -> str:
+    """Gets the browser slot assigned to the current thread."""
+    return getattr(slotLocal, "slot", MAIN_SLOT)
+
+
+def SetBrowserSlot(slot: str) -> None:
+    """Assigns a browser slot to the current thread.
+    Every slot has its own browser and download directory.
+    """
+    slotLocal.slot = slot
+
+
+@contextlib.contextmanager
+def PooledBrowserSlot() -> t.Iterator[str]:
+    """Assigns a pool slot to the current thread, for the duration of the context.
+    Reuses an idle slot, with its browser already open, if any.
+    At exit, the slot becomes idle again, and the previous slot is restored.
+    """
+    global slotsCount
+
+    # leases an idle slot, or creates a new one
+    with browsersLock:
+        if idleSlots:
+            slot = idleSlots.pop()
+        else:
+            slot = f"pool-{slotsCount}"
+            slotsCount += 1
+
+    previousSlot = GetBrowserSlot()
+    SetBrowserSlot(slot)
+    try:
+        yield slot
+
+    # returns slot to the pool
+    finally:
+        SetBrowserSlot(previousSlot)
+        with browsersLock:
+            idleSlots.append(slot)
+
+
+def SetCancelEvent(event: t.Optional[threading.Event]) -> None:
+    """Sets the event that cancels the scraping attempt running in the current thread."""
+    slotLocal.cancelEvent = event
+
+
+def GetCancelEvent() -> t.Optional[threading.Event]:
+    """Gets the event that cancels the scraping attempt running in the current thread, if any.
+    Used to cancel work continued in other threads.
+    """
+    return getattr(slotLocal, "cancelEvent", None)
+
+
+def CheckCancelled() -> None:
+    """Raises ScrapingCancelledError if the attempt in the current thread has been cancelled."""
+    event = GetCancelEvent()
+    if event is not None and event.is_set():
+        raise ScrapingCancelledError("Cancelled by a higher-priority candidate")
 
 
 def GetDownloadPath() -> str:
-    return downloadPath
+    """Gets the download directory of the browser in the current slot."""
+    return downloadPaths.get(GetBrowserSlot(), "")
+
+
+def SetDownloadDirectory(driver: webdriver.Firefox, path: str) -> bool:
+    """Sets the directory of the next downloads of the browser (WebDriver BiDi setDownloadBehavior).
+    Returns False if not supported by the browser (or selenium): files are downloaded
+    to the download directory of the slot (see GetDownloadPath).
+    Other errors (e.g. a closed connection) are raised, without disabling download directories.
+    """
+    global downloadDirectories
+    if downloadDirectories == False:
+        return False
+    try:
+        driver.browser.set_download_behavior(allowed=True, destination_folder=path)
+        downloadDirectories = True
+        return True
+    except (AttributeError, WebDriverException) as e:
+        if isinstance(e, WebDriverException) and not any(error in str(e).lower() for error in UNSUPPORTED_ERRORS):
+            logger.error(f"Error setting download directory: {e}")
+            raise
+        logger.warning(f"Download directory not supported by the browser, using the slot directory: {e}")
+        downloadDirectories = False
+        return False
 
 
 def GetBrowser() -> webdriver.Firefox:
-    """Gets a browser, opening it if needed."""
-    global browser
+    """Gets the browser of the current slot, opening it if needed."""
+    slot = GetBrowserSlot()
+    browser = browsers.get(slot)
     if browser is None or not browser.service.process:
-        logger.info("Opening new browser...")
+        logger.info(f"Opening new browser [{slot}]...")
         browser = OpenBrowser()
-        logger.info("New browser opened")
+        with browsersLock:
+            browsers[slot] = browser
+            blockHandlers.pop(slot, None)
+        logger.info(f"New browser opened [{slot}]")
     else:
-        logger.info("Reusing existing browser")
+        logger.info(f"Reusing existing browser [{slot}]")
     return browser
 
 
 def OpenBrowser() -> webdriver.Firefox:
-    """Opens a browser configured for downloading files to a temporary directory."""
+    """Opens a browser configured for downloading files to a temporary directory.
+    The download directory is assigned to the slot of the current thread.
+    """
 
     # headless mode, if configured
     options = webdriver.FirefoxOptions()
     if not SHOW_BROWSER:
         options.add_argument('--headless')
     
-    # temporary directory for downloaded files
-    global downloadPath
+    # temporary directory for downloaded files, one for each slot
     downloadPath = tempfile.mkdtemp()
+    with browsersLock:
+        downloadPaths[GetBrowserSlot()] = downloadPath
     logger.info(f"Download path: {downloadPath}")
 
     # configures browser to download files
@@ -74,37 +259,106 @@ def OpenBrowser() -> webdriver.Firefox:
     options.set_preference('browser.helperApps.neverAsk.saveToDisk', DOWNLOAD_FILES)
     options.set_preference('pdfjs.disabled', True)
 
+    # enables BiDi protocol, to block resources (see SetResourceBlocking)
+    options.enable_bidi = True
+
+    # returns from navigation immediately, page-load strategies are applied by WaitElements
+    options.page_load_strategy = "none"
+
     # opens browser
     return webdriver.Firefox(options=options)
 
 
-def WaitElement(driver: webdriver.Firefox, selector: str) -> None:
-    """Waits for an element to be present in the browser.
-    Raises RuntimeError if the element is not found.
+@Traced("url")
+def NavigateTo(driver: webdriver.Firefox, url: str) -> None:
+    """Navigates to the url, without waiting for the page to load (see WaitElements).
+    Marks the current page as stale, so that its elements are ignored until the new page replaces it.
     """
+    driver.execute_script("document.scraperStale = true;")
+    driver.get(url)
 
-    logger.info(f"Waiting for element: {selector}")
-    wait = WebDriverWait(driver, BROWSER_TIMEOUT)
-    try:
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-    except TimeoutException:
+
+@Traced("selectors", "pageLoad")
+def WaitElements(driver: webdriver.Firefox, selectors: list[str],
+    pageLoad: PageLoadStrategy = "none",
+) -> str:
+    """Waits for any of the elements to be present in the browser, returning the selector found.
+    If multiple elements are present, returns the first selector in the list.
+    Waits first for the page to load, as specified by the page-load strategy:
+    full load (normal), DOM ready (eager), or only elements present (none),
+    up to PAGE_LOAD_TIMEOUT, then for the elements, up to BROWSER_TIMEOUT.
+    Waits in the page with a MutationObserver, resolving as soon as an element appears.
+    Raises TimeoutError if the page does not load.
+    Raises RuntimeError if no element is found.
+    Raises ScrapingCancelledError if the attempt is cancelled while waiting.
+    """
+
+    # waits for the ready state of the strategy, so that slow pages do not consume the element timeout
+    states = READY_STATES[pageLoad]
+    if pageLoad != "none" and WaitInPage(driver, [":root"], states, PAGE_LOAD_TIMEOUT) is None:
+        raise TimeoutError(f"Page not loaded after timeout ({PAGE_LOAD_TIMEOUT} seconds)")
+
+    logger.info(f"Waiting for elements: {', '.join(selectors)}")
+    found = WaitInPage(driver, selectors, states, BROWSER_TIMEOUT)
+    if found is None:
         raise RuntimeError(
-            f"Element not found after timeout ({BROWSER_TIMEOUT} seconds): {selector}")
+            f"Element not found after timeout ({BROWSER_TIMEOUT} seconds): {', '.join(selectors)}")
+    return found
+
+
+def WaitInPage(driver: webdriver.Firefox, selectors: list[str], states: list[str], timeout: float) -> t.Optional[str]:
+    """Waits for any of the selectors to match, in a page with one of the ready states (see WAIT_SCRIPT).
+    Returns the first selector found, or None after the timeout (in seconds).
+    Raises ScrapingCancelledError if the attempt is cancelled while waiting.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        # checks cancellation between waits, then waits in the page for a short time
+        CheckCancelled()
+        remaining = min(WAIT_SLICE, deadline - time.monotonic())
+        if remaining <= 0:
+            return None
+        try:
+            found = driver.execute_async_script(WAIT_SCRIPT, selectors, states, int(remaining * 1000))
+        except JavascriptException as e:
+            # waits again in the new document, if the page navigated while waiting
+            if "unloaded" in str(e).lower():
+                continue
+            raise
+        if found is not None:
+            return found
 
 
 def CloseBrowser() -> None:
-    """Closes the browser."""
-    global browser
+    """Closes the browser of the current slot."""
+    slot = GetBrowserSlot()
+    with browsersLock:
+        browser = browsers.pop(slot, None)
+        blockHandlers.pop(slot, None)
+        blockedCounts.pop(slot, None)
     if browser is not None:
         browser.quit()
-        browser = None
-        logger.info("Browser closed")
+        logger.info(f"Browser closed [{slot}]")
+
+
+def CloseIdleBrowsers() -> None:
+    """Closes the browsers of pool slots not used by any thread."""
+    with browsersLock:
+        openBrowsers = [(slot, browsers.pop(slot)) for slot in idleSlots if slot in browsers]
+
+        # request handlers belong to the closed browsers, new browsers of the slots register them again
+        for slot, _ in openBrowsers:
+            blockHandlers.pop(slot, None)
+            blockedCounts.pop(slot, None)
+    for slot, browser in openBrowsers:
+        browser.quit()
+        logger.info(f"Browser closed [{slot}]")
 
 
 def ResetBrowser() -> None:
-    """Resets the browser, closing it if needed."""
+    """Resets the browser of the current slot, closing it if needed."""
     CloseBrowser()
-    OpenBrowser()
+    GetBrowser()
 
 
 def RetryOnException(on: t.Type[Exception], init: t.Callable[[], None]) -> t.Callable:
@@ -125,3 +379,75 @@ def RetryOnException(on: t.Type[Exception], init: t.Callable[[], None]) -> t.Cal
 
         return decorated
     return decorator
+
+
+
+# RESOURCE BLOCKING
+# =================
+
+
+def GetResourceType(url: str, destination: t.Optional[str]) -> str:
+    """Gets the type of a requested resource (see BlockConfig), from the request destination if known,
+    or from the url extension. Returns an empty string for documents and unknown resources.
+    """
+
+    # uses request destination, if reported by the browser
+    destinations = {"image": "image", "font": "font", "style": "stylesheet",
+        "script": "script", "audio": "media", "video": "media", "track": "media"}
+    if destination:
+        return destinations.get(destination, "")
+
+    # otherwise, detects type from url extension
+    path = urllib.parse.urlparse(url).path
+    extension = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+    for type, extensions in RESOURCE_EXTENSIONS.items():
+        if extension in extensions:
+            return type
+    return ""
+
+
+def IsResourceBlocked(url: str, destination: t.Optional[str], block: BlockConfig) -> bool:
+    """Checks if a requested resource is blocked by the configuration."""
+    if GetResourceType(url, destination) in block.get("types", []):
+        return True
+    return any(fnmatch.fnmatchcase(url, pattern) for pattern in block.get("urls", []))
+
+
+def SetResourceBlocking(driver: webdriver.Firefox, block: BlockConfig) -> None:
+    """Blocks resources requested by the browser of the current slot, for the next navigations.
+    Intercepts requests only if something is blocked, replacing the previous configuration.
+    """
+
+    # resets count of blocked requests
+    slot = GetBrowserSlot()
+    blockedCounts[slot] = 0
+
+    # keeps current handler, if configuration is unchanged
+    current = blockHandlers.get(slot)
+    if current is not None and current[0] == block:
+        return
+
+    # removes previous handler, if any
+    if current is not None:
+        driver.network.remove_request_handler("before_request", current[1])
+        del blockHandlers[slot]
+    if not block.get("types") and not block.get("urls"):
+        return
+
+    # intercepts requests, failing blocked ones
+    def HandleRequest(request: t.Any) -> None:
+        if IsResourceBlocked(request.url, getattr(request, "resource_type", None), block):
+            blockedCounts[slot] = blockedCounts.get(slot, 0) + 1
+            # NOTE: older selenium versions name this method fail_request
+            fail = getattr(request, "fail", None) or request.fail_request
+            fail()
+        else:
+            request.continue_request()
+
+    blockHandlers[slot] = (block, driver.network.add_request_handler("before_request", HandleRequest))
+    logger.info(f"Blocking resources [{slot}]: {block}")
+
+
+def GetBlockedCount() -> int:
+    """Gets the number of requests blocked in the current slot, since the last SetResourceBlocking."""
+    return blockedCounts.get(GetBrowserSlot(), 0)
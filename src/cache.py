@@ -0,0 +1,282 @@
+"""Persistent cache of scraped components, stored in a SQLite database."""
+
+# Cached results are keyed by manuCode, website domain, format and a hash of the
+# website configuration (fields and files), so that changing the configuration
+# invalidates old results. Every website can configure its own time-to-live.
+# When the cache is full, least recently used results are evicted.
+#
+# Components not found on a website are cached too (negative cache), keyed by
+# manuCode and domain, with a shorter time-to-live, to skip known misses.
+#
+# Downloaded files are recorded by url, with their validators (ETag, Last-Modified),
+# size and hash, so that downloading them again sends a conditional request,
+# and the existing file is kept if not modified (see DownloadDirect).
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging as log
+import pathlib as pl
+import typing as t
+from contextlib import closing
+
+from src.type_hints import ScrapedComponentData, WebsiteEntry
+
+
+logger = log.getLogger(__name__)
+logger.setLevel(log.INFO)
+
+
+# cache file in the root of the project
+CACHE_FILE = pl.Path(__file__).parent.parent / "electric-scraper-cache.sqlite"
+
+CACHE_TTL = 7 * 24 * 3600   # default time-to-live of cached results, in seconds
+CACHE_MAX_ENTRIES = 10000   # max number of cached results, least recently used are evicted
+NOT_FOUND_TTL = 24 * 3600   # time-to-live of cached not-found components, in seconds
+TIMEOUT_MISS_TTL = 3600     # time-to-live of not-found components detected by a timeout, in seconds
+CACHE_MAX_FILES = 100000    # max number of recorded files, least recently validated are evicted
+
+# cache modes:
+# - use: reads cached results, and writes new ones
+# - refresh: does not read cached results, but writes new ones
+# - bypass: does not read nor write cached results
+CacheMode = t.Literal["use", "refresh", "bypass"]
+
+# serializes database access from multiple threads
+cacheLock = threading.Lock()
+
+
+class CachedFileInfo(t.NamedTuple):
+    """Downloaded file, to revalidate it with a conditional request."""
+    url: str
+    etag: str
+    lastModified: str
+    size: int
+    hash: str # sha256 of the content
+    path: str # path of the latest download
+    validated: float # time of the latest download or revalidation
+
+
+# DATABASE
+# ========
+
+
+def OpenCache() -> sqlite3.Connection:
+    """Opens the cache database, creating tables if needed."""
+    conn = sqlite3.connect(CACHE_FILE, timeout=30)
+    conn.execute("""CREATE TABLE IF NOT EXISTS components (
+        manuCode TEXT NOT NULL,
+        domain TEXT NOT NULL,
+        format TEXT NOT NULL,
+        entryHash TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created REAL NOT NULL,
+        accessed REAL NOT NULL,
+        PRIMARY KEY (manuCode, domain, format, entryHash)
+    )""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS misses (
+        manuCode TEXT NOT NULL,
+        domain TEXT NOT NULL,
+        error TEXT NOT NULL,
+        created REAL NOT NULL,
+        timeout INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (manuCode, domain)
+    )""")
+
+    # adds timeout column to misses cached by older versions
+    if "timeout" not in [column[1] for column in conn.execute("PRAGMA table_info(misses)")]:
+        conn.execute("ALTER TABLE misses ADD COLUMN timeout INTEGER NOT NULL DEFAULT 0")
+    conn.execute("""CREATE TABLE IF NOT EXISTS files (
+        url TEXT NOT NULL PRIMARY KEY,
+        etag TEXT NOT NULL,
+        lastModified TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        hash TEXT NOT NULL,
+        path TEXT NOT NULL,
+        validated REAL NOT NULL
+    )""")
+    return conn
+
+
+def GetEntryHash(entry: WebsiteEntry, files: t.Optional[list[str]], basePath: str) -> str:
+    """Hashes the website configuration affecting scraped data.
+    Includes url, fields and files (filtered by files parameter), and base path of files.
+    """
+    filesConfig = entry.get("files", {})
+    if files is not None:
+        filesConfig = {key: value for key, value in filesConfig.items() if key in files}
+
+    # NOTE: keys are sorted, to get the same hash for the same configuration
+    data = json.dumps({
+        "url": entry.get("url", ""),
+        "fields": entry.get("fields", {}),
+        "files": filesConfig,
+        "basePath": basePath,
+    }, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def GetCacheTTL(entry: WebsiteEntry) -> float:
+    """Gets the time-to-live of cached results for a website, in seconds."""
+    return entry.get("cacheTTL", CACHE_TTL)
+
+
+def HasFailedFiles(data: ScrapedComponentData) -> bool:
+    """Checks if any file of a result failed to download, so that the result is scraped again."""
+    return any(scrapedFile.get("result", "").startswith("error")
+        for scrapedFile in data.get("files", {}).values())
+
+
+def GetMissTTL(entry: WebsiteEntry, timeout: bool) -> float:
+    """Gets the time-to-live of cached not-found components for a website, in seconds.
+    Misses detected by a timeout expire sooner, since the page may have been only slow.
+    """
+    return min(TIMEOUT_MISS_TTL if timeout else NOT_FOUND_TTL, GetCacheTTL(entry))
+
+
+
+# CACHE OPERATIONS
+# ================
+
+
+def ReadCachedComponent(manuCode: str, domain: str, format: str, entry: WebsiteEntry,
+    files: t.Optional[list[str]], basePath: str,
+) -> t.Optional[ScrapedComponentData]:
+    """Reads a cached result, if present and not expired. Returns None otherwise.
+    Results with failed downloads, or downloaded files missing on disk, are considered not present.
+    """
+
+    # caching disabled for this website
+    ttl = GetCacheTTL(entry)
+    if ttl <= 0:
+        return None
+
+    key = (manuCode, domain, format, GetEntryHash(entry, files, basePath))
+    with cacheLock, closing(OpenCache()) as conn, conn:
+
+        # reads cached result
+        row = conn.execute("""SELECT data, created FROM components
+            WHERE manuCode = ? AND domain = ? AND format = ? AND entryHash = ?""", key).fetchone()
+        if row is None:
+            return None
+
+        # removes expired result
+        data, created = json.loads(row[0]), row[1]
+        if time.time() - created > ttl:
+            logger.info(f"Cached result for '{manuCode}' on '{domain}' expired")
+            conn.execute("""DELETE FROM components
+                WHERE manuCode = ? AND domain = ? AND format = ? AND entryHash = ?""", key)
+            return None
+
+        # checks that files were downloaded, and still exist
+        if HasFailedFiles(data):
+            logger.info(f"Cached result for '{manuCode}' on '{domain}' has failed files")
+            return None
+        for scrapedFile in data.get("files", {}).values():
+            path = scrapedFile.get("path", "")
+            if path and not pl.Path(path).exists():
+                logger.info(f"Cached file for '{manuCode}' on '{domain}' missing: {path}")
+                return None
+
+        # marks result as recently used
+        conn.execute("""UPDATE components SET accessed = ?
+            WHERE manuCode = ? AND domain = ? AND format = ? AND entryHash = ?""", (time.time(), *key))
+
+    logger.info(f"Using cached result for '{manuCode}' on '{domain}'")
+    return data
+
+
+def WriteCachedComponent(manuCode: str, domain: str, format: str, entry: WebsiteEntry,
+    files: t.Optional[list[str]], basePath: str, data: ScrapedComponentData,
+) -> None:
+    """Writes a result to the cache, evicting least recently used results if full.
+    Results with failed downloads are not written, so that the files are retried.
+    """
+
+    # caching disabled for this website
+    if GetCacheTTL(entry) <= 0:
+        return
+
+    key = (manuCode, domain, format, GetEntryHash(entry, files, basePath))
+    now = time.time()
+    with cacheLock, closing(OpenCache()) as conn, conn:
+
+        # component found: removes cached miss, if any
+        conn.execute("DELETE FROM misses WHERE manuCode = ? AND domain = ?", (manuCode, domain))
+        if HasFailedFiles(data):
+            logger.info(f"Result for '{manuCode}' on '{domain}' not cached, some files failed")
+            return
+
+        conn.execute("INSERT OR REPLACE INTO components VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (*key, json.dumps(data), now, now))
+
+        # evicts least recently used results
+        conn.execute("""DELETE FROM components WHERE rowid IN (
+            SELECT rowid FROM components ORDER BY accessed DESC LIMIT -1 OFFSET ?)""",
+            (CACHE_MAX_ENTRIES,))
+
+
+def ReadCachedMiss(manuCode: str, domain: str, entry: WebsiteEntry) -> t.Optional[str]:
+    """Reads a cached not-found component, if present and not expired.
+    Returns the error message of the miss, or None if not cached.
+    """
+
+    # caching disabled for this website
+    if GetCacheTTL(entry) <= 0:
+        return None
+
+    with cacheLock, closing(OpenCache()) as conn, conn:
+        row = conn.execute("SELECT error, created, timeout FROM misses WHERE manuCode = ? AND domain = ?",
+            (manuCode, domain)).fetchone()
+        if row is None:
+            return None
+
+        # removes expired miss
+        if time.time() - row[1] > GetMissTTL(entry, bool(row[2])):
+            conn.execute("DELETE FROM misses WHERE manuCode = ? AND domain = ?", (manuCode, domain))
+            return None
+
+    logger.info(f"Using cached miss for '{manuCode}' on '{domain}'")
+    return row[0]
+
+
+def WriteCachedMiss(manuCode: str, domain: str, entry: WebsiteEntry, error: str,
+    timeout: bool = False,
+) -> None:
+    """Writes a not-found component to the cache, with the error message.
+    Misses detected by a timeout are cached for a shorter time (see GetMissTTL).
+    """
+
+    # caching disabled for this website
+    if GetMissTTL(entry, timeout) <= 0:
+        return
+
+    with cacheLock, closing(OpenCache()) as conn, conn:
+        conn.execute("INSERT OR REPLACE INTO misses VALUES (?, ?, ?, ?, ?)",
+            (manuCode, domain, error, time.time(), int(timeout)))
+
+
+def ReadCachedFile(url: str) -> t.Optional[CachedFileInfo]:
+    """Reads the recorded download of a url, if any."""
+    with cacheLock, closing(OpenCache()) as conn:
+        row = conn.execute("SELECT * FROM files WHERE url = ?", (url,)).fetchone()
+    return None if row is None else CachedFileInfo(*row)
+
+
+def WriteCachedFile(info: CachedFileInfo) -> None:
+    """Records the download of a url, evicting least recently validated files if full."""
+    with cacheLock, closing(OpenCache()) as conn, conn:
+        conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", info)
+        conn.execute("""DELETE FROM files WHERE rowid IN (
+            SELECT rowid FROM files ORDER BY validated DESC LIMIT -1 OFFSET ?)""",
+            (CACHE_MAX_FILES,))
+
+
+def ClearCache() -> None:
+    """Removes all cached results, misses and recorded files."""
+    with cacheLock, closing(OpenCache()) as conn, conn:
+        conn.execute("DELETE FROM components")
+        conn.execute("DELETE FROM misses")
+        conn.execute("DELETE FROM files")
@@ -0,0 +1,104 @@
+"""Conversion of scraped HTML to Markdown, in a pool of processes."""
+
+# Markdown conversion (html2text) is pure python and CPU-bound: converting in the scraping threads
+# leaves browsers idle, and threads cannot convert in parallel (GIL). So conversions run
+# in a process pool, while the scraping thread goes on (e.g. downloading files),
+# and results are resolved only when needed. Converted output is cached by HTML hash,
+# since the same content (e.g. a product family description) appears in many pages.
+
+import os
+import hashlib
+import threading
+import multiprocessing
+import logging as log
+import typing as t
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, Future
+
+import html2text as h2t
+
+
+logger = log.getLogger(__name__)
+logger.setLevel(log.INFO)
+
+
+# number of processes converting in parallel
+CONVERSION_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
+# max number of converted outputs kept in memory
+CONVERSION_CACHE_SIZE = 1000
+
+# smaller HTML is converted in the calling thread, since sending it to a process takes longer
+CONVERSION_MIN_SIZE = 2000
+
+# process pool, started on first conversion
+executor: t.Optional[ProcessPoolExecutor] = None
+
+# conversions by HTML hash (pending or completed), least recently used first
+conversions: OrderedDict[str, Future[str]] = OrderedDict()
+conversionsLock = threading.Lock()
+
+
+def CompletedFuture(value: t.Any) -> Future:
+    """Creates a future already completed with the value."""
+    future: Future = Future()
+    future.set_result(value)
+    return future
+
+
+def HtmlToMarkdown(html: str) -> str:
+    """Converts HTML to Markdown. Runs in the process pool."""
+    return h2t.html2text(html)
+
+
+def ConvertToMarkdown(html: str) -> Future[str]:
+    """Starts the conversion of HTML to Markdown, returning a future with the result.
+    Returns a completed future for cached and small HTML.
+    """
+    global executor
+
+    # returns cached conversion, if any (also pending, to avoid converting twice)
+    hash = hashlib.sha256(html.encode("utf-8")).hexdigest()
+    with conversionsLock:
+        future = conversions.get(hash)
+        if future is not None:
+            conversions.move_to_end(hash)
+            return future
+
+        # converts small HTML immediately, or inside child processes (e.g. re-extraction workers)
+        if len(html) < CONVERSION_MIN_SIZE or multiprocessing.parent_process() is not None:
+            future = CompletedFuture(HtmlToMarkdown(html))
+
+        # otherwise, converts in the process pool
+        # NOTE: spawns processes, since forking a process with browser threads is not safe
+        else:
+            if executor is None:
+                logger.info(f"Starting {CONVERSION_WORKERS} conversion processes...")
+                executor = ProcessPoolExecutor(max_workers=CONVERSION_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"))
+            future = executor.submit(HtmlToMarkdown, html)
+
+        # caches conversion, removing least recently used ones
+        conversions[hash] = future
+        while len(conversions) > CONVERSION_CACHE_SIZE:
+            conversions.popitem(last=False)
+
+    # removes failed conversions from cache, to try again next time
+    def RemoveFailed(future: Future[str]) -> None:
+        if future.exception() is not None:
+            with conversionsLock:
+                if conversions.get(hash) is future:
+                    del conversions[hash]
+    future.add_done_callback(RemoveFailed)
+
+    return future
+
+
+def CloseConversion() -> None:
+    """Stops the conversion processes and clears the cache."""
+    global executor
+    with conversionsLock:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+            executor = None
+        conversions.clear()
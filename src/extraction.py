@@ -0,0 +1,194 @@
+"""Extraction of page elements data, for fields and files scraping."""
+
+# Extraction modes
+# 1. script: a single injected script evaluates all the selectors at once,
+#    returning the data of all elements in a single round trip to the browser.
+# 2. driver: one find_element call per selector, plus one call per element property.
+#    Slower, kept as a fallback for debugging.
+# 3. parser: selectors evaluated on HTML source, without browser (see ParseElements).
+
+import re
+import logging as log
+import urllib.parse
+import typing as t
+
+import bs4
+from bs4.element import PageElement, NavigableString
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException
+
+from src.type_hints import ElementData
+
+
+logger = log.getLogger(__name__)
+logger.setLevel(log.INFO)
+
+
+# whether to extract all elements with a single injected script
+SCRIPT_EXTRACTION = True
+
+# script evaluating every selector, returning {selector: element data or null}
+# NOTE: selectors are passed as arguments, to avoid injection of malicious code
+EXTRACT_SCRIPT = """
+// gets absolute url from href or src, like selenium get_attribute
+const getUrl = (element, name) => {
+    if (!element.hasAttribute(name)) return null;
+    const value = element[name];
+    return typeof value === "string" ? value : element.getAttribute(name);
+};
+
+// gets rendered text, like selenium text: empty for hidden elements (innerText returns their source text)
+const getText = element => {
+    const visible = element.checkVisibility({
+        opacityProperty: true, visibilityProperty: true,
+        checkOpacity: true, checkVisibilityCSS: true, // older names of the same options
+    });
+    return visible ? element.innerText.trim() : "";
+};
+
+const elements = {};
+for (const selector of arguments[0]) {
+    const element = document.querySelector(selector);
+    if (element === null) {
+        elements[selector] = null;
+        continue;
+    }
+    elements[selector] = {
+        tagName: element.tagName.toLowerCase(),
+        html: element.innerHTML,
+        text: getText(element),
+        href: getUrl(element, "href"),
+        src: getUrl(element, "src"),
+    };
+}
+return elements;
+"""
+
+
+def ExtractElements(driver: webdriver.Firefox, selectors: list[str],
+) -> dict[str, t.Optional[ElementData]]:
+    """Extracts data of the first element matching each css selector, in the current page.
+    Returns: dictionary with key=<css selector>, value=<element data>
+    If some element is not found, the value is set to None.
+    """
+
+    # removes duplicate selectors, keeping order
+    selectors = list(dict.fromkeys(selectors))
+    if len(selectors) == 0:
+        return {}
+
+    # evaluates all selectors in a single browser call
+    if SCRIPT_EXTRACTION:
+        logger.debug(f"Extracting {len(selectors)} elements with script...")
+        return driver.execute_script(EXTRACT_SCRIPT, selectors)
+
+    # evaluates selectors one by one
+    logger.debug(f"Extracting {len(selectors)} elements with driver...")
+    return {selector: ExtractElementWithDriver(driver, selector) for selector in selectors}
+
+
+def ExtractElementWithDriver(driver: webdriver.Firefox, selector: str) -> t.Optional[ElementData]:
+    """Extracts data of the first element matching the css selector, using driver calls.
+    Returns None if the element is not found.
+    """
+
+    # tries to find element
+    try:
+        element = driver.find_element(By.CSS_SELECTOR, selector)
+    except NoSuchElementException:
+        return None
+
+    return {
+        "tagName": element.tag_name,
+        "html": element.get_attribute("innerHTML") or "",
+        "text": element.text,
+        "href": element.get_attribute("href"),
+        "src": element.get_attribute("src"),
+    }
+
+
+
+# EXTRACTION FROM HTML SOURCE
+# ===========================
+
+
+# elements whose content is not rendered as text
+HIDDEN_TAGS = {"script", "style", "template", "noscript", "head", "title"}
+
+# elements rendered on their own lines
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "details", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section", "summary",
+    "table", "tbody", "thead", "tfoot", "tr", "ul",
+}
+
+
+def ParseHtml(html: str | bytes) -> bs4.BeautifulSoup:
+    """Parses the HTML source of a page. Detects encoding if bytes are provided."""
+    return bs4.BeautifulSoup(html, "lxml")
+
+
+def ParseElements(document: bs4.BeautifulSoup, selectors: list[str], pageUrl: str,
+) -> dict[str, t.Optional[ElementData]]:
+    """Extracts data of the first element matching each css selector, in the parsed page.
+    Urls in href and src are resolved against the page url, like in the browser.
+    Returns: dictionary with key=<css selector>, value=<element data>
+    If some element is not found, the value is set to None.
+    """
+
+    # uses base url declared in page, if any
+    base = document.find("base", href=True)
+    if isinstance(base, bs4.Tag):
+        pageUrl = urllib.parse.urljoin(pageUrl, str(base["href"]))
+
+    def GetUrl(element: bs4.Tag, name: str) -> t.Optional[str]:
+        """Gets absolute url from href or src attribute, if present."""
+        value = element.get(name)
+        if value is None:
+            return None
+        return urllib.parse.urljoin(pageUrl, str(value).strip())
+
+    elements: dict[str, t.Optional[ElementData]] = {}
+    for selector in dict.fromkeys(selectors):
+        element = document.select_one(selector)
+        if element is None:
+            elements[selector] = None
+            continue
+        elements[selector] = {
+            "tagName": element.name.lower(),
+            "html": element.decode_contents(),
+            "text": GetElementText(element),
+            "href": GetUrl(element, "href"),
+            "src": GetUrl(element, "src"),
+        }
+    return elements
+
+
+def GetElementText(element: bs4.Tag) -> str:
+    """Gets the text of an element, approximating the text rendered by the browser:
+    whitespace is collapsed, and block elements are placed on their own lines.
+    """
+
+    # collects text, with line breaks around block elements
+    parts: list[str] = []
+    def CollectText(node: PageElement) -> None:
+        if isinstance(node, bs4.Tag):
+            if node.name in HIDDEN_TAGS:
+                return
+            if node.name in BLOCK_TAGS: parts.append("\n")
+            for child in node.children:
+                CollectText(child)
+            if node.name in BLOCK_TAGS: parts.append("\n")
+
+        # only text, excluding comments and other special strings
+        elif type(node) is NavigableString:
+            parts.append(re.sub(r"\s+", " ", str(node)))
+
+    for child in element.children:
+        CollectText(child)
+
+    # strips whitespace in each line, removing empty lines
+    lines = (line.strip() for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
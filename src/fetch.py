@@ -0,0 +1,86 @@
+"""HTTP fetching of pages, for websites not requiring javascript."""
+
+# Pages are fetched with a pooled HTTP session for each website domain,
+# reusing connections across components. Headers mimic a browser,
+# since some websites reject requests with default python headers.
+# Sessions used for file downloads are seeded with cookies and user agent of the browser
+# that loaded the page, so that files behind cookies (e.g. consent, session) can be downloaded directly.
+
+import threading
+import logging as log
+import typing as t
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.website import DomainFromUrl
+from src.tracing import Traced
+
+
+logger = log.getLogger(__name__)
+logger.setLevel(log.INFO)
+
+
+HTTP_TIMEOUT = 10       # timeout for HTTP requests, in seconds
+HTTP_POOL_SIZE = 10     # max number of connections kept open for each domain
+
+# headers sent with every request
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:128.0) Gecko/20100101 Firefox/128.0",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+# HTTP sessions, one for each domain
+sessions: dict[str, requests.Session] = {}
+sessionsLock = threading.Lock()
+
+
+def GetSession(url: str) -> requests.Session:
+    """Gets the HTTP session for the domain of the url, creating it if needed."""
+    domain = DomainFromUrl(url)
+    with sessionsLock:
+        session = sessions.get(domain)
+        if session is None:
+            logger.info(f"Opening new HTTP session for '{domain}'")
+            session = requests.Session()
+            session.headers.update(HTTP_HEADERS)
+
+            # keeps multiple connections open, for parallel workers
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            sessions[domain] = session
+    return session
+
+
+def SeedSession(url: str, cookies: list[dict[str, t.Any]], userAgent: str) -> None:
+    """Copies cookies and user agent of the browser (see selenium get_cookies)
+    into the HTTP session for the domain of the url.
+    Cookies keep their domain and path, so they are sent only where the browser would send them.
+    """
+    session = GetSession(url)
+    with sessionsLock:
+        if userAgent:
+            session.headers["User-Agent"] = userAgent
+        for cookie in cookies:
+            session.cookies.set(cookie["name"], cookie["value"],
+                domain=cookie.get("domain", ""), path=cookie.get("path", "/"),
+                secure=cookie.get("secure", False), expires=cookie.get("expiry"))
+
+
+@Traced("url")
+def FetchPage(url: str) -> requests.Response:
+    """Fetches a page with the HTTP session of its domain, following redirects.
+    Does not raise on HTTP error status codes: check the response status.
+    """
+    logger.info(f"Fetching URL: {url}")
+    return GetSession(url).get(url, timeout=HTTP_TIMEOUT)
+
+
+def CloseSessions() -> None:
+    """Closes all HTTP sessions."""
+    with sessionsLock:
+        for session in sessions.values():
+            session.close()
+        sessions.clear()
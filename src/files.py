@@ -1,7 +1,8 @@
 """File downloader, using different methods depending on the file type."""
 
 # Methods to download files
-# 1. direct: directly from url, using requests. Simple but no header or cookies.
+# 1. direct: directly from url, with the pooled HTTP session of the domain (see fetch),
+#    seeded with cookies and user agent of the browser.
 # 2. image: injecting javascript into the page, to get base64 string of the image.
 # 3. browser: using selenium to open a new tab with the file url.
 #    The browser must be properly configured to download files automatically.
@@ -10,24 +11,43 @@
 # 1. Get file url from element selector, or compose from url template
 # 2. Try direct download, unless disabled in config
 # 3. If direct fails, use fallback method: image (for images), browser (other files)
+# Direct downloads run in a pool of threads shared by all components, so that files
+# of a component (and of parallel components) are downloaded at the same time.
+# Fallback methods use the browser of the component, so they run one at a time.
+# Downloaded files are placed in their paths by the blob store (see blobs), if enabled,
+# that stores identical files only once, and skips urls already downloaded.
 
 import os
+import re
 import time
 import json
-import requests
+import shutil
 import base64
+import requests
+import tempfile
+import threading
 import urllib.parse
 
 import typing as t
 import logging as log
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, Future
+from requests.structures import CaseInsensitiveDict
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
 
-from src.browser import GetDownloadPath
-from src.type_hints import FileConfigEntry, ScrapedFile
+from src.browser import GetDownloadPath, SetDownloadDirectory, CheckCancelled, GetCancelEvent, SetCancelEvent
+from src.browser import ScrapingCancelledError
+from src.watcher import DownloadWatcher
+from src.fetch import GetSession, SeedSession
+from src.blobs import PlaceFile, LinkUrlBlob, HashFile, GetBlobPath
+from src.cache import CacheMode, CachedFileInfo, ReadCachedFile, WriteCachedFile
+from src.timings import MeasurePhase, ElapsedSince
+from src.tracing import Traced, GetCurrentSpan, SetCurrentSpan
+from src.politeness import WaitForRequest
+from src.extraction import ExtractElements
+from src.type_hints import FileConfigEntry, ScrapedFile, ElementData
 
 
 logger = log.getLogger(__name__)
@@ -35,12 +55,79 @@ logger.setLevel(log.INFO)
 
 
 DOWNLOAD_TIMEOUT = 10     # timeout for waiting for file to download
-DOWNLOAD_INTERVAL = 0.5   # interval for checking for new files
+DOWNLOAD_WORKERS = 8      # direct downloads running in parallel, across all components
+DOWNLOAD_CHUNK_SIZE = 2**20 # bytes of direct downloads held in memory at a time
+DOWNLOAD_ATTEMPTS = 3     # attempts of direct downloads, resuming after interrupted transfers
+IMAGE_CHUNK_SIZE = 2**20  # bytes of images transferred from the browser at a time
+
+# extensions of image MIME types, for images fetched in the page
+IMAGE_TYPES = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/avif": "avif",
+    "image/svg+xml": "svg",
+    "image/bmp": "bmp",
+}
+
+# thread pool of direct downloads, started on first download
+executor: t.Optional[ThreadPoolExecutor] = None
+executorLock = threading.Lock()
+
+# waits for the image with the selector (arguments[0]) to load, up to a timeout in ms (arguments[1])
+# NOTE: the page may be used before images are loaded (see pageLoad in config), and lazy images may not load
+IMAGE_LOAD_SCRIPT = """
+const [selector, timeout, done] = arguments;
+const img = document.querySelector(selector);
+if (img === null || img.complete) return done();
+img.loading = "eager";
+img.addEventListener("load", () => done(), {once: true});
+img.addEventListener("error", () => done(), {once: true});
+setTimeout(() => done(), timeout);
+"""
+
+# fetches the original bytes of the image with the selector (arguments[0]), from the browser cache if loaded,
+# keeping them in the page with a key (arguments[1]), to be read in chunks (see IMAGE_CHUNK_SCRIPT)
+# resolves with url, MIME type and size of the image, or with an error (e.g. cross-origin images without CORS)
+# NOTE: cookies are sent only to the same origin (default), since servers allowing any origin
+# (Access-Control-Allow-Origin: *, common for image CDNs) reject cross-origin requests with credentials
+IMAGE_FETCH_SCRIPT = """
+const [selector, key, done] = arguments;
+const img = document.querySelector(selector);
+const url = img === null ? "" : img.currentSrc || img.src;
+if (!url) return done({error: "image source not found"});
+fetch(url, {credentials: "same-origin", cache: "force-cache"})
+    .then(response => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.blob();
+    })
+    .then(blob => {
+        (window.scraperImages ??= {})[key] = blob;
+        done({url: url, type: blob.type, size: blob.size});
+    })
+    .catch(error => done({url: url, error: String(error)}));
+"""
+
+# reads a chunk of the fetched image with the key (arguments[0]), from start to end bytes (arguments[1-2]),
+# resolving with the chunk as base64 string (null if it fails)
+IMAGE_CHUNK_SCRIPT = """
+const [key, start, end, done] = arguments;
+const reader = new FileReader();
+reader.onload = () => done(reader.result.slice(reader.result.indexOf(",") + 1));
+reader.onerror = () => done(null);
+reader.readAsDataURL(window.scraperImages[key].slice(start, end));
+"""
+
+# releases the fetched image with the key (arguments[0])
+IMAGE_RELEASE_SCRIPT = """
+if (window.scraperImages) delete window.scraperImages[arguments[0]];
+"""
 
 
 # Methods to download files
-# 1. DownloadDirect: directly from url, using requests. Simple but no header or cookies.
-# 2. DownloadImage: using javascript injected in the page. To be tested.
+# 1. DownloadDirect: directly from url, using the HTTP session of the domain, with browser cookies.
+# 2. DownloadImage: using javascript injected in the page (fetch, or canvas if fetch fails).
 # 3. DownloadFile: using selenium to open a new tab with the file url.
 #    Works only if the browser is properly configured to download files automatically.
 #
@@ -48,10 +135,13 @@ DOWNLOAD_INTERVAL = 0.5   # interval for checking for new files
 # TODO: add option in config to choose the desired method, since method 1 hangs on some websites.
 
 
-def GetFileUrlAndTagName(driver: webdriver.Firefox,
-    config: FileConfigEntry, data: dict[str, t.Optional[str]]) -> tuple[str, str]:
+def GetFileUrlAndTagName(driver: t.Optional[webdriver.Firefox],
+    config: FileConfigEntry, data: dict[str, t.Optional[str]],
+    elements: t.Optional[dict[str, t.Optional[ElementData]]] = None,
+) -> tuple[str, str]:
     """Gets the url of the file to scrape, together with the HTML tag name of the element that contains it.
     Uses either the specified css selector or the provided url template, with placeholders replaced by data.
+    Uses already extracted elements (see ExtractElements) if available, to avoid browser calls.
     """
 
     # uses url if specified, replacing placeholders with data
@@ -61,15 +151,17 @@ def GetFileUrlAndTagName(driver: webdriver.Firefox,
     # NOTE: we already perform config validation during loading
     selector = config["selector"] # type: ignore
 
-    # finds file element using css selector
-    try:
-        element = driver.find_element(By.CSS_SELECTOR, selector)
-        tagName = element.tag_name
-    except NoSuchElementException:
+    # finds file element using css selector, unless already extracted
+    if elements is None or selector not in elements:
+        assert driver is not None, "Browser required to extract elements"
+        elements = ExtractElements(driver, [selector])
+    element = elements[selector]
+    if element is None:
         raise ValueError(f"Cannot locate element with selector: {selector}")
+    tagName = element["tagName"]
 
     # gets url in element (link or image)
-    fileUrl = element.get_attribute("href") or element.get_attribute("src")
+    fileUrl = element["href"] or element["src"]
     if fileUrl is None:
         raise ValueError(f"'href' or 'src' not found for element {tagName} with selector: {selector}")
     if fileUrl == "":
@@ -78,18 +170,17 @@ def GetFileUrlAndTagName(driver: webdriver.Firefox,
     return fileUrl, tagName
 
 
-def DownloadDirect(url: str, targetPath: str) -> ScrapedFile:
-    """Downloads a file from the specified url to the specified path."""
-
-    try:
-        # downloads data from url, returning error if it fails
-        response = requests.get(url, timeout=DOWNLOAD_TIMEOUT)
-        response.raise_for_status()
-    except Exception as e:
-        return {
-            "result": f"error: {e}",
-            "url": url,
-        }
+@Traced("url")
+def DownloadDirect(url: str, targetPath: str, cache: CacheMode = "use") -> ScrapedFile:
+    """Downloads a file from the specified url to the specified path.
+    The file is streamed to a part file (see StreamToPartFile), renamed to the target path
+    only when complete, so that the target path never contains a partial file.
+    Interrupted transfers are resumed, also by later downloads after a crash.
+    Files downloaded before are revalidated with a conditional request (ETag, Last-Modified),
+    and kept if not modified (result with "cached": true), also when stored in the blob store.
+    With the blob store, urls downloaded recently without validators are linked without downloading them
+    (only with cache mode "use").
+    """
 
     # replaces extension placeholder with the actual extension
     # TODO: read extension from Content-Disposition HTTP header
@@ -97,27 +188,293 @@ def DownloadDirect(url: str, targetPath: str) -> ScrapedFile:
     urlPath = urllib.parse.urlparse(url)
     ext = Path(urlPath.path).suffix.lower().strip(".")
     targetPath = targetPath.format(ext=ext)
+    partPath = targetPath + ".part"
+
+    # revalidates the file downloaded before, if still available (also as blob)
+    conditions: dict[str, str] = {}
+    cached = ReadCachedFile(url)
+    cachedPath = FindCachedFile(cached, targetPath) if cached is not None else None
+    if cached is not None and cachedPath is not None:
+        if cached.etag:
+            conditions["If-None-Match"] = cached.etag
+        if cached.lastModified:
+            conditions["If-Modified-Since"] = cached.lastModified
+
+    # links the file of the url, if downloaded recently and not revalidable (no validators)
+    if not conditions and cache == "use" and LinkUrlBlob(url, targetPath):
+        return {
+            "result": "success",
+            "url": url,
+            "path": targetPath,
+            "size": os.path.getsize(targetPath),
+            "method": "direct",
+            "cached": True,
+        }
+
+    # headers of the response (None if not modified), set by the successful attempt
+    headers: t.Optional[CaseInsensitiveDict[str]] = None
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+
+        # waits for politeness limits of the website
+        WaitForRequest(url)
 
-    # creates target directory tree if it doesn't exist
-    os.makedirs(os.path.dirname(targetPath), exist_ok=True)
+        try:
+            # creates target directory tree if it doesn't exist
+            os.makedirs(os.path.dirname(targetPath) or ".", exist_ok=True)
+
+            # downloads data from url to part file
+            headers = StreamToPartFile(url, partPath, conditions)
+            break
+
+        # resumes interrupted transfers, keeping the part file
+        # NOTE: requests failing before the transfer (e.g. connection refused) are not retried
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == DOWNLOAD_ATTEMPTS or not os.path.exists(partPath):
+                return {"result": f"error: {e}", "url": url}
+            logger.warning(f"Download interrupted ({e}), resuming from url: {url}")
+
+        # returns error if it fails
+        except ScrapingCancelledError:
+            raise
+        except Exception as e:
+            return {"result": f"error: {e}", "url": url}
+
+    # not modified: keeps the file downloaded before, copying it to the target path if elsewhere
+    if headers is None:
+        assert cached is not None and cachedPath is not None
+        if os.path.abspath(cachedPath) != os.path.abspath(targetPath):
+            shutil.copyfile(cachedPath, partPath)
+            PlaceFile(partPath, targetPath, url, cached.hash)
+        RemovePartFile(partPath)
+        WriteCachedFile(cached._replace(path=targetPath, validated=time.time()))
+        logger.info(f"File not modified, keeping: {targetPath}")
+        return {
+            "result": "success",
+            "url": url,
+            "path": targetPath,
+            "size": cached.size,
+            "method": "direct",
+            "cached": True,
+        }
 
-    # writes data to file
-    with open(targetPath, 'wb') as file:
-        file.write(response.content)
+    # moves the complete file to the target path
+    size, hash = os.path.getsize(partPath), HashFile(partPath)
+    PlaceFile(partPath, targetPath, url, hash)
+    RemovePartFile(partPath)
+
+    # records validators of the file, to revalidate it next time
+    etag, lastModified = headers.get("ETag", ""), headers.get("Last-Modified", "")
+    if etag or lastModified:
+        WriteCachedFile(CachedFileInfo(url, etag, lastModified, size, hash, targetPath, time.time()))
 
     return {
         "result": "success",
         "url": url,
         "path": targetPath,
-        "size": os.path.getsize(targetPath),
+        "size": size,
         "method": "direct",
+        "cached": False,
     }
 
 
+def FindCachedFile(cached: CachedFileInfo, targetPath: str) -> t.Optional[str]:
+    """Finds a file with the content of the cached download: in the target path,
+    in the path of the latest download, or in the blob store. Returns None if not found.
+    """
+    for path in [targetPath, cached.path, str(GetBlobPath(cached.hash))]:
+        if os.path.isfile(path) and os.path.getsize(path) == cached.size and HashFile(path) == cached.hash:
+            return path
+    return None
+
+
+def StreamToPartFile(url: str, partPath: str,
+    conditions: dict[str, str] = {},
+) -> t.Optional[CaseInsensitiveDict[str]]:
+    """Streams the file at the url to the part file, in chunks of DOWNLOAD_CHUNK_SIZE.
+    Sends the conditional headers (e.g. If-None-Match), if any, to download only a modified file.
+    Resumes an existing part file with an HTTP Range request, if the file on the server
+    did not change (If-Range, with the ETag or Last-Modified saved in the .json next to the part file).
+    Starts again from the beginning if the server does not support ranges, or the file changed.
+    Returns the headers of the response, or None if the file was not modified (HTTP 304).
+    Raises on HTTP errors and interrupted transfers, keeping the data received in the part file.
+    """
+    metaPath = partPath + ".json"
+
+    # asks for the rest of the part file, if any, unless the file changed
+    # NOTE: content is not compressed, so that ranges match bytes in the file
+    headers = {"Accept": "*/*", "Accept-Encoding": "identity", **conditions}
+    offset = 0
+    if os.path.exists(partPath) and os.path.exists(metaPath):
+        with open(metaPath, encoding="utf-8") as file:
+            meta = json.load(file)
+        if meta.get("url") == url and meta.get("validator"):
+            offset = os.path.getsize(partPath)
+            headers.update({"Range": f"bytes={offset}-", "If-Range": meta["validator"]})
+
+    with GetSession(url).get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+
+        # range not satisfiable (e.g. part file bigger than the file), or not the requested one: starts again
+        contentRange = re.match(r"bytes (\d+)-\d+/(\d+|\*)", response.headers.get("Content-Range", ""))
+        if response.status_code == 416 or (response.status_code == 206 and
+            (contentRange is None or int(contentRange.group(1)) != offset)):
+            logger.warning(f"Invalid part file, downloading again from url: {url}")
+            RemovePartFile(partPath)
+            return StreamToPartFile(url, partPath, conditions)
+        response.raise_for_status()
+
+        # not modified: nothing to download
+        if response.status_code == 304:
+            return None
+
+        # resumes only if the server sent the requested range, otherwise starts again
+        if response.status_code != 206:
+            offset = 0
+        if offset > 0:
+            logger.info(f"Resuming download at {offset} bytes, from url: {url}")
+            total = int(contentRange.group(2)) if contentRange and contentRange.group(2) != "*" else None
+        else:
+            length = response.headers.get("Content-Length", "")
+            total = int(length) if length.isdigit() else None
+
+            # saves the validator of the file, to resume the download if interrupted
+            # NOTE: weak ETags cannot be used to resume (see If-Range)
+            etag = response.headers.get("ETag", "")
+            validator = etag if etag and not etag.startswith("W/") else response.headers.get("Last-Modified", "")
+            with open(metaPath, "w", encoding="utf-8") as file:
+                json.dump({"url": url, "validator": validator}, file)
+
+        # writes data to part file, one chunk at a time
+        with open(partPath, "ab" if offset > 0 else "wb") as file:
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                CheckCancelled()
+                file.write(chunk)
+            size = file.tell()
+
+    # detects transfers closed before the end
+    if total is not None and size != total:
+        raise requests.ConnectionError(f"Incomplete download: {size} of {total} bytes")
+    return response.headers
+
+
+def RemovePartFile(partPath: str) -> None:
+    """Removes the part file and its metadata, if they exist."""
+    for path in [partPath, partPath + ".json"]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def StartDownloadDirect(url: str, targetPath: str, timings: dict[str, float],
+    cache: CacheMode = "use",
+) -> Future[ScrapedFile]:
+    """Starts a direct download in the download threads, returning a future with the result.
+    The download continues the trace and the cancellation of the calling thread.
+    Saves the time of the download in the "direct" phase of timings (see MeasurePhase).
+    """
+    global executor
+    with executorLock:
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix="download")
+
+    cancelEvent, parentSpan = GetCancelEvent(), GetCurrentSpan()
+    def Download() -> ScrapedFile:
+        SetCancelEvent(cancelEvent)
+        SetCurrentSpan(parentSpan)
+        try:
+            with MeasurePhase(timings, "direct"):
+                return DownloadDirect(url, targetPath, cache)
+        finally:
+            SetCancelEvent(None)
+            SetCurrentSpan(None)
+
+    return executor.submit(Download)
+
+
+def SeedSessions(driver: webdriver.Firefox, urls: list[str]) -> None:
+    """Copies cookies and user agent of the browser into the HTTP sessions of the urls (see SeedSession)."""
+    cookies = driver.get_cookies()
+    userAgent = driver.execute_script("return navigator.userAgent;")
+    for url in set(urls):
+        SeedSession(url, cookies, userAgent)
+
+
+def CloseDownloads() -> None:
+    """Stops the download threads, after pending downloads."""
+    global executor
+    with executorLock:
+        if executor is not None:
+            executor.shutdown()
+            executor = None
+
+
+@Traced("selector")
 def DownloadImage(driver: webdriver.Firefox, selector: str, targetPath: str) -> ScrapedFile:
     """Downloads an image opened in the current tab to the specified target path.
     The target path must contain the {ext} placeholder, replaced with image extension.
-    Returns a tuple with target path and size of the downloaded image.
+    Gets the original bytes of the image (see FetchImage), or draws it on a canvas
+    if fetching fails (see DrawImage), e.g. for cross-origin images without CORS.
+    """
+
+    # waits for image to load, if not loaded yet
+    driver.execute_async_script(IMAGE_LOAD_SCRIPT, selector, DOWNLOAD_TIMEOUT * 1000)
+
+    try:
+        return FetchImage(driver, selector, targetPath)
+    except ScrapingCancelledError:
+        raise
+    except Exception as e:
+        logger.info(f"Unable to fetch image with selector: {selector} ({e}), drawing it on canvas")
+    return DrawImage(driver, selector, targetPath)
+
+
+def FetchImage(driver: webdriver.Firefox, selector: str, targetPath: str) -> ScrapedFile:
+    """Downloads the original bytes of an image, fetched in the page (from the browser cache, if loaded).
+    The image is transferred from the browser in chunks of IMAGE_CHUNK_SIZE, written to a part file,
+    so that memory usage does not depend on the image size. The extension is taken from the image type.
+    Raises RuntimeError if the image cannot be fetched.
+    """
+
+    # fetches the image in the page, keeping it there
+    key = os.urandom(8).hex()
+    image = driver.execute_async_script(IMAGE_FETCH_SCRIPT, selector, key)
+    if "error" in image:
+        raise RuntimeError(f"Fetch failed: {image['error']}")
+    if image["size"] == 0:
+        raise RuntimeError("Fetch failed: empty image")
+
+    # substitutes extension placeholder with the extension of the image type (or url)
+    url = "" if image["url"].startswith("data:") else image["url"]
+    ext = IMAGE_TYPES.get(image["type"].split(";")[0].strip().lower(), "")
+    ext = ext or Path(urllib.parse.urlparse(url).path).suffix.lower().strip(".")
+    targetPath = targetPath.format(ext=ext)
+
+    # transfers image to part file, one chunk at a time
+    os.makedirs(os.path.dirname(targetPath) or ".", exist_ok=True)
+    try:
+        with open(targetPath + ".part", "wb") as file:
+            for start in range(0, image["size"], IMAGE_CHUNK_SIZE):
+                CheckCancelled()
+                chunk = driver.execute_async_script(IMAGE_CHUNK_SCRIPT, key, start, start + IMAGE_CHUNK_SIZE)
+                if chunk is None:
+                    raise RuntimeError(f"Unable to read image at {start} bytes")
+                file.write(base64.b64decode(chunk))
+    finally:
+        driver.execute_script(IMAGE_RELEASE_SCRIPT, key)
+
+    PlaceFile(targetPath + ".part", targetPath)
+    logger.info(f"Image fetched to: {targetPath}, size: {image['size']}")
+
+    return {
+        "result": "success",
+        "url": url,
+        "path": targetPath,
+        "size": image["size"],
+        "method": "image",
+    }
+
+
+def DrawImage(driver: webdriver.Firefox, selector: str, targetPath: str) -> ScrapedFile:
+    """Downloads an image drawing it on a canvas, converted to PNG.
+    Fails for cross-origin images, not readable from canvas (tainted).
     """
 
     # destination image extension
@@ -152,9 +509,11 @@ def DownloadImage(driver: webdriver.Firefox, selector: str, targetPath: str) ->
 
     # saves image to file, decoding base64
     # (removing the data:image/png;base64, prefix)
-    with open(targetPath, "wb") as f:
+    os.makedirs(os.path.dirname(targetPath) or ".", exist_ok=True)
+    with open(targetPath + ".part", "wb") as f:
         imgBytes = base64.b64decode(imgBase64.split(",")[1])
         f.write(imgBytes)
+    PlaceFile(targetPath + ".part", targetPath)
     logger.info(f"Image downloaded to: {targetPath}, size: {len(imgBytes)}")
 
     # gets the url of the image, if it's not "data:image/..."
@@ -170,73 +529,55 @@ def DownloadImage(driver: webdriver.Firefox, selector: str, targetPath: str) ->
     }
 
 
+@Traced("url")
 def DownloadWithBrowser(driver: webdriver.Firefox, url: str, targetPath: str) -> ScrapedFile:
     """Downloads a file opening a new browser tab with the specified url.
     It works with PDF files and other non-media files with supported browser preview.
+    Every download uses its own directory (if supported by the browser), watched for the completed file.
     """
 
-    # gets browser download path and existing files
-    downloadPath = GetDownloadPath()
-    initialFiles = set(os.listdir(downloadPath))
-
-    # checks existing part files, that may block the download
-    for file in initialFiles:
-        if file.endswith(".part"):
-            logger.warning(f"Part file found: {file}")
-
-    # opens a new tab with the file url
-    # NOTE: url is sanitized using json.dumps to prevent injection of malicious code
-    # the tab will close after the file is downloaded
-    driver.execute_script(f"window.open({json.dumps(url)}, '_blank');")
-    logger.info(f"Opened new tab with url: {url}, waiting for file to download...")
-
-    # waits for file to download, detecting new files in the download path
-    downloadedFile = ""
-    startTime = time.time()
-    while time.time() - startTime < DOWNLOAD_TIMEOUT:
-
-        # detects new files
-        currentFiles = set(os.listdir(downloadPath))
-        newFiles = currentFiles - initialFiles
-
-        # checks completed files
-        for newFile in newFiles:
-            # waits that any .part files are removed
-            if newFile.endswith(".part"): break
-
-            # checks file size
-            downloadedFile = os.path.join(downloadPath, newFile)
-            if os.path.getsize(downloadedFile) != 0:
-                break # file found, exit loop
+    # downloads to a new directory, if supported by the browser, otherwise to the slot directory,
+    # removing files left by previous downloads (e.g. abandoned part files, that may block the download)
+    downloadPath = tempfile.mkdtemp(prefix="download-", dir=GetDownloadPath())
+    try:
+        isolated = SetDownloadDirectory(driver, downloadPath)
+    except Exception:
+        os.rmdir(downloadPath)
+        raise
+    if not isolated:
+        os.rmdir(downloadPath)
+        downloadPath = GetDownloadPath()
+        CleanDownloadPath(downloadPath)
 
-            # no valid file found, until now
-            downloadedFile = ""
-        
-        # exits outer loop if file is found
-        if downloadedFile != "": break
+    try:
+        # waits for the file in the download path, watching it since before the download starts
+        with DownloadWatcher(downloadPath) as watcher:
 
-        # waits for next iteration
-        time.sleep(DOWNLOAD_INTERVAL)
+            # opens a new tab with the file url
+            # NOTE: url is sanitized using json.dumps to prevent injection of malicious code
+            # the tab will close after the file is downloaded
+            WaitForRequest(url)
+            driver.execute_script(f"window.open({json.dumps(url)}, '_blank');")
+            logger.info(f"Opened new tab with url: {url}, waiting for file to download...")
 
-    # timeout reached
-    if downloadedFile == "":
-        raise TimeoutError(f"File not found in {downloadPath} after {DOWNLOAD_TIMEOUT} seconds")
+            downloadedFile = watcher.Wait(DOWNLOAD_TIMEOUT)
 
-    logger.info(f"File downloaded to: {downloadedFile}")
+        logger.info(f"File downloaded to: {downloadedFile}")
 
-    # creates target directory if it doesn't exist
-    os.makedirs(os.path.dirname(targetPath), exist_ok=True)
+        # creates target directory if it doesn't exist
+        os.makedirs(os.path.dirname(targetPath) or ".", exist_ok=True)
 
-    # replaces extension placeholder with the actual extension
-    targetPath = targetPath.format(ext=Path(downloadedFile).suffix.strip("."))
+        # replaces extension placeholder with the actual extension
+        targetPath = targetPath.format(ext=Path(downloadedFile).suffix.strip("."))
 
-    # removes files if already exists
-    if os.path.exists(targetPath):
-        os.remove(targetPath)
+        # moves file to the target path, replacing existing file
+        PlaceFile(downloadedFile, targetPath)
+        logger.info(f"File moved to: {targetPath}")
 
-    # moves file to the target path
-    os.rename(downloadedFile, targetPath)
-    logger.info(f"File moved to: {targetPath}")
+    # removes the directory of the download, with abandoned files (e.g. on timeout)
+    finally:
+        if isolated:
+            shutil.rmtree(downloadPath, ignore_errors=True)
 
     # adds file to the scraped files
     return {
@@ -248,26 +589,41 @@ def DownloadWithBrowser(driver: webdriver.Firefox, url: str, targetPath: str) ->
     }
 
 
-def DownloadFile(driver: webdriver.Firefox, url: str, tagName: str, basePath: str,
-    fileConfig: FileConfigEntry, data: dict[str, t.Optional[str]], skipDirectDownload: bool,
-) -> ScrapedFile:
-    """Downloads a file from the specified url to the specified path.
-    Uses different methods depending on the case: image or other file.
-    """
+def CleanDownloadPath(downloadPath: str) -> None:
+    """Removes files left in the download path by previous downloads."""
+    for name in os.listdir(downloadPath):
+        path = os.path.join(downloadPath, name)
+        if os.path.isfile(path):
+            logger.warning(f"Removing file left by a previous download: {name}")
+            os.remove(path)
 
-    # composes the full target path
 
+def GetTargetPath(basePath: str, fileConfig: FileConfigEntry, data: dict[str, t.Optional[str]]) -> str:
+    """Composes the full target path of a file, replacing placeholders with data.
+    The {ext} placeholder is kept, and replaced by the download methods.
+    """
     # NOTE: we already perform config validation during loading
     targetPath = fileConfig["path"] # type: ignore
-    
-    # replaces placeholders with data, and composes absolute path
-    targetPath = targetPath.format(**data)
-    targetPath = os.path.join(basePath, targetPath)
+    return os.path.join(basePath, targetPath.format(**data))
 
-    # unless configured to skip, tries direct download
-    if skipDirectDownload == False:
-        logger.info(f"Trying direct download from url: {url}")
-        result = DownloadDirect(url, targetPath)
+
+@Traced("url", "tagName")
+def DownloadFile(driver: t.Optional[webdriver.Firefox], url: str, tagName: str, targetPath: str,
+    fileConfig: FileConfigEntry, direct: t.Optional[Future[ScrapedFile]],
+    timings: t.Optional[dict[str, float]] = None,
+) -> ScrapedFile:
+    """Downloads a file from the specified url to the specified path.
+    Waits for the direct download, if started (see StartDownloadDirect), then uses the fallback
+    methods if it fails, depending on the case: image or other file.
+    Without browser (http engine), only direct download is available.
+    Saves timings of every fallback method tried, if timings dictionary is provided.
+    """
+    timings = {} if timings is None else timings
+
+    # unless configured to skip, waits for direct download
+    if direct is not None:
+        logger.info(f"Waiting for direct download from url: {url}")
+        result = direct.result()
 
         # if successful, returns the result
         if result.get("result") == "success":
@@ -279,53 +635,95 @@ def DownloadFile(driver: webdriver.Firefox, url: str, tagName: str, basePath: st
     else:
         logger.info(f"Skipping direct download")
 
+    # no fallback methods without browser
+    if driver is None:
+        raise RuntimeError("Direct download failed, and no browser available for other methods")
+
+    # focuses the first tab
+    # this is needed because the browser may have opened multiple tabs to download files
+    driver.switch_to.window(driver.window_handles[0])
+
     # images extracxtion using javascript
     if tagName == "img":
         selector = fileConfig["selector"] # type: ignore
         logger.info(f"Trying image extraction from selector: {selector}")
-        return DownloadImage(driver, selector, targetPath)
+        with MeasurePhase(timings, "image"):
+            return DownloadImage(driver, selector, targetPath)
 
     # downloads using browser
     logger.info(f"Trying browser download from url: {url}")
-    return DownloadWithBrowser(driver, url, targetPath)
+    with MeasurePhase(timings, "browser"):
+        return DownloadWithBrowser(driver, url, targetPath)
 
 
 def ScrapeFiles(
-    driver: webdriver.Firefox,
+    driver: t.Optional[webdriver.Firefox],
     basePath: str,
     files: dict[str, FileConfigEntry],
     data:  dict[str, t.Optional[str]],
     skipDirectDownload: bool,
+    elements: t.Optional[dict[str, t.Optional[ElementData]]] = None,
+    cache: CacheMode = "use",
 ) -> dict[str, ScrapedFile]:
     """Scrapes files from the current page, using the specified config.
     Tries different methods to download the file, depending on the file type.
+    Direct downloads of all files run at the same time, then fallback methods run one at a time.
+    Uses already extracted elements (see ExtractElements) if available, to get file urls.
+    Timings of every phase are saved in the result of each file (see MeasurePhase).
+    The cache mode applies to files downloaded before (see DownloadDirect).
     """
 
-    scrapedFiles = {}
-    for tag, fileConfig in files.items():
-        logger.info(f"Scraping file: {tag}")
+    scrapedFiles: dict[str, ScrapedFile] = {}
+    starts: dict[str, float] = {}
+    timings: dict[str, dict[str, float]] = {}
+    downloads: dict[str, tuple[str, str, str]] = {} # tag -> url, tag name, target path
 
-        # focuses the first tab
-        # this is needed because the browser may have opened multiple tabs to download files
+    # focuses the first tab, if using browser
+    if driver is not None:
         driver.switch_to.window(driver.window_handles[0])
 
-        # tries to get file url and, if selector is specified, the tag name of the element
+    # gets urls of all files and, if selector is specified, the tag names of their elements
+    for tag, fileConfig in files.items():
+        CheckCancelled()
+        starts[tag], timings[tag] = time.monotonic(), {}
         try:
-            url, tagName = GetFileUrlAndTagName(driver, fileConfig, data)
+            with MeasurePhase(timings[tag], "url"):
+                url, tagName = GetFileUrlAndTagName(driver, fileConfig, data, elements)
+            downloads[tag] = url, tagName, GetTargetPath(basePath, fileConfig, data)
         except Exception as e:
             logger.error(f"Error getting file url for '{tag}': {e}")
             scrapedFiles[tag] = {"result": f"error: {e}"}
-            continue
 
-        try:
-            # downloads the file with the appropriate method, saving the result
-            scrapedFiles[tag] = DownloadFile(driver, url, tagName,
-                basePath, fileConfig, data, skipDirectDownload)
+    # starts direct downloads in background, unless configured to skip
+    # NOTE: HTTP sessions get cookies of the browser, for files not accessible without them
+    directs: dict[str, Future[ScrapedFile]] = {}
+    if not skipDirectDownload and downloads:
+        if driver is not None:
+            SeedSessions(driver, [url for url, _, _ in downloads.values()])
+        for tag, (url, _, targetPath) in downloads.items():
+            logger.info(f"Starting direct download of file '{tag}' from url: {url}")
+            directs[tag] = StartDownloadDirect(url, targetPath, timings[tag], cache)
 
-        # returns error if something goes wrong
-        except Exception as e:
-            logger.error(f"Error downloading file '{tag}': {e}")
-            scrapedFiles[tag] = {"url": url, "result": f"error: {e}"}
-            continue
-
-    return scrapedFiles
+    try:
+        for tag, (url, tagName, targetPath) in downloads.items():
+            CheckCancelled()
+            logger.info(f"Scraping file: {tag}")
+            try:
+                # downloads the file with the appropriate method, saving the result
+                scrapedFiles[tag] = DownloadFile(driver, url, tagName, targetPath,
+                    files[tag], directs.get(tag), timings[tag])
+
+            # returns error if something goes wrong
+            except Exception as e:
+                logger.error(f"Error downloading file '{tag}': {e}")
+                scrapedFiles[tag] = {"url": url, "result": f"error: {e}"}
+
+    # cancels direct downloads not started yet, if interrupted
+    finally:
+        for future in directs.values():
+            future.cancel()
+
+    # returns files in the configured order
+    for tag in files:
+        scrapedFiles[tag]["timings"] = {**timings[tag], "total": ElapsedSince(starts[tag])}
+    return {tag: scrapedFiles[tag] for tag in files}
@@ -0,0 +1,105 @@
+"""Checkpointed batch jobs, resuming after a crash or restart."""
+
+# Every job has an append-only journal (JSON lines), named after the job id.
+# The first line records the job parameters, then every completed component is appended
+# with its result (including paths of downloaded files), as soon as it is scraped.
+# Running the job again with the same id skips components already scraped successfully,
+# returning their recorded results. Failed components are scraped again.
+# A line truncated by a crash is ignored.
+
+import os
+import re
+import json
+import time
+import threading
+import logging as log
+import pathlib as pl
+import typing as t
+
+from src.type_hints import ScrapedComponentData, ComponentKey
+
+
+logger = log.getLogger(__name__)
+logger.setLevel(log.INFO)
+
+
+# journals directory in the root of the project
+JOBS_DIR = pl.Path(__file__).parent.parent / "jobs"
+
+# serializes journal writes from multiple threads
+jobsLock = threading.Lock()
+
+
+def GetJournalPath(jobId: str) -> pl.Path:
+    """Gets the journal path of a job. Raises ValueError if the id is not a valid file name."""
+    if not re.fullmatch(r"[\w.-]+", jobId) or jobId.startswith("."):
+        raise ValueError(f"Invalid job id '{jobId}': use only letters, digits, '_', '-' and '.'")
+    return JOBS_DIR / f"{jobId}.jsonl"
+
+
+def StartJob(jobId: str, params: dict[str, t.Any]) -> dict[ComponentKey, int]:
+    """Starts a job, or resumes it if its journal exists.
+    Returns the components already scraped successfully, with the position of their results
+    in the journal (see ReadJobResult), so that big jobs are not loaded in memory.
+    Raises ValueError if the job was started with different parameters.
+    """
+    path = GetJournalPath(jobId)
+    params = json.loads(json.dumps(params)) # as read back from JSON (e.g. lists)
+
+    # new job: writes parameters in the first line
+    with jobsLock:
+        if not path.exists() or path.stat().st_size == 0:
+            JOBS_DIR.mkdir(parents=True, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(json.dumps({"job": jobId, "params": params, "created": time.time()}) + "\n")
+            logger.info(f"Started job '{jobId}'")
+            return {}
+
+        # existing job: checks that parameters are the same
+        completed: dict[ComponentKey, int] = {}
+        with open(path, "rb") as file:
+            header = json.loads(file.readline())
+            if header["params"] != params:
+                raise ValueError(f"Job '{jobId}' was started with different parameters: {header['params']}")
+
+            # reads completed components (latest result of each one)
+            position = file.tell()
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping truncated line in journal of job '{jobId}'")
+                    record = None
+                if record is not None:
+                    key = (record["manuCode"], tuple(record.get("hints", [])))
+                    if record["result"].get("result", "").startswith("error"):
+                        completed.pop(key, None)
+                    else:
+                        completed[key] = position
+                position += len(line)
+
+            # checks if the last line was truncated by a crash
+            file.seek(-1, os.SEEK_END)
+            truncated = file.read(1) != b"\n"
+
+        # ends the truncated line, so that new results start on a new line
+        if truncated:
+            with open(path, "a", encoding="utf-8") as file:
+                file.write("\n")
+
+    logger.info(f"Resuming job '{jobId}': {len(completed)} components already scraped")
+    return completed
+
+
+def ReadJobResult(jobId: str, position: int) -> ScrapedComponentData:
+    """Reads a result from the journal of the job, at the position returned by StartJob."""
+    with open(GetJournalPath(jobId), "rb") as file:
+        file.seek(position)
+        return json.loads(file.readline())["result"]
+
+
+def WriteJobResult(jobId: str, manuCode: str, hints: tuple[str, ...], result: ScrapedComponentData) -> None:
+    """Appends the result of a completed component (with its own hints) to the journal of the job."""
+    line = json.dumps({"manuCode": manuCode, "hints": list(hints), "result": result, "completed": time.time()})
+    with jobsLock, open(GetJournalPath(jobId), "a", encoding="utf-8") as file:
+        file.write(line + "\n")
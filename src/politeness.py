@@ -0,0 +1,157 @@
+"""Politeness limits for every website: request rate and concurrent scrapes."""
+
+# Parallel workers can hammer a single website, when a batch is dominated by its components.
+# Every website has a limiter, configured in its entry:
+# - rateLimit: requests per second (token bucket, allowing bursts of up to 1 second of requests)
+# - maxConcurrency: components scraped at the same time (semaphore)
+# Page loads take a concurrency slot and a token; direct downloads from the website take a token.
+# The component scheduler (PickNextComponent) interleaves queued components across websites,
+# so that workers are not left waiting for a busy website while other websites are free.
+
+import math
+import time
+import threading
+import logging as log
+import typing as t
+from contextlib import contextmanager
+
+from src.browser import CheckCancelled
+from src.timings import MeasurePhase
+from src.website import MatchUrlToDomains
+from src.type_hints import WebsiteEntry
+
+
+logger = log.getLogger(__name__)
+logger.setLevel(log.INFO)
+
+
+# defaults for websites without limits in config (0 = unlimited)
+DEFAULT_RATE_LIMIT = 0.0
+DEFAULT_MAX_CONCURRENCY = 0
+
+# max time waiting without checking cancellation, in seconds
+POLITENESS_SLICE = 0.5
+
+# number of queued components considered by the scheduler, to pick the next one
+SCHEDULER_LOOKAHEAD = 20
+
+
+class WebsiteLimiter:
+    """Request rate (token bucket) and concurrency limits of a website."""
+
+    def __init__(self) -> None:
+        self.rateLimit = DEFAULT_RATE_LIMIT
+        self.maxConcurrency = DEFAULT_MAX_CONCURRENCY
+        self.tokens = math.inf # full bucket, capped to the burst size on first request
+        self.updated = time.monotonic()
+        self.active = 0
+        self.condition = threading.Condition()
+
+    def Configure(self, entry: WebsiteEntry) -> None:
+        """Updates limits from the website entry."""
+        with self.condition:
+            self.rateLimit = entry.get("rateLimit", DEFAULT_RATE_LIMIT)
+            self.maxConcurrency = entry.get("maxConcurrency", DEFAULT_MAX_CONCURRENCY)
+            self.condition.notify_all()
+
+    def HasCapacity(self, scheduled: int = 0) -> bool:
+        """Checks if one more component can be scraped, with some components already scheduled
+        (by the caller, running or queued). Components scraped by other callers count too.
+        """
+        return self.maxConcurrency == 0 or max(self.active, scheduled) < self.maxConcurrency
+
+    def AcquireSlot(self) -> None:
+        """Waits for a concurrency slot. Raises ScrapingCancelledError if cancelled."""
+        with self.condition:
+            while not self.HasCapacity():
+                CheckCancelled()
+                self.condition.wait(POLITENESS_SLICE)
+            self.active += 1
+
+    def ReleaseSlot(self) -> None:
+        """Releases a concurrency slot, waking up a waiting thread."""
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+    def TakeToken(self) -> None:
+        """Waits for a request token. Raises ScrapingCancelledError if cancelled."""
+        while True:
+            CheckCancelled()
+            with self.condition:
+                if self.rateLimit <= 0:
+                    return
+
+                # refills tokens for the elapsed time, up to 1 second of requests
+                now = time.monotonic()
+                burst = max(self.rateLimit, 1.0)
+                self.tokens = min(self.tokens + (now - self.updated) * self.rateLimit, burst)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rateLimit
+            time.sleep(min(delay, POLITENESS_SLICE))
+
+
+# limiters of websites, by configured domain
+limiters: dict[str, WebsiteLimiter] = {}
+limitersLock = threading.Lock()
+
+
+def GetLimiter(domain: str) -> WebsiteLimiter:
+    """Gets the limiter of the website, creating it if needed."""
+    with limitersLock:
+        limiter = limiters.get(domain)
+        if limiter is None:
+            limiter = limiters[domain] = WebsiteLimiter()
+        return limiter
+
+
+@contextmanager
+def VisitWebsite(domain: str, entry: WebsiteEntry,
+    timings: t.Optional[dict[str, float]] = None,
+) -> t.Iterator[None]:
+    """Scrapes from a website within its limits: waits for a concurrency slot
+    and a request token (for the page), keeping the slot until the end.
+    Saves time spent waiting in the "politeness" phase, if timings dictionary is provided.
+    """
+    limiter = GetLimiter(domain)
+    limiter.Configure(entry)
+    with MeasurePhase({} if timings is None else timings, "politeness"):
+        limiter.AcquireSlot()
+        try:
+            limiter.TakeToken()
+        except BaseException:
+            limiter.ReleaseSlot()
+            raise
+    try:
+        yield
+    finally:
+        limiter.ReleaseSlot()
+
+
+def WaitForRequest(url: str) -> None:
+    """Waits for a request token of the website of the url, if visited (e.g. file downloads).
+    Urls of other websites (e.g. CDNs) are not limited.
+    """
+    with limitersLock:
+        domains = list(limiters.keys())
+    try:
+        domain = MatchUrlToDomains(url, domains)
+    except ValueError:
+        return
+    GetLimiter(domain).TakeToken()
+
+
+def PickNextComponent(queued: list[str], scheduled: dict[str, int]) -> int:
+    """Picks the next component to scrape, interleaving websites.
+    - queued: predicted website domain of every queued component, in input order ("" = unknown)
+    - scheduled: number of components scheduled (running or queued to workers) for each website
+    Returns the index of the first component whose website has capacity,
+    or of the component whose website has the fewest scheduled components.
+    """
+    for index, domain in enumerate(queued):
+        if not domain or GetLimiter(domain).HasCapacity(scheduled.get(domain, 0)):
+            return index
+    return min(range(len(queued)), key=lambda index: scheduled.get(queued[index], 0))
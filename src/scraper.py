@@ -1,34 +1,67 @@
 """Main scraper functions."""
 
+import re
+import copy
+import time
+import string
+import itertools
+import threading
+import contextlib
 import logging as log
 import typing as t
-import html2text as h2t
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
 
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException, InvalidSessionIdException
+from selenium.common.exceptions import InvalidSessionIdException
 
 from src.config import ReadConfig
-from src.browser import GetBrowser, WaitElement, CloseBrowser, RetryOnException, ResetBrowser
-from src.files import ScrapeFiles
+from src.browser import GetBrowser, NavigateTo, WaitElements, CloseBrowser, RetryOnException, ResetBrowser
+from src.browser import BROWSER_WORKERS, SetBrowserSlot, GetBrowserSlot, PooledBrowserSlot, CloseIdleBrowsers
+from src.browser import ScrapingCancelledError, SetCancelEvent, CheckCancelled
+from src.browser import BLOCK_DEFAULT, SetResourceBlocking, GetBlockedCount
+from src.files import ScrapeFiles, GetFileUrlAndTagName
+from src.extraction import ExtractElements, ParseHtml, ParseElements
+from src.fetch import FetchPage
+from src.conversion import ConvertToMarkdown, CompletedFuture
+from src.timings import MeasurePhase, ElapsedSince, RemoveTimings, SummarizeTimings
+from src.tracing import Traced, SetSpanAttributes, GetCurrentSpan, SetCurrentSpan
+from src.politeness import VisitWebsite, GetLimiter, PickNextComponent, SCHEDULER_LOOKAHEAD
+from src.snapshots import SAVE_SNAPSHOTS, SaveSnapshot, LoadSnapshot, ListSnapshots, SnapshotInfo
+from src.cache import CacheMode, ReadCachedComponent, WriteCachedComponent
+from src.cache import ReadCachedMiss, WriteCachedMiss
+from src.jobs import StartJob, WriteJobResult, ReadJobResult
 from src.website import MatchUrlPatternToWebResults, GetCandidatesFromHints, GetCandidatesFromWebSearch, MatchUrlToDomains
-from src.type_hints import ScrapedComponentData, WebsiteEntry
+from src.website import CandidateWebsite, DomainFromUrl
+from src.type_hints import ScrapedComponentData, ScrapedFile, WebsiteEntry, ElementData
+from src.type_hints import FileConfigEntry, BlockConfig, Config, ComponentInput, ComponentKey, ScrapingReport
 
 
 logger = log.getLogger(__name__)
 logger.setLevel(log.INFO)
 
 
+# max number of results kept in memory, to copy them for duplicate components
+DUPLICATES_MEMORY = 1000
+
+
 # SCRAPING FROM WEBSITE
 # =====================
 
 
 class ComponentNotFoundError(Exception):
-    """Raised when a component is not found on the website."""
-    pass
+    """Raised when a component is not found on the website.
+    If inferred from a timeout waiting for elements, it is cached as a miss for a shorter time
+    (the page may be only slow, see WriteCachedMiss).
+    """
+
+    def __init__(self, *args: object, timeout: bool = False) -> None:
+        super().__init__(*args)
+        self.timeout = timeout
 
 
 @RetryOnException(on=InvalidSessionIdException, init=ResetBrowser)
+@Traced("manuCode", "domain")
 def ScrapeFromWebsite(
     manuCode: str,  
     entry: WebsiteEntry,
@@ -37,13 +70,21 @@ def ScrapeFromWebsite(
     matchedHints: list[str], # included in result on success
     format: t.Literal["html", "md", "txt"],
     closeBrowser: bool,
+    domain: str = "", # configured domain, for snapshots (default = domain of url)
+    cache: CacheMode = "use", # cache mode of downloaded files (see DownloadDirect)
 ) -> ScrapedComponentData:
-    """Scrapes data of a component from a website, retrying on session expiration."""
+    """Scrapes data of a component from a website, retrying on session expiration.
+    Timings of every phase are saved in the result (see MeasurePhase).
+    """
+    start = time.monotonic()
+    timings: dict[str, float] = {}
 
     # detects if url is a pattern (contains *)
     urlConfig = entry["url"] # type: ignore  # required field
+    SetSpanAttributes(domain=domain or DomainFromUrl(urlConfig))
     if "*" in urlConfig:
-        url = MatchUrlPatternToWebResults(urlConfig, manuCode, matchedHints)
+        with MeasurePhase(timings, "urlMatch"):
+            url = MatchUrlPatternToWebResults(urlConfig, manuCode, matchedHints)
         if url == "":
             raise ComponentNotFoundError("Unable to match url pattern to web search results")
 
@@ -52,22 +93,112 @@ def ScrapeFromWebsite(
         # formats url replacing {manuCode} with the provided manuCode
         url = urlConfig.format(manuCode=manuCode)
 
-    # opens browser, or gets existing one
-    driver = GetBrowser()
+    # gets fields and files config, filtering files by files parameter
+    fieldsConfig = entry.get("fields", {})
+    filesConfig = entry.get("files", {})
+    if files is not None:
+        # TODO: detect if some file tags are not configured, and show warning
+        filesConfig = {key: value for key, value in filesConfig.items() if key in files}
+
+    # selectors of elements to extract, for fields and files
+    selectors = list(fieldsConfig.values()) + \
+        [fileConfig["selector"] for fileConfig in filesConfig.values() if "selector" in fileConfig]
+
+    SetSpanAttributes(url=url)
+    CheckCancelled()
+    driver: t.Optional[webdriver.Firefox] = None
+    snapshotKey = (domain or DomainFromUrl(url), manuCode)
+
+    # loads page and extracts elements, with the configured engine
+    # NOTE: the website is visited within its politeness limits, until files are scraped
+    with VisitWebsite(snapshotKey[0], entry, timings):
+        if entry.get("engine", "browser") == "http":
+            elements = LoadPageWithHttp(url, entry, selectors, snapshotKey, timings)
+        else:
+            with MeasurePhase(timings, "browser"):
+                driver = GetBrowser()
+                SetResourceBlocking(driver, GetBlockConfig(entry, filesConfig))
+            elements = LoadPageWithBrowser(driver, url, entry, selectors, snapshotKey, timings)
+
+        # scrapes fields, if any configured
+        # NOTE: Markdown conversion goes on in background, while files are downloaded
+        logger.debug(f"Scraping {len(fieldsConfig)} fields...")
+        with MeasurePhase(timings, "fields"):
+            pendingFields = StartScrapeFields(driver, fieldsConfig, format, elements)
+
+        # scrapes files, as configured, waiting only for fields used in file paths and urls
+        logger.debug(f"Scraping {len(filesConfig)} files...")
+        with MeasurePhase(timings, "files"):
+            placeholders = GetFilePlaceholders(filesConfig)
+            scrapedFiles = ScrapeFiles(driver, basePath, filesConfig,
+                data = {
+                    **ResolveFields({key: value for key, value in pendingFields.items() if key in placeholders}),
+                    "manuCode": manuCode, "ext": "{ext}",
+                },
+                skipDirectDownload = entry.get("skipDirectDownload", False),
+                elements = elements,
+                cache = cache,
+            )
+
+    # closes browser, if configured
+    if closeBrowser:
+        CloseBrowser()
+
+    # waits for Markdown conversion, if any
+    with MeasurePhase(timings, "conversion"):
+        scrapedFields = ResolveFields(pendingFields)
+    
+    result: ScrapedComponentData = {
+        "manuCode": manuCode,
+        "matchedHints": matchedHints,
+        "url": url,
+        "fields": scrapedFields,
+        "files": scrapedFiles,
+        "timings": {**timings, "website": ElapsedSince(start)},
+    }
+    logger.info(f"Scraping for '{manuCode}' completed successfully")
+    return result
+
+
+def GetBlockConfig(entry: WebsiteEntry, filesConfig: dict[str, FileConfigEntry]) -> BlockConfig:
+    """Gets resources to block while loading the page, allowing images if an image file is requested."""
+    block: BlockConfig = entry.get("block", BLOCK_DEFAULT)
+
+    # detects image files, i.e. selectors targeting an img element (e.g. "div.gallery > img.main")
+    imagePattern = r"(^|[\s>+~])img([.#:\[][^\s>+~]*)?$"
+    selectors = [fileConfig.get("selector", "") for fileConfig in filesConfig.values()]
+    if any(re.search(imagePattern, part.strip()) for selector in selectors for part in selector.split(",")):
+        block = block.copy()
+        block["types"] = [type for type in block.get("types", []) if type != "image"]
+
+    return block
+
+
+def LoadPageWithBrowser(driver: webdriver.Firefox, url: str, entry: WebsiteEntry,
+    selectors: list[str], snapshotKey: tuple[str, str], timings: dict[str, float],
+) -> dict[str, t.Optional[ElementData]]:
+    """Navigates to the page with the browser, waiting for content or not-found page.
+    Returns data of the elements matching the selectors, extracted in a single browser call.
+    Raises ComponentNotFoundError if the component is not found.
+    Saves a snapshot of the rendered page (key: domain, manuCode), if configured.
+    Saves timings of navigation, wait and extraction.
+    """
 
     # navigates to the found url
     logger.info(f"Navigating to URL: {url}")
-    driver.get(url)
+    start = time.perf_counter()
+    with MeasurePhase(timings, "navigation"):
+        NavigateTo(driver, url)
     
-    # composes selector to wait for content or not found page
+    # selectors to wait for: not found page first, so that it takes priority
     waitSelector = entry["wait"] # type: ignore  # required field
     notFoundSelector = entry.get("notFound", "") # optional field
-    if notFoundSelector:
-        waitSelector += ", " + notFoundSelector
-    
-    # waits for page to load
+    waitSelectors = [notFoundSelector, waitSelector] if notFoundSelector else [waitSelector]
+
+    # waits for page to load (with the configured strategy), detecting which element appeared
     try:
-        WaitElement(driver, waitSelector) 
+        with MeasurePhase(timings, "wait"):
+            found = WaitElements(driver, waitSelectors, entry.get("pageLoad", "normal"))
     except RuntimeError as e:
 
         # raises error if no known element is found
@@ -79,92 +210,155 @@ def ScrapeFromWebsite(
         # if no notFound selector is configured, the timeout indicates page not found
         # this is not a configuration error, but an invalid component code
         else:
-            raise ComponentNotFoundError from e
+            raise ComponentNotFoundError(str(e), timeout=True) from e
+
+    logger.info(f"Page loaded in {time.perf_counter() - start:.2f} seconds " +
+        f"({GetBlockedCount()} requests blocked)")
 
     # detects not-found page, if configured
-    if notFoundSelector:
-        try: 
-            driver.find_element(By.CSS_SELECTOR, notFoundSelector)
-            raise ComponentNotFoundError("Detected component-not-found page")
-        except NoSuchElementException:
-            pass
-
-    # scrapes fields, if any configured
-    fieldsConfig = entry.get("fields", {})
-    logger.debug(f"Scraping {len(fieldsConfig)} fields...")
-    scrapedFields = ScrapeFields(driver, fieldsConfig, format)
-    
-    # gets files config, filtering by files parameter
-    filesConfig = entry.get("files", {})
-    if files is not None:
-        # TODO: detect if some file tags are not configured, and show warning
-        filesConfig = {key: value for key, value in filesConfig.items() if key in files}
+    if notFoundSelector and found == notFoundSelector:
+        raise ComponentNotFoundError("Detected component-not-found page")
+
+    # saves rendered page, if configured
+    if SAVE_SNAPSHOTS:
+        with MeasurePhase(timings, "snapshot"):
+            SaveSnapshot(*snapshotKey, driver.current_url, driver.page_source)
+
+    # extracts elements of all fields and files, in a single browser call
+    CheckCancelled()
+    with MeasurePhase(timings, "extraction"):
+        return ExtractElements(driver, selectors)
+
+
+def LoadPageWithHttp(url: str, entry: WebsiteEntry, selectors: list[str],
+    snapshotKey: tuple[str, str], timings: dict[str, float],
+) -> dict[str, t.Optional[ElementData]]:
+    """Fetches the page with HTTP, without browser, detecting not-found page.
+    Returns data of the elements matching the selectors, evaluated on the page source.
+    Raises ComponentNotFoundError if the component is not found.
+    Saves a snapshot of the page source (key: domain, manuCode), if configured.
+    Saves timings of fetch, parsing and extraction.
+    """
 
-    # scrapes files, as configured
-    logger.debug(f"Scraping {len(filesConfig)} files...")
-    scrapedFiles = ScrapeFiles(driver, basePath, filesConfig,
-        data = {**scrapedFields, "manuCode": manuCode, "ext": "{ext}"},
-        skipDirectDownload = entry.get("skipDirectDownload", False),
-    )
+    # fetches page, detecting not-found status codes
+    with MeasurePhase(timings, "fetch"):
+        response = FetchPage(url)
+    if response.status_code in [404, 410]:
+        raise ComponentNotFoundError(f"Page not found (HTTP {response.status_code})")
+    response.raise_for_status()
+    with MeasurePhase(timings, "parsing"):
+        document = ParseHtml(response.content)
 
-    # closes browser, if configured
-    if closeBrowser:
-        CloseBrowser()
-    
-    result: ScrapedComponentData = {
-        "manuCode": manuCode,
-        "matchedHints": matchedHints,
-        "url": url,
-        "fields": scrapedFields,
-        "files": scrapedFiles,
-    }
-    logger.info(f"Scraping for '{manuCode}' completed successfully")
-    return result
+    # detects not-found page, if configured
+    waitSelector = entry["wait"] # type: ignore  # required field
+    notFoundSelector = entry.get("notFound", "") # optional field
+    if notFoundSelector and document.select_one(notFoundSelector) is not None:
+        raise ComponentNotFoundError("Detected component-not-found page")
+
+    # detects missing content, as a wait timeout in the browser
+    if document.select_one(waitSelector) is None:
+        if notFoundSelector:
+            raise RuntimeError(
+                f"Could not find 'wait' nor 'notFound' element in page: {waitSelector}")
+        else:
+            raise ComponentNotFoundError(f"Element not found in page: {waitSelector}")
+
+    # saves page source, if configured
+    if SAVE_SNAPSHOTS:
+        with MeasurePhase(timings, "snapshot"):
+            SaveSnapshot(*snapshotKey, response.url, response.content)
 
+    # extracts elements of all fields and files, from the page source
+    # NOTE: urls are resolved against the final url, after redirects
+    with MeasurePhase(timings, "extraction"):
+        return ParseElements(document, selectors, response.url)
 
-def ScrapeFields(driver: webdriver.Firefox,
+
+def ScrapeFields(driver: t.Optional[webdriver.Firefox],
     fields: dict[str, str],
     format: t.Literal["html", "md", "txt"],
+    elements: t.Optional[dict[str, t.Optional[ElementData]]] = None,
 ) -> dict[str, t.Optional[str]]:
     """Scrape text data from the current page, using the specified css selectors.
     Input parameter "fields": dictionary with key=<field name>, value=<css selector>.
+    Input parameter "elements": already extracted elements (see ExtractElements), if any.
     Returns: dictionary with key=<field name>, value=<scraped data>
     If some element is not found, field value is set to None.
     """
+    return ResolveFields(StartScrapeFields(driver, fields, format, elements))
+
+
+def StartScrapeFields(driver: t.Optional[webdriver.Firefox],
+    fields: dict[str, str],
+    format: t.Literal["html", "md", "txt"],
+    elements: t.Optional[dict[str, t.Optional[ElementData]]] = None,
+) -> dict[str, Future[t.Optional[str]]]:
+    """Scrapes fields like ScrapeFields, returning futures with the data of every field.
+    Markdown conversion goes on in background (see ConvertToMarkdown), other formats are completed.
+    """
+
+    # extracts elements data, unless already extracted
+    if elements is None:
+        assert driver is not None, "Browser required to extract elements"
+        elements = ExtractElements(driver, list(fields.values()))
 
     # processes every field
-    scrapedData = {}
+    scrapedData: dict[str, Future[t.Optional[str]]] = {}
     for key, selector in fields.items():
 
-        # tries to find element
-        try:
-            element = driver.find_element(By.CSS_SELECTOR, selector)
-        except NoSuchElementException:
+        # checks if element was found
+        element = elements[selector]
+        if element is None:
             logger.info(f"Element for '{key}' field not found: {selector}")
-            scrapedData[key] = None
+            scrapedData[key] = CompletedFuture(None)
+            continue
+
+        # converts to Markdown in background
+        if format == "md":
+            scrapedData[key] = ConvertToMarkdown(element["html"] or "") # type: ignore
+            logger.info(f"Scraped data for '{key}', converting to Markdown...")
             continue
 
         # gets data in the specified format
-        if format in ["html", "md"]:
-            html = element.get_attribute("innerHTML") or ""
-            scrapedData[key] = html if format == "html" else h2t.html2text(html)
+        if format == "html":
+            value = element["html"] or ""
 
         # plain text (gets url if element has no text)
         elif format == "txt":
-            scrapedData[key] = element.text or element.get_attribute("href")
+            value = element["text"] or element["href"]
         else:
             raise ValueError(f"Invalid format: {format}")
         
-        logger.info(f"Scraped data for '{key}': {scrapedData[key]}")
+        logger.info(f"Scraped data for '{key}': {value}")
+        scrapedData[key] = CompletedFuture(value)
 
     return scrapedData
 
 
+def ResolveFields(fields: dict[str, Future[t.Optional[str]]]) -> dict[str, t.Optional[str]]:
+    """Waits for the data of the fields (see StartScrapeFields)."""
+    return {key: future.result() for key, future in fields.items()}
+
+
+def GetFilePlaceholders(files: dict[str, FileConfigEntry]) -> set[str]:
+    """Gets the names of placeholders in paths and urls of the files (e.g. {description})."""
+    templates = [template for fileConfig in files.values()
+        for template in [fileConfig.get("path", ""), fileConfig.get("url", "")]]
+    return {name for template in templates
+        for _, name, _, _ in string.Formatter().parse(template) if name}
+
+
 
 # SCRAPING TOOLS
 # ==============
 
 
+# scrapes in flight, by request (see ScrapeComponent)
+flights: dict[tuple, Future[ScrapedComponentData]] = {}
+flightsLock = threading.Lock()
+
+
+@Traced("manuCode", "hints")
 def ScrapeComponent(
     manuCode: str,
     hints: list[str] = [],
@@ -172,70 +366,326 @@ def ScrapeComponent(
     basePath: str = "",
     format:  t.Literal["html", "md", "txt"] = "txt",
     closeBrowser: bool = True,
+    race: int = 1,
+    cache: CacheMode = "use",
+    timings: bool = False,
 ) -> ScrapedComponentData:
-    """Scrapes data of a component from a website. See ScrapeComponents for more info."""
+    """Scrapes data of a component from a website. See ScrapeComponents for more info.
+    Concurrent identical requests (e.g. from different clients) share a single scrape and its result.
+    """
+    start = time.monotonic()
+
+    # joins the identical scrape in flight, if any, otherwise starts a new one
+    key = (manuCode, tuple(hints), None if files is None else tuple(sorted(files)), basePath, format, cache)
+    with flightsLock:
+        flight = flights.get(key)
+        isLeader = flight is None
+        if flight is None:
+            flight = flights[key] = Future()
+
+    if not isLeader:
+        logger.info(f"Waiting for scraping of '{manuCode}' already in progress...")
+        return CoalesceResult(flight.result(), ElapsedSince(start), timings)
+
+    # scrapes the component, sharing the result with identical requests
+    try:
+        result = ScrapeComponentWithTimings(manuCode, hints, files, basePath, format, closeBrowser, race, cache)
+        flight.set_result(result)
+    except BaseException as e:
+        flight.set_exception(e)
+        raise
+    finally:
+        with flightsLock:
+            del flights[key]
+    return result if timings else RemoveTimings(result)
+
+
+def CoalesceResult(result: ScrapedComponentData, waited: float, timings: bool) -> ScrapedComponentData:
+    """Copies the result of a scrape shared by identical requests.
+    Timings are replaced by the time spent waiting for the result (if requested),
+    so that they are not counted twice in summaries.
+    """
+    result = copy.deepcopy(RemoveTimings(result))
+    if timings:
+        result["timings"] = {"coalesced": waited}
+    return result
+
+
+def ScrapeComponentWithTimings(
+    manuCode: str,
+    hints: list[str],
+    files: t.Optional[list[str]],
+    basePath: str,
+    format:  t.Literal["html", "md", "txt"],
+    closeBrowser: bool,
+    race: int,
+    cache: CacheMode,
+) -> ScrapedComponentData:
+    """Scrapes data of a component from a website, including timings in the result."""
+    start = time.monotonic()
+    componentTimings: dict[str, float] = {}
+
+    def Complete(result: ScrapedComponentData) -> ScrapedComponentData:
+        """Adds timings of the component to the result."""
+        return {**result, "timings": {**componentTimings, **result.get("timings", {}),
+            "total": ElapsedSince(start)}}
 
     # reads configuration (website -> entry)
     config = ReadConfig()
 
-    # matches websites against hints, and sorts them by score
-    candidates = GetCandidatesFromHints(hints, config)
+    with MeasurePhase(componentTimings, "search"):
+        # matches websites against hints, and sorts them by score
+        candidates = GetCandidatesFromHints(hints, config)
 
-    # if fails, try web search
-    if len(candidates) == 0:
-        logger.info(f"No known website matching hints {hints}, trying web search...")
-        candidates = GetCandidatesFromWebSearch(manuCode, hints)
+        # if fails, try web search
+        if len(candidates) == 0:
+            logger.info(f"No known website matching hints {hints}, trying web search...")
+            candidates = GetCandidatesFromWebSearch(manuCode, hints)
 
     # if still no candidates, return error
     if len(candidates) == 0:
-        return {
+        return Complete({
             "manuCode": manuCode,
             "result": f"error: no known website found for '{manuCode}'. " + 
                 "Try using different hints, or add a new website to the config file.",
-        }
+        })
 
     # saves errors for each candidate website
     attempts: dict[str, str] = {} # website -> error message
 
-    # for each candidate website
+    # keeps only known websites (in config file)
+    knownCandidates: list[tuple[CandidateWebsite, str, WebsiteEntry]] = []
     for candidate in candidates:
-
-        # only for known websites (in config file)
         try:
             domain = MatchUrlToDomains(candidate.domain, list(config.keys()))
-            websiteEntry = config[domain]
+            knownCandidates.append((candidate, domain, config[domain]))
         except ValueError:
             logger.warning(f"Unknown candidate website '{candidate.domain}', skipping...")
             attempts[candidate.domain] = "Unknown candidate website"
-            continue
-    
-        # try to scrape from each one
-        try:
-            return ScrapeFromWebsite(manuCode, websiteEntry, files, basePath,
-                candidate.matchedHints, format, closeBrowser)
 
-        # skip to next candidate if component not found
-        except ComponentNotFoundError as e:
-            logger.info(f"Component '{manuCode}' not found on '{candidate.domain}'")
-            attempts[candidate.domain] = type(e).__name__ + ": " + str(e)
-            continue
-            
-        # returns error if something goes wrong
-        except Exception as e:
-            logger.error(f"Error during scraping '{manuCode}' from '{candidate.domain}': {e}")
-            attempts[candidate.domain] = type(e).__name__ + ": " + str(e)
+    # tries candidates in order, in groups of "race" candidates scraped at the same time
+    groupSize = max(race, 1)
+    for groupStart in range(0, len(knownCandidates), groupSize):
+        group = knownCandidates[groupStart:groupStart + groupSize]
+
+        # single candidate: scrapes with the current browser
+        if len(group) == 1:
+            candidate, domain, websiteEntry = group[0]
+            result, error = TryScrapeFromWebsite(manuCode, candidate, domain, websiteEntry,
+                files, basePath, format, closeBrowser, cache)
+            if result is not None:
+                return Complete(result)
+            attempts[candidate.domain] = error
             continue
 
+        # multiple candidates: races them, each with its own browser
+        result = RaceCandidates(manuCode, group, files, basePath, format, closeBrowser,
+            cache, attempts)
+        if result is not None:
+            if closeBrowser:
+                CloseBrowser()
+            return Complete(result)
+
     # closes browser, if configured
     if closeBrowser:
         CloseBrowser()
     
     # if all fails, return error
-    return {
+    return Complete({
         "manuCode": manuCode,
         "result": f"error: unable to scrape '{manuCode}' from any known website. " +
             " | ".join(f"[{domain}]: {error}" for domain, error in attempts.items()),
-    }
+    })
+
+
+def TryScrapeFromWebsite(
+    manuCode: str,
+    candidate: CandidateWebsite,
+    domain: str,
+    entry: WebsiteEntry,
+    files: t.Optional[list[str]],
+    basePath: str,
+    format: t.Literal["html", "md", "txt"],
+    closeBrowser: bool,
+    cache: CacheMode,
+) -> tuple[t.Optional[ScrapedComponentData], str]:
+    """Tries to scrape data of a component from a candidate website, using cache if enabled.
+    Returns a tuple with the scraped data (None on failure) and the error message.
+    """
+
+    # uses cached result or cached miss, if any
+    if cache == "use":
+        start = time.monotonic()
+        result = ReadCachedComponent(manuCode, domain, format, entry, files, basePath)
+        if result is not None:
+            return {**result, "matchedHints": candidate.matchedHints,
+                "timings": {"cache": ElapsedSince(start)}}, ""
+
+        error = ReadCachedMiss(manuCode, domain, entry)
+        if error is not None:
+            logger.info(f"Component '{manuCode}' not found on '{candidate.domain}' (cached)")
+            return None, "(cached miss) " + error
+
+    # try to scrape from the candidate website
+    try:
+        result = ScrapeFromWebsite(manuCode, entry, files, basePath,
+            candidate.matchedHints, format, closeBrowser, domain, cache)
+
+        # saves result to cache, if enabled (without timings of this run)
+        if cache != "bypass":
+            WriteCachedComponent(manuCode, domain, format, entry, files, basePath, RemoveTimings(result))
+        return result, ""
+
+    # skip to next candidate if component not found
+    except ComponentNotFoundError as e:
+        logger.info(f"Component '{manuCode}' not found on '{candidate.domain}'")
+        error = type(e).__name__ + ": " + str(e)
+
+        # saves miss to cache, if enabled (timeouts for a shorter time, the page may be only slow)
+        if cache != "bypass":
+            WriteCachedMiss(manuCode, domain, entry, error, timeout=e.timeout)
+        return None, error
+
+    # stops if a higher-priority candidate already succeeded
+    except ScrapingCancelledError as e:
+        logger.info(f"Scraping '{manuCode}' from '{candidate.domain}' cancelled")
+        return None, type(e).__name__ + ": " + str(e)
+
+    # returns error if something goes wrong
+    except Exception as e:
+        logger.error(f"Error during scraping '{manuCode}' from '{candidate.domain}': {e}")
+        return None, type(e).__name__ + ": " + str(e)
+
+
+def RaceCandidates(
+    manuCode: str,
+    candidates: list[tuple[CandidateWebsite, str, WebsiteEntry]],
+    files: t.Optional[list[str]],
+    basePath: str,
+    format: t.Literal["html", "md", "txt"],
+    closeBrowser: bool,
+    cache: CacheMode,
+    attempts: dict[str, str],
+) -> t.Optional[ScrapedComponentData]:
+    """Scrapes data of a component from multiple candidate websites at the same time.
+    Every candidate uses its own browser: the first one uses the current slot, the others pool slots.
+    Returns the result of the highest-priority (first) candidate that succeeds,
+    cancelling lower-priority attempts as soon as a candidate succeeds.
+    Errors of failed candidates are saved in attempts. Returns None if all fail.
+    """
+
+    parentSlot = GetBrowserSlot()
+    parentSpan = GetCurrentSpan()
+    cancelEvents = [threading.Event() for _ in candidates]
+
+    def Attempt(index: int) -> tuple[t.Optional[ScrapedComponentData], str]:
+        """Scrapes from a candidate, in its own browser slot."""
+        candidate, domain, websiteEntry = candidates[index]
+        SetCancelEvent(cancelEvents[index])
+        SetCurrentSpan(parentSpan)
+        try:
+            # first candidate: uses the current slot (closed by the caller, if configured)
+            if index == 0:
+                SetBrowserSlot(parentSlot)
+                return TryScrapeFromWebsite(manuCode, candidate, domain, websiteEntry,
+                    files, basePath, format, closeBrowser=False, cache=cache)
+
+            # other candidates: lease pool slots, closing browser if configured
+            with PooledBrowserSlot():
+                try:
+                    return TryScrapeFromWebsite(manuCode, candidate, domain, websiteEntry,
+                        files, basePath, format, closeBrowser=False, cache=cache)
+                finally:
+                    if closeBrowser:
+                        CloseBrowser()
+        finally:
+            SetCancelEvent(None)
+            SetCurrentSpan(None)
+
+    logger.info(f"Racing {len(candidates)} candidates for '{manuCode}': " +
+        ", ".join(candidate.domain for candidate, _, _ in candidates))
+
+    # starts all attempts at the same time
+    with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        futures = [executor.submit(Attempt, index) for index in range(len(candidates))]
+        pending: set[Future] = set(futures)
+        bestIndex = len(candidates) # index of best successful candidate, until now
+
+        # waits until no pending attempt can beat the best successful one
+        while any(futures.index(future) < bestIndex for future in pending):
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures.index(future)
+                result, _ = future.result()
+
+                # cancels lower-priority attempts, on success
+                if result is not None and index < bestIndex:
+                    bestIndex = index
+                    for event in cancelEvents[index + 1:]:
+                        event.set()
+
+        # NOTE: exiting the executor waits for cancelled attempts to stop
+
+    # saves errors of the candidates tried before the best one
+    for index, future in enumerate(futures[:bestIndex]):
+        candidate, _, _ = candidates[index]
+        attempts[candidate.domain] = future.result()[1]
+
+    # returns the best result, if any
+    if bestIndex == len(candidates):
+        return None
+    logger.info(f"Candidate '{candidates[bestIndex][0].domain}' won the race for '{manuCode}'")
+    return futures[bestIndex].result()[0]
+
+
+# return type depends on timings (see ScrapeComponents)
+@t.overload
+def ScrapeComponents(
+    manuCodes: list[str],
+    hints: list[str] = ...,
+    files: t.Optional[list[str]] = ...,
+    basePath: str = ...,
+    format: t.Literal["html", "md", "txt"] = ...,
+    closeBrowser: bool = ...,
+    workers: int = ...,
+    race: int = ...,
+    cache: CacheMode = ...,
+    timings: t.Literal[False] = ...,
+    jobId: str = ...,
+) -> list[ScrapedComponentData]: ...
+
+
+@t.overload
+def ScrapeComponents(
+    manuCodes: list[str],
+    hints: list[str] = ...,
+    files: t.Optional[list[str]] = ...,
+    basePath: str = ...,
+    format: t.Literal["html", "md", "txt"] = ...,
+    closeBrowser: bool = ...,
+    workers: int = ...,
+    race: int = ...,
+    cache: CacheMode = ...,
+    *,
+    timings: t.Literal[True],
+    jobId: str = ...,
+) -> ScrapingReport: ...
+
+
+@t.overload
+def ScrapeComponents(
+    manuCodes: list[str],
+    hints: list[str] = ...,
+    files: t.Optional[list[str]] = ...,
+    basePath: str = ...,
+    format: t.Literal["html", "md", "txt"] = ...,
+    closeBrowser: bool = ...,
+    workers: int = ...,
+    race: int = ...,
+    cache: CacheMode = ...,
+    timings: bool = ...,
+    jobId: str = ...,
+) -> list[ScrapedComponentData] | ScrapingReport: ...
 
 
 def ScrapeComponents(
@@ -245,7 +695,12 @@ def ScrapeComponents(
     basePath: str = "",
     format: t.Literal["html", "md", "txt"] = "txt",
     closeBrowser: bool = True,
-) -> list[ScrapedComponentData]:
+    workers: int = BROWSER_WORKERS,
+    race: int = 1,
+    cache: CacheMode = "use",
+    timings: bool = False,
+    jobId: str = "",
+) -> list[ScrapedComponentData] | ScrapingReport:
     """Scrapes data of components from configured websites.
     Parameters:
     - manuCodes: list of manufacturer codes (required)
@@ -254,14 +709,298 @@ def ScrapeComponents(
     - basePath: base path to save the files
     - format: format of the data to scrape (html, md, txt)
     - closeBrowser: whether to close the browser after scraping (default = True)
+    - workers: number of browsers scraping in parallel (default = 1)
+    - race: number of candidate websites scraped at the same time (default = 1)
+    - cache: "use" cached results, "refresh" them, or "bypass" the cache (default = use)
+    - timings: whether to include seconds spent in every phase, in results, and their summary (default = False)
+    - jobId: id of a checkpointed job, to resume it after a crash (default = no job, see StartJob)
 
     In hints, you can specify a (mixed) list of:
     - websites: e.g. example.com, do not include www. or http:// or https://
     - keywords: entries to search in config file, e.g. component brands
+
+    Returns the list of results, in input order.
+    With timings, returns {"components": [results], "timings": {domain: {phase: summary}}},
+    with a summary of every phase (count, p50, p95, max seconds) for each website domain.
+    """
+
+    # collects results, sorting them in input order
+    results: list[ScrapedComponentData] = [{} for _ in manuCodes]
+    for index, result in IterScrapeResults(manuCodes, hints, files, basePath, format,
+        closeBrowser, workers, race, cache, timings, jobId):
+        results[index] = result
+
+    # adds summary of timings, if requested
+    if timings:
+        return {"components": results, "timings": SummarizeTimings(results)}
+    return results
+
+
+def IterScrapeComponents(
+    manuCodes: t.Iterable[ComponentInput],
+    hints: list[str] = [],
+    files: t.Optional[list[str]] = None,
+    basePath: str = "",
+    format: t.Literal["html", "md", "txt"] = "txt",
+    closeBrowser: bool = True,
+    workers: int = BROWSER_WORKERS,
+    race: int = 1,
+    cache: CacheMode = "use",
+    timings: bool = False,
+    jobId: str = "",
+) -> t.Iterator[ScrapedComponentData]:
+    """Scrapes data of components like ScrapeComponents, yielding every result as soon as it is ready.
+    With multiple workers, results are yielded in completion order, not input order.
+    Components can be tuples (manuCode, hints), with hints added to the common ones for that component.
+    """
+    for _, result in IterScrapeResults(manuCodes, hints, files, basePath, format,
+        closeBrowser, workers, race, cache, timings, jobId):
+        yield result
+
+
+def IterScrapeResults(
+    manuCodes: t.Iterable[ComponentInput],
+    hints: list[str],
+    files: t.Optional[list[str]],
+    basePath: str,
+    format: t.Literal["html", "md", "txt"],
+    closeBrowser: bool,
+    workers: int,
+    race: int,
+    cache: CacheMode,
+    timings: bool = False,
+    jobId: str = "",
+) -> t.Generator[tuple[int, ScrapedComponentData], None, None]:
+    """Scrapes data of components, yielding tuples (input index, result) in completion order.
+    With a single worker, components are scraped with the browser of the current slot, as ScrapeComponent.
+    With multiple workers, every component is scraped with a browser leased from the pool,
+    kept open between components.
+    Only a limited number of components is queued ahead of workers, to bound memory usage.
+    Duplicate components are scraped once, yielding a copy of the result for every duplicate
+    (for duplicates far apart, only if the result is still in memory, see DUPLICATES_MEMORY).
+    With a job id, every result is recorded in the job journal, and components
+    already scraped in a previous run of the job are not scraped again (see StartJob).
+    """
+
+    def Scrape(key: ComponentKey) -> ScrapedComponentData:
+        """Scrapes a component with the browser of the current slot, or a pool browser (multiple workers)."""
+        manuCode, componentHints = key
+        with PooledBrowserSlot() if workers > 1 else contextlib.nullcontext():
+            return ScrapeComponent(manuCode, hints + list(componentHints), files, basePath, format,
+                closeBrowser=False, race=race, cache=cache, timings=timings)
+
+    # duplicate components, and latest results (to copy for later duplicates)
+    waiting: dict[ComponentKey, list[int]] = {} # component -> input indexes of duplicates
+    completed: OrderedDict[ComponentKey, ScrapedComponentData] = OrderedDict() # component -> result
+    ready: list[tuple[int, ScrapedComponentData]] = [] # duplicates of completed components
+
+    # resumes the job, if any: components scraped in previous runs are read from the journal
+    journaled: dict[ComponentKey, int] = {} # component -> position in journal
+    if jobId:
+        journaled = StartJob(jobId, {"hints": hints, "files": files, "basePath": basePath, "format": format})
+
+    def UniqueComponents() -> t.Iterator[tuple[int, ComponentKey]]:
+        """Enumerates components to scrape, setting aside duplicates and components in the journal."""
+        for index, component in enumerate(manuCodes):
+            key = (component, ()) if isinstance(component, str) else (component[0], tuple(component[1]))
+            if key in journaled:
+                ready.append((index, ReadJobResult(jobId, journaled[key])))
+            elif key in completed:
+                ready.append((index, CoalesceResult(completed[key], 0, timings)))
+            elif key in waiting:
+                waiting[key].append(index)
+            else:
+                waiting[key] = []
+                yield index, key
+
+    def Complete(index: int, key: ComponentKey, result: ScrapedComponentData,
+    ) -> t.Iterator[tuple[int, ScrapedComponentData]]:
+        """Yields the result of a component, then copies for its duplicates, and other ready duplicates."""
+        completed[key] = result
+        while len(completed) > DUPLICATES_MEMORY:
+            completed.popitem(last=False)
+        if jobId:
+            WriteJobResult(jobId, *key, RemoveTimings(result))
+        yield index, result
+        for duplicate in waiting.pop(key):
+            yield duplicate, CoalesceResult(result, 0, timings)
+        while ready:
+            yield ready.pop(0)
+
+    components = UniqueComponents()
+    try:
+        # single worker: scrapes components one after another
+        if workers <= 1:
+            for index, key in components:
+                yield from Complete(index, key, Scrape(key))
+            yield from ready
+            return
+
+        # configures politeness limits of websites, and predicts websites of components
+        config = ReadConfig()
+        for domain, entry in config.items():
+            GetLimiter(domain).Configure(entry)
+        candidates: dict[tuple[str, ...], list[CandidateWebsite]] = {} # component hints -> candidates
+
+        # multiple workers: spreads components across workers, each one with its own browser
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            queued: list[tuple[int, ComponentKey, str]] = [] # input index, component, predicted website
+            scheduled: dict[str, int] = {} # website -> components running or queued to workers
+            pending: dict[Future, tuple[int, ComponentKey, str]] = {} # future -> same as queued
+
+            def Submit() -> None:
+                """Submits the next component, interleaving websites within their limits."""
+                for index, key in itertools.islice(components, SCHEDULER_LOOKAHEAD - len(queued)):
+                    manuCode, componentHints = key
+                    if componentHints not in candidates:
+                        candidates[componentHints] = GetCandidatesFromHints(hints + list(componentHints), config)
+                    queued.append((index, key,
+                        PredictWebsite(manuCode, candidates[componentHints], config, cache)))
+                if queued:
+                    index, key, domain = queued.pop(
+                        PickNextComponent([domain for _, _, domain in queued], scheduled))
+                    scheduled[domain] = scheduled.get(domain, 0) + 1
+                    pending[executor.submit(Scrape, key)] = (index, key, domain)
+
+            # queues components ahead of workers, then one for each completed component
+            for _ in range(2 * workers):
+                Submit()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, key, domain = pending.pop(future)
+                    scheduled[domain] -= 1
+                    Submit()
+                    yield from Complete(index, key, future.result())
+            yield from ready
+
+        # stops queued components, if iteration is interrupted
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    # closes browsers, if configured, after all components are scraped
+    # NOTE: pool browsers left open by previous calls are closed too
+    finally:
+        if closeBrowser:
+            if workers <= 1:
+                CloseBrowser()
+            CloseIdleBrowsers()
+
+
+def PredictWebsite(manuCode: str, candidates: list[CandidateWebsite], config: Config,
+    cache: CacheMode,
+) -> str:
+    """Predicts the website a component will be scraped from, for scheduling:
+    the first known candidate, skipping cached misses. Returns "" if unknown (e.g. web search).
     """
-    return [
-        ScrapeComponent(manuCode, hints, files, basePath, format,
-            # if configured, closes browser only after all components are scraped
-            closeBrowser=closeBrowser and codeIndex == len(manuCodes) - 1)
-        for codeIndex, manuCode in enumerate(manuCodes)
-    ]
+    for candidate in candidates:
+        try:
+            domain = MatchUrlToDomains(candidate.domain, list(config.keys()))
+        except ValueError:
+            continue
+        if cache == "use" and ReadCachedMiss(manuCode, domain, config[domain]) is not None:
+            continue
+        return domain
+    return ""
+
+
+
+# RE-EXTRACTION FROM SNAPSHOTS
+# ============================
+
+
+def ReExtractComponents(
+    manuCodes: t.Optional[list[str]] = None,
+    domain: str = "",
+    files: t.Optional[list[str]] = None,
+    format: t.Literal["html", "md", "txt"] = "txt",
+    workers: int = 1,
+) -> list[ScrapedComponentData]:
+    """Re-extracts data of components from saved page snapshots, without browser or network.
+    Uses the current config, so that fixed selectors can be applied to already scraped pages.
+    Files are not downloaded, only their urls are extracted.
+    Parameters:
+    - manuCodes: manufacturer codes to re-extract (None = all saved snapshots)
+    - domain: configured website to re-extract from (empty = all websites)
+    - files: list of file tags to extract (None = all configured files)
+    - format: format of the data to extract (html, md, txt)
+    - workers: number of processes parsing snapshots in parallel (default = 1)
+    """
+
+    # reads configuration and snapshots to re-extract
+    config = ReadConfig()
+    snapshots = ListSnapshots(domain, manuCodes)
+    logger.info(f"Re-extracting {len(snapshots)} snapshots...")
+
+    # gets config entry of every snapshot, if the website is still configured
+    entries: list[t.Optional[WebsiteEntry]] = []
+    for snapshot in snapshots:
+        try:
+            entries.append(config[MatchUrlToDomains(snapshot.domain, list(config.keys()))])
+        except ValueError:
+            entries.append(None)
+
+    # single worker: parses snapshots one after another
+    filesArgs: list[t.Optional[list[str]]] = [files] * len(snapshots)
+    formatArgs: list[t.Literal["html", "md", "txt"]] = [format] * len(snapshots)
+    if workers <= 1:
+        return list(map(ReExtractSnapshot, snapshots, entries, filesArgs, formatArgs))
+
+    # multiple workers: parses snapshots in separate processes (parsing is CPU-bound)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(ReExtractSnapshot, snapshots, entries, filesArgs, formatArgs, chunksize=16))
+
+
+def ReExtractSnapshot(
+    snapshot: SnapshotInfo,
+    entry: t.Optional[WebsiteEntry],
+    files: t.Optional[list[str]],
+    format: t.Literal["html", "md", "txt"],
+) -> ScrapedComponentData:
+    """Re-extracts data of a component from a page snapshot, using the website config entry."""
+
+    if entry is None:
+        return {
+            "manuCode": snapshot.manuCode,
+            "result": f"error: website '{snapshot.domain}' not found in config",
+        }
+
+    try:
+        # gets fields and files config, filtering files by files parameter
+        fieldsConfig = entry.get("fields", {})
+        filesConfig = entry.get("files", {})
+        if files is not None:
+            filesConfig = {key: value for key, value in filesConfig.items() if key in files}
+
+        # parses snapshot, extracting elements of all fields and files
+        selectors = list(fieldsConfig.values()) + \
+            [fileConfig["selector"] for fileConfig in filesConfig.values() if "selector" in fileConfig]
+        document = ParseHtml(LoadSnapshot(snapshot.hash))
+        elements = ParseElements(document, selectors, snapshot.url)
+
+        # scrapes fields, without browser
+        scrapedFields = ScrapeFields(None, fieldsConfig, format, elements)
+
+        # gets file urls, without downloading files
+        data = {**scrapedFields, "manuCode": snapshot.manuCode, "ext": "{ext}"}
+        scrapedFiles: dict[str, ScrapedFile] = {}
+        for tag, fileConfig in filesConfig.items():
+            try:
+                url, _ = GetFileUrlAndTagName(None, fileConfig, data, elements)
+                scrapedFiles[tag] = {"url": url, "result": "skipped: not downloaded in re-extraction"}
+            except Exception as e:
+                scrapedFiles[tag] = {"result": f"error: {e}"}
+
+    # returns error if something goes wrong (e.g. missing snapshot object)
+    except Exception as e:
+        logger.error(f"Error re-extracting '{snapshot.manuCode}' from '{snapshot.domain}': {e}")
+        return {"manuCode": snapshot.manuCode, "result": f"error: {type(e).__name__}: {e}"}
+
+    return {
+        "manuCode": snapshot.manuCode,
+        "result": "success",
+        "url": snapshot.url,
+        "fields": scrapedFields,
+        "files": scrapedFiles,
+    }
@@ -0,0 +1,127 @@
+"""Snapshots of rendered pages, to re-extract data without browser."""
+
+# Snapshots are stored compressed (gzip) and content-addressed (sha256 of the page source),
+# so that identical pages are stored only once. An index maps every (domain, manuCode)
+# to the latest snapshot of its page, together with the page url (to resolve links).
+#
+# Snapshots directory structure:
+# - index.sqlite: index of snapshots
+# - objects/<first 2 chars of hash>/<hash>.html.gz: compressed page sources
+
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import logging as log
+import pathlib as pl
+import typing as t
+from contextlib import closing
+
+
+logger = log.getLogger(__name__)
+logger.setLevel(log.INFO)
+
+
+# snapshots directory in the root of the project
+SNAPSHOT_DIR = pl.Path(__file__).parent.parent / "snapshots"
+
+# whether to save a snapshot of every page scraped successfully
+SAVE_SNAPSHOTS = False
+
+# max manuCodes in a single index query (SQLite limits the variables in a query, 999 in old versions)
+QUERY_CHUNK_SIZE = 500
+
+# serializes index access from multiple threads
+snapshotsLock = threading.Lock()
+
+
+class SnapshotInfo(t.NamedTuple):
+    """Index entry of a page snapshot."""
+    domain: str
+    manuCode: str
+    hash: str
+    url: str
+    created: float
+
+
+def OpenIndex() -> sqlite3.Connection:
+    """Opens the snapshots index, creating it if needed."""
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(SNAPSHOT_DIR / "index.sqlite", timeout=30)
+    conn.execute("""CREATE TABLE IF NOT EXISTS snapshots (
+        domain TEXT NOT NULL,
+        manuCode TEXT NOT NULL,
+        hash TEXT NOT NULL,
+        url TEXT NOT NULL,
+        created REAL NOT NULL,
+        PRIMARY KEY (domain, manuCode)
+    )""")
+    return conn
+
+
+def GetObjectPath(hash: str) -> pl.Path:
+    """Gets the path of the compressed page source with the specified hash."""
+    return SNAPSHOT_DIR / "objects" / hash[:2] / f"{hash}.html.gz"
+
+
+def SaveSnapshot(domain: str, manuCode: str, url: str, html: str | bytes) -> str:
+    """Saves the source of a page, indexed by domain and manuCode. Returns the content hash."""
+
+    # hashes page source, to address its content
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    hash = hashlib.sha256(html).hexdigest()
+
+    # writes compressed source, unless already stored
+    # NOTE: writes to a temporary file first, to avoid partial files on crash
+    objectPath = GetObjectPath(hash)
+    if not objectPath.exists():
+        objectPath.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=objectPath.parent, delete=False) as file:
+            file.write(gzip.compress(html))
+        os.replace(file.name, objectPath)
+
+    # indexes snapshot, replacing older one
+    with snapshotsLock, closing(OpenIndex()) as conn, conn:
+        conn.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+            (domain, manuCode, hash, url, time.time()))
+
+    logger.info(f"Saved snapshot of '{manuCode}' on '{domain}': {hash[:12]}")
+    return hash
+
+
+def LoadSnapshot(hash: str) -> bytes:
+    """Loads the source of a page, by content hash."""
+    with gzip.open(GetObjectPath(hash), "rb") as file:
+        return file.read()
+
+
+def ListSnapshots(domain: str = "", manuCodes: t.Optional[list[str]] = None) -> list[SnapshotInfo]:
+    """Lists indexed snapshots, filtering by domain and manuCodes, if specified.
+    Many manuCodes are queried in chunks of QUERY_CHUNK_SIZE.
+    """
+
+    # splits unique manuCodes in chunks (a single query without manuCodes filter)
+    chunks: list[t.Optional[list[str]]] = [None]
+    if manuCodes is not None:
+        uniqueCodes = list(dict.fromkeys(manuCodes))
+        chunks = [uniqueCodes[i:i + QUERY_CHUNK_SIZE] for i in range(0, len(uniqueCodes), QUERY_CHUNK_SIZE)]
+
+    rows: list[tuple] = []
+    with snapshotsLock, closing(OpenIndex()) as conn:
+        for chunk in chunks:
+            query = "SELECT domain, manuCode, hash, url, created FROM snapshots WHERE 1 = 1"
+            params: list[str] = []
+            if domain:
+                query += " AND domain = ?"
+                params.append(domain)
+            if chunk is not None:
+                query += f" AND manuCode IN ({', '.join('?' for _ in chunk)})"
+                params.extend(chunk)
+            rows.extend(conn.execute(query, params).fetchall())
+
+    snapshots = [SnapshotInfo(*row) for row in rows]
+    return sorted(snapshots, key=lambda snapshot: (snapshot.domain, snapshot.manuCode))
@@ -0,0 +1,78 @@
+"""Timings of scraping phases, to find slow websites and operations."""
+
+# Every scraping phase (web search, navigation, wait, extraction, downloads...) is measured
+# with a monotonic clock, and saved in the "timings" block of results, in seconds.
+# Timings of many results can be summarized with percentiles for each website domain.
+
+import time
+import math
+import contextlib
+import typing as t
+
+from src.website import DomainFromUrl
+from src.type_hints import ScrapedComponentData, ScrapedFile, TimingsSummary
+
+
+@contextlib.contextmanager
+def MeasurePhase(timings: dict[str, float], phase: str) -> t.Iterator[None]:
+    """Measures the duration of a phase, adding it to timings (also on errors).
+    Repeated phases are summed up.
+    """
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        timings[phase] = round(timings.get(phase, 0) + time.monotonic() - start, 3)
+
+
+def ElapsedSince(start: float) -> float:
+    """Gets the seconds elapsed since a monotonic start time, rounded as in timings."""
+    return round(time.monotonic() - start, 3)
+
+
+def RemoveTimings(result: ScrapedComponentData) -> ScrapedComponentData:
+    """Gets a copy of the result without timings, also in files."""
+    result = result.copy()
+    result.pop("timings", None)
+    if "files" in result:
+        files: dict[str, ScrapedFile] = {}
+        for tag, file in result["files"].items():
+            files[tag] = file.copy()
+            files[tag].pop("timings", None)
+        result["files"] = files
+    return result
+
+
+def Percentile(values: list[float], percentile: float) -> float:
+    """Gets the percentile of the values, with the nearest-rank method."""
+    values = sorted(values)
+    rank = max(math.ceil(percentile / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def SummarizeTimings(results: list[ScrapedComponentData]) -> dict[str, dict[str, TimingsSummary]]:
+    """Summarizes timings of scraped components, for each website domain and phase.
+    Results without url (failed) are grouped in the empty domain.
+    Returns dictionary: domain -> phase -> summary (count, p50, p95, max)
+    """
+
+    # collects timings of every phase, for each domain
+    phases: dict[str, dict[str, list[float]]] = {}
+    for result in results:
+        url = result.get("url", "")
+        domain = DomainFromUrl(url) if url else ""
+        for phase, seconds in result.get("timings", {}).items():
+            phases.setdefault(domain, {}).setdefault(phase, []).append(seconds)
+
+    # computes percentiles of every phase
+    summary: dict[str, dict[str, TimingsSummary]] = {}
+    for domain, domainPhases in sorted(phases.items()):
+        summary[domain] = {}
+        for phase, values in domainPhases.items():
+            summary[domain][phase] = {
+                "count": len(values),
+                "p50": Percentile(values, 50),
+                "p95": Percentile(values, 95),
+                "max": max(values),
+            }
+    return summary
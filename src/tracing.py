@@ -0,0 +1,277 @@
+"""Tracing of scraping operations, exported as JSON lines to profile scraping runs."""
+
+# Every traced operation (span) records its duration and outcome, the domain and manuCode
+# it works on, and the span that called it (parent). All spans of a component share a trace id.
+# Spans are written to a rotating JSONL file when they end, if TRACING is enabled.
+#
+# Summarize trace files with the analyzer (slowest websites and operations, flame-style stacks):
+#   python -m src.tracing traces/trace.jsonl [--folded stacks.txt] [--top 10]
+# Folded stacks can be rendered with flamegraph tools (e.g. flamegraph.pl, speedscope).
+
+import os
+import sys
+import json
+import time
+import inspect
+import functools
+import argparse
+import threading
+import logging as log
+import logging.handlers
+import pathlib as pl
+import typing as t
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+
+# whether to write spans to the trace file
+TRACING = False
+
+# trace file in the root of the project, rotated when too big (keeping a few backups)
+TRACE_FILE = pl.Path(__file__).parent.parent / "traces" / "trace.jsonl"
+TRACE_MAX_BYTES = 10 * 2**20
+TRACE_BACKUPS = 5
+
+# attributes copied from parent spans, if not set
+INHERITED_ATTRIBUTES = ["domain", "manuCode"]
+
+# writer of spans (thread-safe, rotating), opened on first span
+traceLogger: t.Optional[log.Logger] = None
+traceLock = threading.Lock()
+
+# current span of each thread
+local = threading.local()
+
+
+@dataclass
+class Span:
+    """Traced operation. Attributes and outcome can be changed until it ends."""
+    name: str
+    trace: str
+    id: str
+    parent: t.Optional[str]
+    attributes: dict[str, t.Any] = field(default_factory=dict)
+    outcome: str = "ok"
+
+
+
+# SPANS
+# =====
+
+
+def GetCurrentSpan() -> t.Optional[Span]:
+    """Gets the span of the current thread, if any."""
+    return getattr(local, "span", None)
+
+
+def SetCurrentSpan(span: t.Optional[Span]) -> None:
+    """Sets the span of the current thread. Used to continue traces in worker threads."""
+    local.span = span
+
+
+def SetSpanAttributes(**attributes: t.Any) -> None:
+    """Sets attributes of the span of the current thread, if any."""
+    span = GetCurrentSpan()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+@contextmanager
+def TraceSpan(name: str, **attributes: t.Any) -> t.Iterator[Span]:
+    """Traces an operation, as child of the current span of the thread.
+    The outcome is "error" if an exception is raised, with its type in the error attribute.
+    Does nothing if tracing is disabled.
+    """
+    if not TRACING:
+        yield Span(name, "", "", None, attributes)
+        return
+
+    # creates span, inheriting trace and attributes from the parent
+    parent = GetCurrentSpan()
+    for key in INHERITED_ATTRIBUTES:
+        if parent is not None and key in parent.attributes and attributes.get(key) is None:
+            attributes[key] = parent.attributes[key]
+    id = os.urandom(8).hex()
+    span = Span(name, parent.trace if parent else id, id, parent.id if parent else None, attributes)
+
+    SetCurrentSpan(span)
+    start, wallStart = time.monotonic(), time.time()
+    try:
+        yield span
+    except BaseException as e:
+        span.outcome = "error"
+        span.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        SetCurrentSpan(parent)
+        WriteSpan(span, wallStart, time.monotonic() - start)
+
+
+def Traced(*argNames: str) -> t.Callable:
+    """Decorator that traces every call of a function, with some arguments as attributes.
+    Results with an "error..." result (e.g. failed downloads) have outcome "error".
+    Example: @Traced("manuCode")
+    """
+
+    def decorator(func: t.Callable) -> t.Any:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def decorated(*args, **kwargs) -> t.Any:
+            if not TRACING:
+                return func(*args, **kwargs)
+
+            # gets attributes from arguments
+            arguments = signature.bind(*args, **kwargs).arguments
+            attributes = {name: arguments[name] for name in argNames if name in arguments}
+
+            with TraceSpan(func.__name__, **attributes) as span:
+                result = func(*args, **kwargs)
+                if isinstance(result, dict) and str(result.get("result", "")).startswith("error"):
+                    span.outcome = "error"
+                return result
+
+        return decorated
+    return decorator
+
+
+def WriteSpan(span: Span, start: float, duration: float) -> None:
+    """Writes the span to the trace file, as a JSON line."""
+    global traceLogger
+
+    # opens the trace file, on first span
+    with traceLock:
+        if traceLogger is None:
+            TRACE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(TRACE_FILE,
+                maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUPS, encoding="utf-8")
+            handler.setFormatter(log.Formatter("%(message)s"))
+            traceLogger = log.getLogger(__name__ + ".spans")
+            traceLogger.setLevel(log.INFO)
+            traceLogger.propagate = False
+            traceLogger.addHandler(handler)
+
+    traceLogger.info(json.dumps({
+        "trace": span.trace,
+        "id": span.id,
+        "parent": span.parent,
+        "name": span.name,
+        "start": round(start, 6),
+        "duration": round(duration, 6),
+        "outcome": span.outcome,
+        "thread": threading.current_thread().name,
+        "attributes": span.attributes,
+    }, default=str))
+
+
+def CloseTracing() -> None:
+    """Closes the trace file. The next span opens it again (e.g. after changing TRACE_FILE)."""
+    global traceLogger
+    with traceLock:
+        if traceLogger is not None:
+            for handler in list(traceLogger.handlers):
+                traceLogger.removeHandler(handler)
+                handler.close()
+            traceLogger = None
+
+
+
+# ANALYZER
+# ========
+
+
+def ReadSpans(files: list[pl.Path]) -> list[dict[str, t.Any]]:
+    """Reads spans from trace files, skipping incomplete lines."""
+    spans = []
+    for file in files:
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return spans
+
+
+def FoldStacks(spans: list[dict[str, t.Any]]) -> dict[str, float]:
+    """Gets the self time (without children) of every stack of spans, in seconds.
+    Stacks are the span names from the root, separated by ";" (folded stacks format).
+    Children running in parallel may exceed the parent duration: self time is at least 0.
+    """
+    byId = {span["id"]: span for span in spans}
+    childrenTime: dict[str, float] = {}
+    for span in spans:
+        if span["parent"] is not None:
+            childrenTime[span["parent"]] = childrenTime.get(span["parent"], 0) + span["duration"]
+
+    stacks: dict[str, float] = {}
+    for span in spans:
+        # composes the stack, up to the root (or the first span missing, e.g. in rotated files)
+        names, parent = [span["name"]], byId.get(span["parent"] or "")
+        while parent is not None:
+            names.insert(0, parent["name"])
+            parent = byId.get(parent["parent"] or "")
+        stack = ";".join(names)
+        stacks[stack] = stacks.get(stack, 0) + max(span["duration"] - childrenTime.get(span["id"], 0), 0)
+    return stacks
+
+
+def SummarizeSpans(spans: list[dict[str, t.Any]]) -> dict[str, dict[str, dict[str, float]]]:
+    """Summarizes duration of spans, for each website domain and operation.
+    Spans without domain (e.g. web search) are grouped in the empty domain.
+    Returns dictionary: domain -> operation -> summary (count, errors, total, p50, p95, max)
+    """
+    # NOTE: imported here, since timings imports website, which is traced
+    from src.timings import Percentile
+
+    durations: dict[str, dict[str, list[float]]] = {}
+    errors: dict[tuple[str, str], int] = {}
+    for span in spans:
+        domain = span["attributes"].get("domain") or ""
+        durations.setdefault(domain, {}).setdefault(span["name"], []).append(span["duration"])
+        if span["outcome"] != "ok":
+            errors[domain, span["name"]] = errors.get((domain, span["name"]), 0) + 1
+
+    return {domain: {name: {
+        "count": len(values),
+        "errors": errors.get((domain, name), 0),
+        "total": round(sum(values), 3),
+        "p50": round(Percentile(values, 50), 3),
+        "p95": round(Percentile(values, 95), 3),
+        "max": round(max(values), 3),
+    } for name, values in operations.items()} for domain, operations in sorted(durations.items())}
+
+
+def Main() -> None:
+    parser = argparse.ArgumentParser(description="Summarizes trace files of scraping runs.")
+    parser.add_argument("files", nargs="*", type=pl.Path, default=[TRACE_FILE], help="trace files (JSONL)")
+    parser.add_argument("--folded", type=pl.Path, help="writes folded stacks (self time in ms) to file")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest items to show")
+    args = parser.parse_args()
+
+    spans = ReadSpans(args.files)
+    print(f"{len(spans)} spans, {len({span['trace'] for span in spans})} traces")
+
+    # slowest websites, by total time scraping from them
+    summary = SummarizeSpans(spans)
+    websites = sorted(((domain, operations["ScrapeFromWebsite"]) for domain, operations in summary.items()
+        if "ScrapeFromWebsite" in operations), key=lambda item: item[1]["total"], reverse=True)
+    print("\nSlowest websites (ScrapeFromWebsite):")
+    for domain, values in websites[:args.top]:
+        print(f"  {domain:32} total {values['total']:9.3f}s  count {values['count']:5}  " +
+            f"p50 {values['p50']:7.3f}s  p95 {values['p95']:7.3f}s  errors {values['errors']}")
+
+    # slowest operations, by self time
+    stacks = FoldStacks(spans)
+    print("\nSlowest operations (self time):")
+    for stack, seconds in sorted(stacks.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {seconds:9.3f}s  {stack}")
+
+    # writes folded stacks, for flame graphs
+    if args.folded:
+        args.folded.write_text("".join(f"{stack} {round(seconds * 1000)}\n" for stack, seconds in stacks.items()))
+        print(f"\nFolded stacks written to {args.folded}")
+
+
+if __name__ == "__main__":
+    sys.exit(Main())
@@ -14,6 +14,16 @@ class FileConfigEntry(t.TypedDict, total=False):
     path: str      # Target file path (relative to basePath) with placeholders
 
 
+# strategy to decide when a page is loaded: full load, DOM ready, or only when "wait" element appears
+PageLoadStrategy = t.Literal["normal", "eager", "none"]
+
+
+class BlockConfig(t.TypedDict, total=False):
+    """Resources blocked by the browser while loading pages, to speed up scraping."""
+    types: list[t.Literal["image", "font", "stylesheet", "script", "media"]]
+    urls: list[str]  # url patterns with * wildcards, e.g. *://*.doubleclick.net/*
+
+
 class WebsiteEntry(t.TypedDict, total=False):
     """Configuration entry for a website."""
     keywords: list[str]
@@ -22,24 +32,48 @@ class WebsiteEntry(t.TypedDict, total=False):
     notFound: str
     fields: dict[str, str]
     files: dict[str, FileConfigEntry]
+    skipDirectDownload: bool
+    engine: t.Literal["browser", "http"]
+    cacheTTL: int  # time-to-live of cached results, in seconds (0 = no cache)
+    block: BlockConfig  # resources blocked by the browser (default = BLOCK_DEFAULT)
+    pageLoad: PageLoadStrategy  # when the page is considered loaded (default = normal)
+    rateLimit: float  # max requests per second to the website (0 = no limit)
+    maxConcurrency: int  # max components scraped at the same time from the website (0 = no limit)
 
 
 # type alias for config dictionary (stored in config.json)
 Config = dict[str, WebsiteEntry]
 
+# component to scrape: manuCode, or tuple (manuCode, hints for this component only)
+ComponentInput = str | tuple[str, list[str]]
+
+# unique key of a component to scrape: (manuCode, hints for this component only)
+ComponentKey = tuple[str, tuple[str, ...]]
+
 
 
 # SCRAPED DATA TYPES
 # ==================
 
 
+class ElementData(t.TypedDict):
+    """Data of a page element, extracted in a single call for all selectors."""
+    tagName: str            # lowercase HTML tag name
+    html: str               # inner HTML
+    text: str               # rendered text
+    href: t.Optional[str]   # absolute url in href attribute, if any
+    src: t.Optional[str]    # absolute url in src attribute, if any
+
+
 class ScrapedFile(t.TypedDict, total=False):
     """Data of a scraped file, returned by the scraper."""
-    result: str # "success" or "error: <error message>"
+    result: str # "success", "skipped: <reason>" or "error: <error message>"
     url: str
     path: str
     size: int
     method: t.Literal["direct", "image", "browser"]
+    cached: bool # true if the file was not downloaded again (not modified, or downloaded recently)
+    timings: dict[str, float]  # seconds spent in every phase (url, direct, image, browser, total)
 
 
 class ScrapedComponentData(t.TypedDict, total=False):
@@ -52,3 +86,18 @@ class ScrapedComponentData(t.TypedDict, total=False):
     url: str
     fields: dict[str, str | None]
     files: dict[str, ScrapedFile]
+    timings: dict[str, float]  # seconds spent in every phase (search, navigation, wait, ...)
+
+
+class TimingsSummary(t.TypedDict):
+    """Summary of the timings of a phase, for many scraped components."""
+    count: int
+    p50: float
+    p95: float
+    max: float
+
+
+class ScrapingReport(t.TypedDict):
+    """Results of scraped components, with a summary of timings (domain -> phase -> summary)."""
+    components: list[ScrapedComponentData]
+    timings: dict[str, dict[str, TimingsSummary]]
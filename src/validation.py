@@ -54,19 +54,29 @@ def GetConfigErrors(config: dict) -> list[str]:
 
 def GetWebsiteErrors(domain: str, entry: dict) -> list[str]:
     """Additional semantic validations beyond JSON Schema."""
+
+    errors: list[str] = []
+
+    # checks that http engine can download files
+    if entry.get("engine") == "http" and entry.get("skipDirectDownload") == True:
+        errors.append(
+            f"❌ Error in 'engine' of website '{domain}':\n"
+            f"   The http engine can download files only with direct download\n"
+            f"   Remove 'skipDirectDownload', or use the 'browser' engine"
+        )
     
     url = entry.get("url", "")
-    if url == "" or not isinstance(url, str): return []
+    if url == "" or not isinstance(url, str): return errors
 
     # checks if URL contains {manuCode} or *
     if url and isinstance(url, str) and "*" not in url and "{manuCode}" not in url:
-        return [
+        errors.append(
             f"❌ Error in 'url' of website '{domain}':\n"
             f"   URL must contain placeholder '{{manuCode}}' or wildcard(s) '*'\n"
             f"   Current value: '{url}'\n"
             f"   Correct example: 'https://example.com/part-{{manuCode}}'"
-        ]
-    return []
+        )
+    return errors
 
 
 def FormatJsonPath(path: t.Sequence[str | int]) -> str:
@@ -121,6 +131,14 @@ def FormatValidationError(error: jsonschema.ValidationError, domain: str = "") -
                f"   Empty value not allowed\n"
                f"   Please provide a valid value")
     
+    # value not in allowed values
+    elif error.validator == "enum":
+        allowed = error.validator_value if isinstance(error.validator_value, list) else []
+        allowedValues = ", ".join(json.dumps(value) for value in allowed)
+        return (f"❌ Error in '{errorPath}':\n"
+               f"   Current value: {json.dumps(error.instance)}\n"
+               f"   Allowed values: {allowedValues}")
+    
     # unknown key
     elif error.validator == "additionalProperties":
         return (f"❌ Error in '{errorPath}':\n"
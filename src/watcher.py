@@ -0,0 +1,116 @@
+"""Detection of files downloaded by the browser, as soon as they are completed."""
+
+# The browser downloads a file to "<name>.part" (with an empty "<name>" placeholder),
+# then renames it to "<name>" when completed. The watcher waits for changes in the
+# download directory with inotify (Linux), checking for completed files at every change,
+# so that completion is detected immediately. On other systems, it polls the directory.
+# Every download uses its own directory (see DownloadWithBrowser): any completed file is the download.
+
+import os
+import time
+import select
+import ctypes
+import ctypes.util
+import logging as log
+import typing as t
+
+from src.browser import CheckCancelled
+
+
+logger = log.getLogger(__name__)
+logger.setLevel(log.INFO)
+
+
+# max time waiting without checking cancellation, in seconds
+WATCH_SLICE = 0.5
+
+# interval between checks of the directory, without inotify, in seconds
+WATCH_POLL_INTERVAL = 0.1
+
+# inotify flags and events (see inotify.h)
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+
+# C library, with inotify functions (None if not available)
+libc: t.Optional[ctypes.CDLL] = None
+try:
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if not (hasattr(libc, "inotify_init1") and hasattr(libc, "inotify_add_watch")):
+        libc = None
+except (OSError, TypeError):
+    libc = None
+
+
+def FindCompletedFile(path: str) -> str:
+    """Finds a completed download in the directory: a non-empty file, without part file.
+    Returns its path, or an empty string if not found.
+    """
+    with os.scandir(path) as entries:
+        files = {entry.name: entry for entry in entries if entry.is_file()}
+    for name, entry in files.items():
+        if not name.endswith(".part") and f"{name}.part" not in files and entry.stat().st_size > 0:
+            return entry.path
+    return ""
+
+
+class DownloadWatcher:
+    """Watches a download directory, to wait for a completed file.
+    Start watching before the download starts, so that no change is missed.
+    Example:
+        with DownloadWatcher(downloadPath) as watcher:
+            ... # starts download
+            downloadedFile = watcher.Wait(timeout)
+    """
+
+    def __init__(self, path: str, poll: bool = False) -> None:
+        self.path = path
+        self.poll = poll or libc is None # polls the directory, instead of using inotify
+        self.fd: t.Optional[int] = None
+
+    def __enter__(self) -> "DownloadWatcher":
+        if not self.poll:
+            assert libc is not None
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0 or libc.inotify_add_watch(fd, self.path.encode(), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+                logger.warning(f"Unable to watch {self.path} (errno {ctypes.get_errno()}), polling it")
+                if fd >= 0:
+                    os.close(fd)
+                self.poll = True
+            else:
+                self.fd = fd
+        return self
+
+    def __exit__(self, *args) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def Wait(self, timeout: float) -> str:
+        """Waits for a completed file in the directory, returning its path.
+        Raises TimeoutError after the timeout, ScrapingCancelledError if cancelled.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            CheckCancelled()
+            downloadedFile = FindCompletedFile(self.path)
+            if downloadedFile:
+                return downloadedFile
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"File not found in {self.path} after {timeout} seconds")
+
+            # waits for changes in the directory, discarding events (the directory is checked again)
+            if self.fd is not None:
+                ready, _, _ = select.select([self.fd], [], [], min(remaining, WATCH_SLICE))
+                if ready:
+                    try:
+                        while os.read(self.fd, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+            else:
+                time.sleep(min(remaining, WATCH_POLL_INTERVAL))
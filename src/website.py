@@ -5,6 +5,7 @@ import logging as log
 
 from ddgs import DDGS
 
+from src.tracing import Traced
 from src.type_hints import WebsiteEntry
 if t.TYPE_CHECKING:
     from src.config import Config
@@ -126,6 +127,7 @@ def GetCandidatesFromHints(hints: list[str], config: "Config") -> list[Candidate
 # =================================
 
 
+@Traced("manuCode")
 def GetCandidatesFromWebSearch(manuCode: str, hints: list[str]) -> list[CandidateWebsite]:
     """Gets candidate websites for a component, searching online.
     This is used to match url patterns to find web pages, so it ignores pdf results.
@@ -166,6 +168,7 @@ def GetCandidatesFromWebSearch(manuCode: str, hints: list[str]) -> list[Candidat
 
 
 
+@Traced("urlPattern", "manuCode")
 def MatchUrlPatternToWebResults(urlPattern: str, manuCode: str, hints: list[str]) -> str:
     """Searches the web for the first url matching the pattern."""
 
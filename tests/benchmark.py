@@ -0,0 +1,392 @@
+"""Offline benchmark of the scraper, with a local server serving recorded pages."""
+
+# Usage:
+#   python tests/benchmark.py                           # benchmarks all websites in config file
+#   python tests/benchmark.py --engine http             # forces http engine (no browser)
+#   python tests/benchmark.py --record te.com 282834-2  # records live pages of te.com as fixtures
+#
+# Fixtures (tests/fixtures/<domain>/<manuCode>.html) are pages rendered by the browser on the
+# live websites, recorded without scripts and external resources, with file links pointing to
+# the local server. Websites without recorded pages are benchmarked with synthetic pages,
+# composed from the css selectors in the config file. Not-found pages and files are always synthetic.
+# NOTE: no fixtures are committed (pages of manufacturers), record them before benchmarking real pages.
+#
+# Every component of a batch has a unique code, so that duplicates are not merged (see ScrapeComponents):
+# recorded pages are repeated as <manuCode>~<n>, serving the page of <manuCode>.
+#
+# Results (parts/minute, p50/p95 of every phase, peak memory of scraper and browsers)
+# are written as JSON, to compare different runs.
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import http.server
+import urllib.parse
+import pathlib as pl
+import typing as t
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+import src.config as config
+import src.scraper as scraper
+import src.snapshots as snapshots
+from src.config import ReadConfig
+from src.scraper import ScrapeComponents
+from src.snapshots import ListSnapshots, LoadSnapshot
+from src.extraction import ParseHtml, ParseElements
+from src.timings import SummarizeTimings
+from src.type_hints import Config, WebsiteEntry
+
+
+# recorded pages, for each website domain
+FIXTURES_DIR = pl.Path(__file__).parent / "fixtures"
+
+# default batch sizes and parallel workers to benchmark
+BATCH_SIZES = [5, 20]
+WORKERS = [1, 2, 4]
+
+# fraction of components not found, in every batch
+NOT_FOUND_RATIO = 0.2
+
+# separator of the repetition number, in codes of recorded pages repeated in a batch
+REPEAT_SEPARATOR = "~"
+
+# interval for sampling memory usage, in seconds
+RSS_INTERVAL = 0.1
+
+# content of synthetic files, by extension (minimal valid files)
+FILE_CONTENTS: dict[str, tuple[str, bytes]] = {
+    "pdf": ("application/pdf", b"%PDF-1.4\n1 0 obj <<>> endobj\ntrailer <<>>\n%%EOF\n"),
+    "png": ("image/png", bytes.fromhex(
+        "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+        "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082")),
+}
+
+
+
+# SYNTHETIC PAGES
+# ===============
+
+
+def SplitCompounds(selector: str) -> list[str]:
+    """Splits a css selector in compound selectors, e.g. "div.a > span[title='b c']" -> [div.a, span[title='b c']].
+    Uses only the first selector of a list. Combinators are discarded.
+    """
+    compounds, current, depth, quote = [], "", 0, ""
+    for char in selector.split(",")[0].strip():
+        if quote:
+            quote = "" if char == quote else quote
+        elif char in "'\"":
+            quote = char
+        elif char in "[(":
+            depth += 1
+        elif char in "])":
+            depth -= 1
+        elif depth == 0 and char in " >+~":
+            if current:
+                compounds.append(current)
+            current = ""
+            continue
+        current += char
+    return compounds + [current] if current else compounds
+
+
+def CompoundToHtml(compound: str, content: str, attributes: dict[str, str] = {}) -> str:
+    """Composes an HTML element matching a compound selector (tag, id, classes, attributes),
+    wrapping the content. Pseudo-classes are ignored.
+    """
+
+    # gets attributes, then removes them and pseudo-classes from the selector
+    attributes = dict(attributes)
+    for name, _, value in re.findall(r"\[\s*([\w-]+)\s*(?:[~|^$*]?=\s*(['\"]?)(.*?)\2)?\s*\]", compound):
+        attributes[name] = value
+    simple = re.sub(r"\[[^\]]*\]|::?[\w-]+(\([^)]*\))?", "", compound)
+
+    # gets tag, id and classes
+    match = re.match(r"[a-zA-Z][\w-]*", simple)
+    tag = match.group(0) if match else "div"
+    ids = re.findall(r"#([\w-]+)", simple)
+    classes = re.findall(r"\.([\w-]+)", simple)
+    if ids:
+        attributes["id"] = ids[0]
+    if classes:
+        attributes["class"] = " ".join(classes)
+
+    html = f"<{tag}" + "".join(f' {name}="{value}"' for name, value in attributes.items()) + ">"
+    return html if tag in ["img", "input", "br", "hr"] else f"{html}{content}</{tag}>"
+
+
+def SynthesizeHtml(selector: str, content: str, attributes: dict[str, str] = {}) -> str:
+    """Composes HTML with an element matching a simple css selector, nesting an element
+    for every compound selector. The innermost element has the content and attributes.
+    """
+    compounds = SplitCompounds(selector)
+    html = CompoundToHtml(compounds[-1], content, attributes)
+    for compound in reversed(compounds[:-1]):
+        html = CompoundToHtml(compound, html)
+    return html
+
+
+def SynthesizePage(entry: WebsiteEntry, manuCode: str) -> str:
+    """Composes a part page with the elements of the config entry (wait, fields and files)."""
+    elements = [SynthesizeHtml(entry["wait"], manuCode)] # type: ignore
+    for key, selector in entry.get("fields", {}).items():
+        elements.append(SynthesizeHtml(selector, f"Sample {key} of <b>{manuCode}</b>"))
+    for tag, fileConfig in entry.get("files", {}).items():
+        if "selector" in fileConfig:
+            isImage = SplitCompounds(fileConfig["selector"])[-1].startswith("img")
+            attribute = {"src": f"/files/{tag}.png"} if isImage else {"href": f"/files/{tag}.pdf"}
+            elements.append(SynthesizeHtml(fileConfig["selector"], tag, attribute))
+    return "<html><body>\n" + "\n".join(elements) + "\n</body></html>"
+
+
+def SynthesizeNotFoundPage(entry: WebsiteEntry) -> str:
+    """Composes a component-not-found page (without the wait element)."""
+    notFound = entry.get("notFound", "")
+    return "<html><body>\n" + (SynthesizeHtml(notFound, "Not found") if notFound else "") + "\n</body></html>"
+
+
+
+# RECORDED PAGES
+# ==============
+
+
+def RecordFixtures(domain: str, manuCodes: list[str]) -> None:
+    """Scrapes pages from the live website, saving them as fixtures.
+    Removes scripts and external resources, and points file links to the local server.
+    """
+
+    # scrapes pages, saving snapshots to a temporary directory
+    snapshots.SNAPSHOT_DIR = pl.Path(tempfile.mkdtemp())
+    scraper.SAVE_SNAPSHOTS = True
+    ScrapeComponents(manuCodes, hints=[domain], files=[], cache="bypass")
+
+    entry = ReadConfig()[domain]
+    for snapshot in ListSnapshots(domain, manuCodes):
+        document = ParseHtml(LoadSnapshot(snapshot.hash))
+
+        # points file links to the local server
+        fileElements = []
+        for tag, fileConfig in entry.get("files", {}).items():
+            element = document.select_one(fileConfig.get("selector", "")) if "selector" in fileConfig else None
+            if element is not None:
+                attribute = "src" if element.name == "img" else "href"
+                extension = "png" if element.name == "img" else "pdf"
+                element[attribute] = f"/files/{tag}.{extension}"
+                fileElements.append(element)
+
+        # removes scripts and external resources
+        for element in document.select("script, noscript, link, iframe, base"):
+            element.decompose()
+        for element in document.select("img, source, video, audio"):
+            if element not in fileElements:
+                for attribute in ["src", "srcset"]:
+                    element.attrs.pop(attribute, None)
+
+        path = FIXTURES_DIR / domain / f"{snapshot.manuCode}.html"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(str(document), encoding="utf-8")
+        print(f"Recorded {path}")
+
+    shutil.rmtree(snapshots.SNAPSHOT_DIR, ignore_errors=True)
+
+
+def GetFixtureCodes(domain: str) -> list[str]:
+    """Gets the manufacturer codes of the recorded pages of a website."""
+    return sorted(path.stem for path in (FIXTURES_DIR / domain).glob("*.html"))
+
+
+
+# FIXTURE SERVER
+# ==============
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """Serves part pages (/<domain>/<manuCode>) and files (/files/<name>).
+    Unknown parts get the not-found page of the website.
+    """
+    websites: Config = {}
+
+    def do_GET(self) -> None:
+        path = urllib.parse.unquote(urllib.parse.urlparse(self.path).path).strip("/").split("/")
+
+        # files, by extension
+        if len(path) == 2 and path[0] == "files":
+            contentType, body = FILE_CONTENTS.get(path[1].rsplit(".", 1)[-1], FILE_CONTENTS["pdf"])
+
+        # recorded or synthetic pages
+        elif len(path) == 2 and path[0] in self.websites:
+            domain, manuCode = path
+            contentType = "text/html; charset=utf-8"
+            fixture = FIXTURES_DIR / domain / f"{manuCode.split(REPEAT_SEPARATOR)[0]}.html"
+            if fixture.exists():
+                body = fixture.read_bytes()
+            elif manuCode.startswith("NOTFOUND"):
+                body = SynthesizeNotFoundPage(self.websites[domain]).encode("utf-8")
+            else:
+                body = SynthesizePage(self.websites[domain], manuCode).encode("utf-8")
+
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: t.Any) -> None:
+        pass # no logging for every request
+
+
+def StartServer(websites: Config) -> http.server.ThreadingHTTPServer:
+    """Starts the fixture server on a free local port, in a background thread."""
+    FixtureHandler.websites = websites
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def ComposeTestConfig(websites: Config, port: int, engine: str) -> Config:
+    """Composes the config of the websites, pointing them to the local server."""
+    testConfig: Config = {}
+    for domain, entry in websites.items():
+        testEntry: WebsiteEntry = {**entry, "url": f"http://127.0.0.1:{port}/{domain}/{{manuCode}}", "cacheTTL": 0}
+        if engine != "config":
+            testEntry["engine"] = engine # type: ignore
+            testEntry.pop("skipDirectDownload", None)
+        testConfig[domain] = testEntry
+    return testConfig
+
+
+
+# BENCHMARK
+# =========
+
+
+def GetTreeRss(pid: int) -> int:
+    """Gets resident memory (bytes) of a process and its descendants. Linux only (0 elsewhere)."""
+    try:
+        status = pl.Path(f"/proc/{pid}/status").read_text()
+        children = [int(child) for file in pl.Path(f"/proc/{pid}/task").glob("*/children")
+            for child in file.read_text().split()]
+    except (OSError, ValueError):
+        return 0
+    match = re.search(r"VmRSS:\s+(\d+)", status)
+    return (int(match.group(1)) * 1024 if match else 0) + sum(GetTreeRss(child) for child in children)
+
+
+def RunBenchmark(domain: str, manuCodes: list[str], workers: int) -> dict[str, t.Any]:
+    """Scrapes a batch of components, measuring throughput, timings and peak memory."""
+
+    # samples memory of the scraper and its browsers, in background
+    peakRss = 0
+    running = True
+    def SampleRss() -> None:
+        nonlocal peakRss
+        while running:
+            peakRss = max(peakRss, GetTreeRss(os.getpid()))
+            time.sleep(RSS_INTERVAL)
+    sampler = threading.Thread(target=SampleRss, daemon=True)
+    sampler.start()
+
+    # scrapes components, with timings
+    basePath = tempfile.mkdtemp()
+    start = time.monotonic()
+    results = ScrapeComponents(manuCodes, hints=[domain],
+        basePath=basePath, workers=workers, cache="bypass", timings=True)["components"]
+    elapsed = time.monotonic() - start
+    running = False
+    sampler.join()
+    shutil.rmtree(basePath, ignore_errors=True)
+
+    # every run uses a single website: timings summary has a single domain (local server)
+    errors = sum(1 for result in results if result.get("result", "").startswith("error"))
+    summary = next(iter(SummarizeTimings([r for r in results if "url" in r]).values()), {})
+    return {
+        "domain": domain,
+        "batchSize": len(manuCodes),
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "partsPerMinute": round(len(manuCodes) / elapsed * 60, 1),
+        "found": len(results) - errors,
+        "notFound": errors,
+        "peakRssMB": round(peakRss / 2**20, 1),
+        "timings": {phase: {"p50": values["p50"], "p95": values["p95"]} for phase, values in summary.items()},
+    }
+
+
+def ComposeBatch(domain: str, size: int) -> list[str]:
+    """Composes a batch of unique manufacturer codes: recorded pages (repeated with a unique code,
+    if needed), and not found codes. Unique codes are all scraped, without coalescing duplicates.
+    """
+    notFound = round(size * NOT_FOUND_RATIO)
+    codes = GetFixtureCodes(domain) or [f"SYNTH-{i}" for i in range(size)]
+    found = [codes[i % len(codes)] + (f"{REPEAT_SEPARATOR}{i // len(codes)}" if i >= len(codes) else "")
+        for i in range(size - notFound)]
+    return found + [f"NOTFOUND-{i}" for i in range(notFound)]
+
+
+def Main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--record", nargs="+", metavar=("DOMAIN", "MANUCODE"),
+        help="records live pages of a website as fixtures, instead of benchmarking")
+    parser.add_argument("--domains", nargs="+", help="websites to benchmark (default = all in config)")
+    parser.add_argument("--engine", choices=["config", "browser", "http"], default="config",
+        help="engine loading pages (default = as configured)")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=BATCH_SIZES)
+    parser.add_argument("--workers", nargs="+", type=int, default=WORKERS)
+    parser.add_argument("--output", default="benchmark-results.json", help="JSON file with results")
+    args = parser.parse_args()
+
+    # records fixtures, if requested
+    if args.record:
+        RecordFixtures(args.record[0], args.record[1:])
+        return
+
+    # starts server, and points the config to it
+    websites = ReadConfig()
+    if args.domains:
+        websites = {domain: websites[domain] for domain in args.domains}
+    server = StartServer(websites)
+    testConfigFile = pl.Path(tempfile.mkdtemp()) / "config.json"
+    testConfigFile.write_text(json.dumps(ComposeTestConfig(websites, server.server_address[1], args.engine)))
+    config.CONFIG_FILE = testConfigFile
+
+    # checks that pages contain the configured elements
+    for domain, entry in websites.items():
+        page = SynthesizePage(entry, "SYNTH-0") if not GetFixtureCodes(domain) else \
+            (FIXTURES_DIR / domain / f"{GetFixtureCodes(domain)[0]}.html").read_text(encoding="utf-8")
+        selectors = list(entry.get("fields", {}).values()) + [entry["wait"]] # type: ignore
+        missing = [s for s, e in ParseElements(ParseHtml(page), selectors, "http://localhost").items() if e is None]
+        source = "recorded" if GetFixtureCodes(domain) else "synthetic"
+        print(f"{domain}: {source} pages" + (f", missing elements: {missing}" if missing else ""))
+
+    # benchmarks every website, batch size and number of workers
+    runs = []
+    for domain in websites:
+        for size in args.batch_sizes:
+            for workers in args.workers:
+                run = RunBenchmark(domain, ComposeBatch(domain, size), workers)
+                runs.append(run)
+                print(f"{domain:16} batch {size:4} workers {workers:2}: {run['partsPerMinute']:8.1f} parts/min, " +
+                    f"peak {run['peakRssMB']:7.1f} MB")
+
+    server.shutdown()
+
+    # saves results
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump({"date": time.strftime("%Y-%m-%dT%H:%M:%S"), "engine": args.engine, "runs": runs}, file, indent=2)
+    print(f"✅ Benchmark results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,128 @@
+"""Tests for the browser pool: idle browsers, resource blocking and parallel scraping."""
+
+import sys
+import time
+import tempfile
+import itertools
+import pathlib as pl
+import typing as t
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+import src.config as config
+import src.browser as browser
+import src.scraper as scraper
+from src.browser import GetBrowser, GetBrowserSlot, CloseBrowser, PooledBrowserSlot, CloseIdleBrowsers
+from src.browser import SetResourceBlocking
+from src.scraper import ScrapeComponents
+from src.type_hints import BlockConfig, ScrapedComponentData
+
+# patches the config file path to an empty test file
+config.CONFIG_FILE = pl.Path(tempfile.mkdtemp()) / "config.json"
+
+
+class FakeBrowser:
+    """Browser registering request handlers, without opening any window."""
+
+    ids = itertools.count()
+
+    def __init__(self) -> None:
+        self.service = self
+        self.process = True
+        self.network = self
+        self.handlers: dict[int, t.Callable] = {}
+        self.closed = False
+
+    def add_request_handler(self, event: str, handler: t.Callable) -> int:
+        id = next(self.ids)
+        self.handlers[id] = handler
+        return id
+
+    def remove_request_handler(self, event: str, id: int) -> None:
+        if id not in self.handlers:
+            raise KeyError(f"Unknown request handler: {id}")
+        del self.handlers[id]
+
+    def quit(self) -> None:
+        self.closed = True
+
+
+# patches browsers with fakes
+opened: list[FakeBrowser] = []
+
+def FakeOpenBrowser() -> FakeBrowser:
+    opened.append(FakeBrowser())
+    return opened[-1]
+
+browser.OpenBrowser = FakeOpenBrowser # type: ignore
+
+# patches scraping with a fake using the browser of the slot, slower for earlier components
+def FakeScrape(manuCode: str, hints: list[str], files: t.Any, basePath: str, format: str,
+    closeBrowser: bool, *args,
+) -> ScrapedComponentData:
+    driver = GetBrowser()
+    time.sleep(0.05 * (10 - int(manuCode)))
+    if closeBrowser:
+        CloseBrowser()
+    return {"manuCode": manuCode, "url": f"{GetBrowserSlot()}/{opened.index(driver)}"} # type: ignore
+
+scraper.ScrapeComponentWithTimings = FakeScrape
+
+
+def TestIdleBrowsersBlocking():
+    """Test resource blocking in pool slots, after closing idle browsers."""
+    block: BlockConfig = {"types": ["font"], "urls": []}
+
+    # blocks resources in a pool browser, left idle
+    with PooledBrowserSlot():
+        driver = GetBrowser()
+        SetResourceBlocking(driver, block)
+        assert len(opened[-1].handlers) == 1
+
+    # closes idle browsers: the reused slot opens a new browser, registering the handler again
+    CloseIdleBrowsers()
+    assert opened[-1].closed
+    with PooledBrowserSlot():
+        driver = GetBrowser()
+        assert len(opened) == 2
+        SetResourceBlocking(driver, block)
+        assert len(opened[-1].handlers) == 1
+
+        # changed configuration: replaces the handler of the new browser
+        SetResourceBlocking(driver, {"types": ["media"], "urls": []})
+        assert len(opened[-1].handlers) == 1
+    CloseIdleBrowsers()
+
+    print("✅ Test Idle Browsers Blocking passed")
+
+
+def TestPooledScraping():
+    """Test scraping with a single worker (current slot) and multiple workers (pool browsers)."""
+    opened.clear()
+    manuCodes = [str(index) for index in range(6)]
+
+    # single worker: uses the browser of the current slot, left open
+    results = ScrapeComponents(manuCodes, workers=1, closeBrowser=False)
+    assert [result.get("manuCode") for result in results] == manuCodes
+    assert {result.get("url") for result in results} == {"main/0"}
+    assert len(opened) == 1 and not opened[0].closed
+
+    # multiple workers: results in input order, even if later components complete first
+    results = ScrapeComponents(manuCodes, workers=3, closeBrowser=False)
+    assert [result.get("manuCode") for result in results] == manuCodes
+    assert all(result.get("url", "").startswith("pool-") for result in results)
+    assert len(opened) == 4 and not any(driver.closed for driver in opened)
+
+    # pool browsers are reused by the next call, then all browsers are closed
+    results = ScrapeComponents(manuCodes, workers=3, closeBrowser=False)
+    assert len(opened) == 4
+    ScrapeComponents(["7"], workers=1, closeBrowser=True)
+    assert len(opened) == 4 and all(driver.closed for driver in opened)
+
+    print("✅ Test Pooled Scraping passed")
+
+
+if __name__ == "__main__":
+    TestIdleBrowsersBlocking()
+    TestPooledScraping()
@@ -0,0 +1,179 @@
+"""Tests for the persistent cache of scraped components."""
+
+import sys
+import time
+import copy
+import pathlib as pl
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+import src.cache as cache
+import src.scraper as scraper
+from src.website import CandidateWebsite
+from src.cache import ReadCachedComponent, WriteCachedComponent, ClearCache
+from src.cache import ReadCachedMiss, WriteCachedMiss
+from src.type_hints import WebsiteEntry, ScrapedComponentData
+
+# patches the cache file path to a test file
+CACHE_FILE = cache.CACHE_FILE = pl.Path(__file__).parent.parent / "cache-test.sqlite"
+
+
+# sample items, for testing
+domain = "molex.com"
+entry: WebsiteEntry = {
+    "url": "https://www.molex.com/molex/products/part-detail/{manuCode}",
+    "wait": "#part-details",
+    "fields": {
+        "description": "h1",
+    },
+    "files": {
+        "drawing": {
+            "selector": "a.drawing",
+            "path": "molex.com\\{manuCode}_drawing.pdf"
+        },
+    },
+}
+
+def SampleResult(manuCode: str) -> ScrapedComponentData:
+    """Composes a sample result, without downloaded files."""
+    return {
+        "manuCode": manuCode,
+        "matchedHints": ["molex.com"],
+        "url": entry.get("url", "").format(manuCode=manuCode),
+        "fields": {"description": f"Component {manuCode}"},
+        "files": {},
+    }
+
+
+def TestCacheReadWrite():
+    """Test the cache read/write functions."""
+
+    # delete old test cache file
+    if CACHE_FILE.exists():
+        CACHE_FILE.unlink()
+
+    # empty cache
+    assert ReadCachedComponent("A", domain, "txt", entry, None, "") is None
+
+    # writes and reads back
+    WriteCachedComponent("A", domain, "txt", entry, None, "", SampleResult("A"))
+    assert ReadCachedComponent("A", domain, "txt", entry, None, "") == SampleResult("A")
+
+    # different format, domain, files or base path are not cached
+    assert ReadCachedComponent("A", domain, "md", entry, None, "") is None
+    assert ReadCachedComponent("A", "te.com", "txt", entry, None, "") is None
+    assert ReadCachedComponent("A", domain, "txt", entry, [], "") is None
+    assert ReadCachedComponent("A", domain, "txt", entry, None, "other") is None
+
+    # changed fields configuration is not cached
+    changedEntry = copy.deepcopy(entry)
+    changedEntry["fields"] = {"description": "h2"}
+    assert ReadCachedComponent("A", domain, "txt", changedEntry, None, "") is None
+
+    # missing downloaded files invalidate the cached result
+    result = SampleResult("B")
+    result["files"] = {"drawing": {"result": "success", "path": "missing/B_drawing.pdf"}}
+    WriteCachedComponent("B", domain, "txt", entry, None, "", result)
+    assert ReadCachedComponent("B", domain, "txt", entry, None, "") is None
+
+    # results with failed downloads are not cached, so that files are retried (skipped files are fine)
+    result = SampleResult("C")
+    result["files"] = {"drawing": {"result": "error: HTTP 503", "url": "https://example.com/C.pdf"}}
+    WriteCachedComponent("C", domain, "txt", entry, None, "", result)
+    assert ReadCachedComponent("C", domain, "txt", entry, None, "") is None
+    result["files"] = {"drawing": {"result": "skipped: not configured"}}
+    WriteCachedComponent("C", domain, "txt", entry, None, "", result)
+    assert ReadCachedComponent("C", domain, "txt", entry, None, "") == result
+
+    ClearCache()
+    assert ReadCachedComponent("A", domain, "txt", entry, None, "") is None
+
+    print("✅ Test Cache Read/Write passed")
+
+
+def TestCacheExpiration():
+    """Test cache time-to-live and eviction of least recently used results."""
+
+    ClearCache()
+
+    # disabled cache for website
+    noCacheEntry: WebsiteEntry = {**entry, "cacheTTL": 0}
+    WriteCachedComponent("A", domain, "txt", noCacheEntry, None, "", SampleResult("A"))
+    assert ReadCachedComponent("A", domain, "txt", noCacheEntry, None, "") is None
+
+    # expired result
+    shortEntry: WebsiteEntry = {**entry, "cacheTTL": 1}
+    WriteCachedComponent("A", domain, "txt", shortEntry, None, "", SampleResult("A"))
+    assert ReadCachedComponent("A", domain, "txt", shortEntry, None, "") is not None
+    time.sleep(1.1)
+    assert ReadCachedComponent("A", domain, "txt", shortEntry, None, "") is None
+
+    # evicts least recently used results
+    maxEntries = cache.CACHE_MAX_ENTRIES
+    cache.CACHE_MAX_ENTRIES = 2
+    for manuCode in ["A", "B"]:
+        WriteCachedComponent(manuCode, domain, "txt", entry, None, "", SampleResult(manuCode))
+        time.sleep(0.01)
+    ReadCachedComponent("A", domain, "txt", entry, None, "") # A is now more recent than B
+    WriteCachedComponent("C", domain, "txt", entry, None, "", SampleResult("C"))
+    assert ReadCachedComponent("A", domain, "txt", entry, None, "") is not None
+    assert ReadCachedComponent("B", domain, "txt", entry, None, "") is None
+    assert ReadCachedComponent("C", domain, "txt", entry, None, "") is not None
+    cache.CACHE_MAX_ENTRIES = maxEntries
+
+    print("✅ Test Cache Expiration passed")
+
+
+def TestCachedMisses():
+    """Test the cache of components not found."""
+
+    ClearCache()
+
+    # writes and reads back
+    assert ReadCachedMiss("A", domain, entry) is None
+    WriteCachedMiss("A", domain, entry, "ComponentNotFoundError: not found")
+    assert ReadCachedMiss("A", domain, entry) == "ComponentNotFoundError: not found"
+    assert ReadCachedMiss("A", "te.com", entry) is None
+
+    # expired miss
+    notFoundTTL = cache.NOT_FOUND_TTL
+    cache.NOT_FOUND_TTL = 1
+    WriteCachedMiss("B", domain, entry, "not found")
+    time.sleep(1.1)
+    assert ReadCachedMiss("B", domain, entry) is None
+    cache.NOT_FOUND_TTL = notFoundTTL
+
+    # found component removes the cached miss
+    WriteCachedComponent("A", domain, "txt", entry, None, "", SampleResult("A"))
+    assert ReadCachedMiss("A", domain, entry) is None
+
+    # misses detected by a timeout are cached for a shorter time (the page may be only slow)
+    def ScrapeNotFound(manuCode: str, *args, **kwargs):
+        raise scraper.ComponentNotFoundError("Element not found", timeout=manuCode == "slow")
+    scrapeFromWebsite = scraper.ScrapeFromWebsite
+    scraper.ScrapeFromWebsite = ScrapeNotFound
+    candidate = CandidateWebsite(domain, 1, [])
+    for manuCode in ["slow", "missing"]:
+        result, error = scraper.TryScrapeFromWebsite(manuCode, candidate, domain, entry, None, "", "txt", False, "use")
+        assert result is None and error.startswith("ComponentNotFoundError")
+    assert ReadCachedMiss("slow", domain, entry) is not None
+    assert ReadCachedMiss("missing", domain, entry) is not None
+    scraper.ScrapeFromWebsite = scrapeFromWebsite
+    timeoutMissTTL = cache.TIMEOUT_MISS_TTL
+    cache.TIMEOUT_MISS_TTL = 1
+    time.sleep(1.1)
+    assert ReadCachedMiss("slow", domain, entry) is None
+    assert ReadCachedMiss("missing", domain, entry) is not None
+    cache.TIMEOUT_MISS_TTL = timeoutMissTTL
+
+    # removes test cache file
+    CACHE_FILE.unlink()
+
+    print("✅ Test Cached Misses passed")
+
+
+if __name__ == "__main__":
+    TestCacheReadWrite()
+    TestCacheExpiration()
+    TestCachedMisses()
@@ -0,0 +1,88 @@
+"""Tests for coalescing of duplicate and concurrent identical scrapes."""
+
+import sys
+import time
+import tempfile
+import threading
+import pathlib as pl
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+import src.config as config
+import src.scraper as scraper
+from src.scraper import ScrapeComponent, ScrapeComponents, IterScrapeComponents
+from src.type_hints import ScrapedComponentData
+
+# patches the config file path to an empty test file
+config.CONFIG_FILE = pl.Path(tempfile.mkdtemp()) / "config.json"
+
+# patches scraping with a slow fake, counting scrapes of every component
+scrapes: dict[str, int] = {}
+scrapesLock = threading.Lock()
+
+def FakeScrape(manuCode: str, *args) -> ScrapedComponentData:
+    with scrapesLock:
+        scrapes[manuCode] = scrapes.get(manuCode, 0) + 1
+    time.sleep(0.2)
+    return {"manuCode": manuCode, "fields": {"description": f"Component {manuCode}"}, "timings": {"total": 0.2}}
+
+scraper.ScrapeComponentWithTimings = FakeScrape
+
+
+def TestConcurrentRequests():
+    """Test concurrent identical requests, sharing a single scrape."""
+    scrapes.clear()
+
+    # same request from 3 threads, and a different request (other format)
+    results: dict[str, ScrapedComponentData] = {}
+    def Request(name: str, format: str, timings: bool) -> None:
+        results[name] = ScrapeComponent("A", ["molex.com"], format=format, timings=timings) # type: ignore
+    threads = [threading.Thread(target=Request, args=args) for args in [
+        ("first", "txt", True), ("second", "txt", False), ("third", "txt", True), ("other", "md", False)]]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    assert scrapes == {"A": 2}
+
+    # same result, with own timings (time spent waiting, for joined requests)
+    assert results["first"].get("timings") == {"total": 0.2}
+    assert "timings" not in results["second"]
+    assert list(results["third"].get("timings", {}).keys()) == ["coalesced"]
+    assert results["first"].get("fields") == results["second"].get("fields") == results["third"].get("fields")
+
+    # results are independent copies
+    results["second"].get("fields", {})["description"] = "changed"
+    assert results["third"].get("fields", {}).get("description") == "Component A"
+
+    # requests after completion scrape again (no cache here)
+    ScrapeComponent("A", ["molex.com"])
+    assert scrapes == {"A": 3}
+
+    print("✅ Test Concurrent Requests passed")
+
+
+def TestDuplicatesInBatch():
+    """Test duplicate components in a batch, scraped once."""
+
+    for workers in [1, 3]:
+        scrapes.clear()
+        manuCodes = ["A", "B", "A", "C", "B", "A"]
+        results = ScrapeComponents(manuCodes, ["molex.com"], closeBrowser=False, workers=workers)
+        assert scrapes == {"A": 1, "B": 1, "C": 1}
+        assert [result.get("manuCode") for result in results] == manuCodes
+
+    # same component with its own hints is a different component
+    scrapes.clear()
+    results = list(IterScrapeComponents(["A", ("A", ["te.com"]), ("A", ["te.com"])], ["molex.com"],
+        closeBrowser=False, workers=2))
+    assert scrapes == {"A": 2} and len(results) == 3
+
+    print("✅ Test Duplicates In Batch passed")
+
+
+if __name__ == "__main__":
+    TestConcurrentRequests()
+    TestDuplicatesInBatch()
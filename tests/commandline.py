@@ -0,0 +1,89 @@
+"""Tests for the command line interface (input parsing)."""
+
+import io
+import sys
+import logging as log
+import pathlib as pl
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+from cli import ReadComponents, GetInputFormat, InputError, ConfigureLogging
+
+
+def TestReadComponents():
+    """Test reading components with hints, from all input formats."""
+
+    # csv, with optional hints column
+    csvInput = "manuCode,hints\nA,molex.com\nB,\nC,te.com; aptiv.com\n"
+    assert list(ReadComponents(io.StringIO(csvInput), "csv")) == \
+        [("A", ["molex.com"]), "B", ("C", ["te.com", "aptiv.com"])]
+    assert list(ReadComponents(io.StringIO("manuCode\nA\n"), "csv")) == ["A"]
+
+    # jsonl, with strings or objects
+    jsonlInput = '"A"\n\n{"manuCode": "B", "hints": ["molex.com"]}\n{"manuCode": "C"}\n'
+    assert list(ReadComponents(io.StringIO(jsonlInput), "jsonl")) == ["A", ("B", ["molex.com"]), "C"]
+
+    # text, a manuCode for each line
+    assert list(ReadComponents(io.StringIO("A\n B \n\nC\n"), "text")) == ["A", "B", "C"]
+
+    # formats from file extensions
+    assert GetInputFormat("parts.CSV", "auto") == "csv"
+    assert GetInputFormat("parts.jsonl", "auto") == "jsonl"
+    assert GetInputFormat("-", "auto") == "text"
+    assert GetInputFormat("parts.txt", "jsonl") == "jsonl"
+
+    print("✅ Test Read Components passed")
+
+
+def TestInvalidInput():
+    """Test errors for invalid input rows, read lazily."""
+
+    for lines, format in [
+        ("code,hints\nA,molex.com\n", "csv"),      # missing manuCode column
+        ("manuCode,hints\n,molex.com\n", "csv"),   # empty manuCode
+        ('"A"\n{invalid\n', "jsonl"),              # invalid JSON
+        ('{"hints": ["molex.com"]}\n', "jsonl"),   # missing manuCode
+        ("[1, 2]\n", "jsonl"),                     # not a string or object
+    ]:
+        components = ReadComponents(io.StringIO(lines), format)
+        try:
+            list(components)
+            assert False, f"Invalid input accepted: {lines}"
+        except InputError:
+            pass
+
+    print("✅ Test Invalid Input passed")
+
+
+def TestQuietLogging():
+    """Test quiet mode, logging only warnings and errors to stderr."""
+
+    # logs info messages of the modules, without quiet
+    stream = io.StringIO()
+    root = log.getLogger()
+    handlers = root.handlers[:]
+    root.handlers = []
+    sys.stderr, stderr = stream, sys.stderr
+    try:
+        ConfigureLogging(quiet=False)
+        logger = log.getLogger("src.test")
+        logger.setLevel(log.INFO)
+        logger.info("info message")
+
+        # quiet: only warnings
+        ConfigureLogging(quiet=True)
+        logger.info("hidden message")
+        logger.warning("warning message")
+    finally:
+        sys.stderr = stderr
+        root.handlers = handlers
+
+    assert stream.getvalue() == "src.test: info message\nsrc.test: warning message\n"
+    print("✅ Test Quiet Logging passed")
+
+
+if __name__ == "__main__":
+    TestReadComponents()
+    TestInvalidInput()
+    TestQuietLogging()
@@ -136,6 +136,34 @@ def TestConfigValidation():
     wrongEntry["extra"] = "extra" # type: ignore
     assert WriteConfig(wrongEntry, website1) != []
 
+    # invalid engine, or http engine without direct download
+    wrongEntry = copy.deepcopy(entry1)
+    wrongEntry["engine"] = "curl" # type: ignore
+    assert WriteConfig(wrongEntry, website1) != []
+    wrongEntry["engine"] = "http"
+    wrongEntry["skipDirectDownload"] = True
+    assert WriteConfig(wrongEntry, website1) != []
+
+    # all semantic errors of the entry are reported, not only the first one
+    wrongEntry["url"] = "https://example.com/part"
+    assert len(WriteConfig(wrongEntry, website1)) == 2
+
+    # invalid page-load strategy
+    wrongEntry = copy.deepcopy(entry1)
+    wrongEntry["pageLoad"] = "fast" # type: ignore
+    assert WriteConfig(wrongEntry, website1) != []
+
+    # invalid blocked resource type
+    wrongEntry = copy.deepcopy(entry1)
+    wrongEntry["block"] = {"types": ["tracker"]} # type: ignore
+    assert WriteConfig(wrongEntry, website1) != []
+
+    # invalid politeness limits
+    for key, value in [("rateLimit", -1), ("maxConcurrency", 1.5)]:
+        wrongEntry = copy.deepcopy(entry1)
+        wrongEntry[key] = value # type: ignore
+        assert WriteConfig(wrongEntry, website1) != []
+
     # invalid url: missing {manuCode} or *
     wrongEntry = copy.deepcopy(entry1)
     wrongEntry["url"] = "invalid"
@@ -149,6 +177,8 @@ def TestConfigValidation():
         ("fields", dict),
         ("files", dict),
         ("skipDirectDownload", bool),
+        ("cacheTTL", int),
+        ("block", dict),
     ]:
         wrongValue = next(x for x in ["invalid", 3] if type(x) != correctType)
         wrongEntry = copy.deepcopy(entry1)
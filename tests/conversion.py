@@ -0,0 +1,68 @@
+"""Tests for the conversion of scraped HTML to Markdown."""
+
+import sys
+import pathlib as pl
+import html2text as h2t
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+import src.conversion as conversion
+from src.conversion import ConvertToMarkdown, CloseConversion
+from src.scraper import ScrapeFields
+from src.type_hints import ElementData
+
+
+# sample pages, small (converted inline) and large (converted in process pool)
+smallHtml = "<p>Connector <b>A</b></p>"
+largeHtml = "<ul>" + "".join(f"<li>Feature <b>{i}</b></li>" for i in range(500)) + "</ul>"
+assert len(smallHtml) < conversion.CONVERSION_MIN_SIZE < len(largeHtml)
+
+
+def TestConversion():
+    """Test Markdown conversion, in process pool and cached."""
+
+    # converts like html2text
+    for html in [smallHtml, largeHtml]:
+        assert ConvertToMarkdown(html).result() == h2t.html2text(html)
+
+    # reuses cached conversions
+    assert ConvertToMarkdown(largeHtml) is ConvertToMarkdown(largeHtml)
+    assert conversion.executor is not None
+
+    # removes least recently used conversions
+    cacheSize = conversion.CONVERSION_CACHE_SIZE
+    conversion.CONVERSION_CACHE_SIZE = 2
+    for i in range(3):
+        ConvertToMarkdown(f"<p>{i}</p>")
+    assert len(conversion.conversions) == 2
+    conversion.CONVERSION_CACHE_SIZE = cacheSize
+
+    CloseConversion()
+    assert conversion.executor is None and len(conversion.conversions) == 0
+
+    print("✅ Test Conversion passed")
+
+
+def TestScrapeFieldsMarkdown():
+    """Test scraping fields in Markdown format."""
+
+    def Element(html: str) -> ElementData:
+        return {"tagName": "div", "html": html, "text": "", "href": None, "src": None}
+
+    elements = {"h1": Element(smallHtml), "ul": Element(largeHtml), "h2": None}
+    fields = {"title": "h1", "features": "ul", "missing": "h2"}
+    assert ScrapeFields(None, fields, "md", elements) == {
+        "title": h2t.html2text(smallHtml),
+        "features": h2t.html2text(largeHtml),
+        "missing": None,
+    }
+
+    CloseConversion()
+
+    print("✅ Test Scrape Fields Markdown passed")
+
+
+if __name__ == "__main__":
+    TestConversion()
+    TestScrapeFieldsMarkdown()
@@ -0,0 +1,500 @@
+"""Tests for downloads of files: browser cookies, parallel and resumed downloads, blob store,
+revalidation, browser downloads and image extraction."""
+
+import os
+import re
+import sys
+import base64
+import json
+import time
+import tempfile
+import threading
+import http.server
+import pathlib as pl
+import typing as t
+
+from selenium.common.exceptions import WebDriverException
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+import src.blobs as blobs
+import src.cache as cache
+import src.browser as browser
+import src.files as files
+from src.files import ScrapeFiles, SeedSessions, DownloadDirect, DownloadWithBrowser, DownloadImage, CloseDownloads
+from src.watcher import DownloadWatcher
+from src.fetch import CloseSessions
+from src.type_hints import FileConfigEntry
+
+
+# delay of every file served, in seconds
+FILE_DELAY = 0.5
+
+# large file, served in ranges, and its version (ETag)
+LARGE_FILE = bytes(range(256)) * 12000
+LARGE_ETAG = '"v1"'
+
+# version of files under /versioned/, changed by tests
+version = 1
+
+
+class FileHandler(http.server.BaseHTTPRequestHandler):
+    """Serves files after a delay, recording the headers of the requests.
+    Files under /private/ require the "session" cookie.
+    Files under /large/ support ranges: the first request of /large/flaky/ files
+    is closed after half of the file, requests of /large/broken/ files always are.
+    Files under /versioned/ support conditional requests.
+    """
+    received: list[dict[str, str]] = []
+    flakyPaths: set[str] = set()
+
+    def do_GET(self) -> None:
+        FileHandler.received.append(dict(self.headers))
+        if self.path.startswith("/large/"):
+            return self.SendLarge()
+        if self.path.startswith("/versioned/"):
+            return self.SendVersioned()
+        if self.path.startswith("/private/") and "session=secret" not in self.headers.get("Cookie", ""):
+            self.send_response(403)
+            self.end_headers()
+            return
+        if self.path.startswith("/missing/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        time.sleep(FILE_DELAY)
+        body = b"%PDF-1.4 test"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def SendLarge(self) -> None:
+        """Sends the large file, or the requested range if the version matches."""
+        start = 0
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match and self.headers.get("If-Range") == LARGE_ETAG:
+            start = int(match.group(1))
+        body = LARGE_FILE[start:]
+
+        self.send_response(206 if start else 200)
+        self.send_header("ETag", LARGE_ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(LARGE_FILE) - 1}/{len(LARGE_FILE)}")
+        self.end_headers()
+
+        # closes the connection in the middle of the transfer
+        if self.path.startswith("/large/broken/") or \
+            (self.path.startswith("/large/flaky/") and self.path not in FileHandler.flakyPaths):
+            FileHandler.flakyPaths.add(self.path)
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def SendVersioned(self) -> None:
+        """Sends the current version of the file, unless not modified."""
+        etag = f'"v{version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        body = f"version {version}".encode()
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", "Wed, 01 Jan 2025 00:00:00 GMT")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: t.Any) -> None:
+        pass
+
+
+class FakeDriver:
+    """Browser returning cookies and user agent of a visited page."""
+
+    def get_cookies(self) -> list[dict]:
+        return [{"name": "session", "value": "secret", "domain": "127.0.0.1", "path": "/", "secure": False}]
+
+    def execute_script(self, script: str) -> str:
+        return "Mozilla/5.0 Test Browser"
+
+
+class FakeImageBrowser:
+    """Browser with an image in the page, fetched in chunks (or drawn on canvas, if fetch fails)."""
+
+    def __init__(self, image: bytes, type: str, fetchError: str = "") -> None:
+        self.image = image
+        self.type = type
+        self.fetchError = fetchError
+        self.images: dict[str, bytes] = {}
+        self.chunks = 0
+        self.canvas = False
+
+    def execute_async_script(self, script: str, *args) -> t.Any:
+        if script == files.IMAGE_FETCH_SCRIPT:
+            if self.fetchError:
+                return {"url": "https://example.com/image.jpg", "error": self.fetchError}
+            self.images[args[1]] = self.image
+            return {"url": "https://example.com/image", "type": self.type, "size": len(self.image)}
+        if script == files.IMAGE_CHUNK_SCRIPT:
+            self.chunks += 1
+            return base64.b64encode(self.images[args[0]][args[1]:args[2]]).decode()
+        return None # image loaded
+
+    def execute_script(self, script: str, *args) -> t.Any:
+        if script == files.IMAGE_RELEASE_SCRIPT:
+            del self.images[args[0]]
+            return None
+        self.canvas = True
+        return "data:image/png;base64," + base64.b64encode(b"\x89PNG canvas").decode()
+
+    def find_element(self, by: str, selector: str) -> "FakeImageBrowser":
+        return self
+
+    def get_attribute(self, name: str) -> str:
+        return "https://example.com/image.jpg"
+
+
+def SimulateDownload(downloadPath: str, name: str, delay: float) -> None:
+    """Simulates a browser download in the directory: part file, then renamed when completed."""
+    time.sleep(delay / 2)
+    pl.Path(downloadPath, name).touch()
+    pl.Path(downloadPath, name + ".part").write_bytes(b"%PDF-1.4 ")
+    time.sleep(delay / 2)
+    with open(pl.Path(downloadPath, name + ".part"), "ab") as file:
+        file.write(b"browser")
+    os.replace(pl.Path(downloadPath, name + ".part"), pl.Path(downloadPath, name))
+
+
+class FakeDownloadBrowser:
+    """Browser downloading files opened in a new tab, to the configured download directory."""
+
+    def __init__(self, downloadDirectories: bool, error: str = "") -> None:
+        self.downloadPath = ""
+        self.browser = self
+        self.downloadDirectories = downloadDirectories
+        self.error = error
+
+    def set_download_behavior(self, allowed: bool, destination_folder: str) -> None:
+        if not self.downloadDirectories:
+            raise WebDriverException("unknown command: browser.setDownloadBehavior")
+        if self.error:
+            raise WebDriverException(self.error)
+        self.downloadPath = destination_folder
+
+    def execute_script(self, script: str) -> None:
+        downloadPath = self.downloadPath or browser.GetDownloadPath()
+        threading.Thread(target=SimulateDownload, args=(downloadPath, "drawing.pdf", 0.2)).start()
+
+
+def StartServer() -> http.server.ThreadingHTTPServer:
+    """Starts the file server on a free local port, in a background thread."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FileHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def TestBrowserCookies(port: int, basePath: str):
+    """Test direct downloads with cookies and user agent of the browser."""
+
+    url = f"http://127.0.0.1:{port}/private/datasheet.pdf"
+    targetPath = f"{basePath}/cookies/datasheet.{{ext}}"
+
+    # without cookies, the file is forbidden
+    CloseSessions()
+    assert DownloadDirect(url, targetPath).get("result", "").startswith("error")
+
+    # with cookies of the browser, the file is downloaded
+    SeedSessions(FakeDriver(), [url]) # type: ignore
+    result = DownloadDirect(url, targetPath)
+    assert result.get("result") == "success" and result.get("method") == "direct"
+    assert pl.Path(result.get("path", "")).read_bytes() == b"%PDF-1.4 test"
+    assert FileHandler.received[-1]["User-Agent"] == "Mozilla/5.0 Test Browser"
+
+    CloseSessions()
+    print("✅ Test Browser Cookies passed")
+
+
+def TestParallelDownloads(port: int, basePath: str):
+    """Test direct downloads of the files of a component at the same time."""
+
+    files: dict[str, FileConfigEntry] = {
+        tag: {"url": f"http://127.0.0.1:{port}/files/{{manuCode}}-{tag}.pdf", "path": f"{{manuCode}}/{tag}.{{ext}}"}
+        for tag in ["datasheet", "drawing", "model", "manual"]
+    }
+    files["missing"] = {"url": f"http://127.0.0.1:{port}/missing/{{manuCode}}.pdf", "path": "{manuCode}/missing.{ext}"}
+
+    # all files are downloaded in about the time of one
+    start = time.monotonic()
+    scraped = ScrapeFiles(None, basePath, files, {"manuCode": "A", "ext": "{ext}"}, skipDirectDownload=False)
+    assert time.monotonic() - start < FILE_DELAY * 2
+
+    # results are in the configured order, with timings of direct downloads
+    assert list(scraped.keys()) == list(files.keys())
+    for tag in ["datasheet", "drawing", "model", "manual"]:
+        assert scraped[tag].get("result") == "success"
+        assert scraped[tag].get("path") == str(pl.Path(basePath) / "A" / f"{tag}.pdf")
+        assert scraped[tag].get("timings", {})["direct"] >= FILE_DELAY
+
+    # failed direct downloads have no fallback without browser
+    assert scraped["missing"].get("result", "").startswith("error")
+
+    # skipping direct download, files fail without browser
+    scraped = ScrapeFiles(None, basePath, files, {"manuCode": "B", "ext": "{ext}"}, skipDirectDownload=True)
+    assert all(file.get("result", "").startswith("error") for file in scraped.values())
+
+    # downloads of parallel components share the download threads
+    start = time.monotonic()
+    threads = [threading.Thread(target=ScrapeFiles, args=(None, basePath, files, {"manuCode": code, "ext": "{ext}"}, False))
+        for code in ["C", "D"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start < FILE_DELAY * 2
+    assert (pl.Path(basePath) / "D" / "manual.pdf").exists()
+
+    CloseDownloads()
+    print("✅ Test Parallel Downloads passed")
+
+
+def TestResumeDownloads(port: int, basePath: str):
+    """Test streaming downloads to part files, resuming interrupted transfers."""
+
+    # interrupted transfers are resumed with ranges, and the file is moved to the target path
+    FileHandler.received.clear()
+    result = DownloadDirect(f"http://127.0.0.1:{port}/large/flaky/model.step", f"{basePath}/resume/model.{{ext}}")
+    assert result.get("result") == "success" and result.get("size") == len(LARGE_FILE)
+    assert pl.Path(result.get("path", "")).read_bytes() == LARGE_FILE
+    ranges = [headers.get("Range") for headers in FileHandler.received]
+    assert len(ranges) == 2 and ranges[0] is None
+    assert 0 < int((ranges[1] or "").removeprefix("bytes=").strip("-")) <= len(LARGE_FILE) // 2
+    assert sorted(path.name for path in pl.Path(basePath, "resume").iterdir()) == ["model.step"]
+
+    # files failing every attempt keep the part file, and no file in the target path
+    url = f"http://127.0.0.1:{port}/large/broken/model.step"
+    partPath = pl.Path(basePath, "broken", "model.step.part")
+    result = DownloadDirect(url, f"{basePath}/broken/model.{{ext}}")
+    assert result.get("result", "").startswith("error")
+    assert not pl.Path(basePath, "broken", "model.step").exists()
+    assert 0 < partPath.stat().st_size < len(LARGE_FILE)
+
+    # part files left by a crash are resumed, if the file did not change
+    url = f"http://127.0.0.1:{port}/large/model.step"
+    partPath = pl.Path(basePath, "crash", "model.step.part")
+    partPath.parent.mkdir(parents=True)
+    for validator, expectedRange in [(LARGE_ETAG, "bytes=1000-"), ('"v0"', "bytes=1000-")]:
+        partPath.write_bytes(LARGE_FILE[:1000])
+        pl.Path(str(partPath) + ".json").write_text(json.dumps({"url": url, "validator": validator}))
+        FileHandler.received.clear()
+        result = DownloadDirect(url, f"{basePath}/crash/model.{{ext}}")
+
+        # changed files (different validator) are downloaded again from the beginning
+        assert result.get("result") == "success"
+        assert pl.Path(result.get("path", "")).read_bytes() == LARGE_FILE
+        assert FileHandler.received[0].get("Range") == expectedRange
+        assert FileHandler.received[0].get("If-Range") == validator
+        assert not partPath.exists() and not pl.Path(str(partPath) + ".json").exists()
+
+    print("✅ Test Resume Downloads passed")
+
+
+def TestBlobStore(port: int, basePath: str):
+    """Test storing identical files once, and skipping urls already downloaded."""
+
+    blobs.BLOB_DIR = pl.Path(basePath) / "blobs"
+    blobs.BLOB_STORE = True
+
+    # files of the same url are downloaded once, and linked to their paths
+    url = f"http://127.0.0.1:{port}/files/family-datasheet.pdf"
+    FileHandler.received.clear()
+    results = [DownloadDirect(url, f"{basePath}/blobs-test/{code}/datasheet.{{ext}}") for code in ["A", "B", "C"]]
+    assert len(FileHandler.received) == 1
+    assert all(result.get("result") == "success" and result.get("size") == 13 for result in results)
+    assert all(pl.Path(result.get("path", "")).read_bytes() == b"%PDF-1.4 test" for result in results)
+
+    # identical files of other urls are stored once
+    DownloadDirect(f"http://127.0.0.1:{port}/files/other.pdf", f"{basePath}/blobs-test/D/datasheet.{{ext}}")
+    assert len(FileHandler.received) == 2
+    assert len(list((blobs.BLOB_DIR / "objects").glob("*/*"))) == 1
+
+    # blobs are linked (or copied), sharing the same data
+    assert blobs.CloneFile(blobs.GetBlobPath(blobs.HashFile(results[0].get("path", ""))),
+        f"{basePath}/blobs-test/clone.pdf") in ["reflink", "hardlink", "copy"]
+    assert pl.Path(f"{basePath}/blobs-test/clone.pdf").read_bytes() == b"%PDF-1.4 test"
+
+    # pruning expired urls removes blobs, but not linked files
+    assert blobs.PruneBlobs(ttl=-1) == 1
+    assert all(pl.Path(result.get("path", "")).read_bytes() == b"%PDF-1.4 test" for result in results)
+
+    # urls not indexed anymore are downloaded again
+    DownloadDirect(url, f"{basePath}/blobs-test/A/datasheet.{{ext}}")
+    assert len(FileHandler.received) == 3
+
+    # urls downloaded recently are downloaded again, when refreshing
+    DownloadDirect(url, f"{basePath}/blobs-test/A/datasheet.{{ext}}", cache="refresh")
+    assert len(FileHandler.received) == 4
+
+    blobs.BLOB_STORE = False
+    print("✅ Test Blob Store passed")
+
+
+def TestRevalidation(port: int, basePath: str):
+    """Test conditional requests for files downloaded before, keeping them if not modified."""
+    global version
+
+    url = f"http://127.0.0.1:{port}/versioned/drawing.pdf"
+    targetPath = f"{basePath}/revalidation/A/drawing.{{ext}}"
+
+    # first download records validators
+    FileHandler.received.clear()
+    result = DownloadDirect(url, targetPath)
+    assert result.get("result") == "success" and result.get("cached") == False
+    assert "If-None-Match" not in FileHandler.received[-1]
+
+    # not modified: the file is kept
+    result = DownloadDirect(url, targetPath)
+    assert result.get("cached") == True and result.get("size") == len(b"version 1")
+    assert FileHandler.received[-1]["If-None-Match"] == '"v1"'
+    assert FileHandler.received[-1]["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+
+    # not modified: the file downloaded before is copied to other paths
+    result = DownloadDirect(url, f"{basePath}/revalidation/B/drawing.{{ext}}")
+    assert result.get("cached") == True
+    assert pl.Path(result.get("path", "")).read_bytes() == b"version 1"
+
+    # modified: the new version is downloaded
+    version = 2
+    result = DownloadDirect(url, targetPath)
+    assert result.get("cached") == False
+    assert pl.Path(result.get("path", "")).read_bytes() == b"version 2"
+
+    # files changed on disk are downloaded again, without conditions
+    pl.Path(result.get("path", "")).write_bytes(b"edited")
+    pl.Path(f"{basePath}/revalidation/B/drawing.pdf").unlink()
+    result = DownloadDirect(url, targetPath)
+    assert result.get("cached") == False and "If-None-Match" not in FileHandler.received[-1]
+    assert pl.Path(result.get("path", "")).read_bytes() == b"version 2"
+
+    # with the blob store, stored files are revalidated too, and linked if not modified
+    blobs.BLOB_STORE = True
+    version = 3
+    result = DownloadDirect(url, f"{basePath}/revalidation/C/drawing.{{ext}}")
+    assert result.get("cached") == False and FileHandler.received[-1]["If-None-Match"] == '"v2"'
+    assert pl.Path(result.get("path", "")).read_bytes() == b"version 3"
+    pl.Path(result.get("path", "")).unlink()
+    result = DownloadDirect(url, f"{basePath}/revalidation/C/drawing.{{ext}}")
+    assert result.get("cached") == True and FileHandler.received[-1]["If-None-Match"] == '"v3"'
+    assert pl.Path(result.get("path", "")).read_bytes() == b"version 3"
+    blobs.BLOB_STORE = False
+
+    print("✅ Test Revalidation passed")
+
+
+def TestDownloadWatcher(basePath: str):
+    """Test detection of completed browser downloads, with inotify and polling."""
+
+    for poll in [False, True]:
+        downloadPath = tempfile.mkdtemp(dir=basePath)
+        with DownloadWatcher(downloadPath, poll=poll) as watcher:
+            assert watcher.poll == poll
+
+            # detects the file as soon as the part file is renamed
+            threading.Thread(target=SimulateDownload, args=(downloadPath, "datasheet.pdf", 0.4)).start()
+            start = time.monotonic()
+            assert watcher.Wait(2) == os.path.join(downloadPath, "datasheet.pdf")
+            assert 0.4 <= time.monotonic() - start < 0.55
+            assert pl.Path(downloadPath, "datasheet.pdf").read_bytes() == b"%PDF-1.4 browser"
+
+        # raises on timeout, if no file is completed
+        downloadPath = tempfile.mkdtemp(dir=basePath)
+        pl.Path(downloadPath, "datasheet.pdf.part").write_bytes(b"%PDF")
+        with DownloadWatcher(downloadPath, poll=poll) as watcher:
+            try:
+                watcher.Wait(0.2)
+                assert False, "TimeoutError not raised"
+            except TimeoutError:
+                pass
+
+    print("✅ Test Download Watcher passed")
+
+
+def TestBrowserDownload(basePath: str):
+    """Test browser downloads, in a directory for every download, or in the slot directory."""
+
+    slotPath = tempfile.mkdtemp(dir=basePath)
+    browser.downloadPaths[browser.GetBrowserSlot()] = slotPath
+
+    # directory for every download: removed after the download
+    browser.downloadDirectories = None
+    driver = FakeDownloadBrowser(downloadDirectories=True)
+    result = DownloadWithBrowser(driver, "https://example.com/drawing.pdf", f"{basePath}/browser/A/drawing.{{ext}}") # type: ignore
+    assert result.get("result") == "success" and result.get("method") == "browser"
+    assert pl.Path(result.get("path", "")).read_bytes() == b"%PDF-1.4 browser"
+    assert driver.downloadPath.startswith(slotPath) and os.listdir(slotPath) == []
+
+    # transient error: raised, without disabling download directories
+    driver = FakeDownloadBrowser(downloadDirectories=True, error="WebSocket connection closed")
+    try:
+        DownloadWithBrowser(driver, "https://example.com/drawing.pdf", f"{basePath}/browser/C/drawing.{{ext}}") # type: ignore
+        assert False, "Expected WebDriverException"
+    except WebDriverException:
+        pass
+    assert browser.downloadDirectories == True and os.listdir(slotPath) == []
+
+    # browser not supporting download directories: files left by previous downloads are removed
+    browser.downloadDirectories = None
+    pl.Path(slotPath, "abandoned.pdf.part").write_bytes(b"%PDF")
+    pl.Path(slotPath, "abandoned.pdf").touch()
+    driver = FakeDownloadBrowser(downloadDirectories=False)
+    result = DownloadWithBrowser(driver, "https://example.com/drawing.pdf", f"{basePath}/browser/B/drawing.{{ext}}") # type: ignore
+    assert result.get("result") == "success" and browser.downloadDirectories == False
+    assert pl.Path(result.get("path", "")).read_bytes() == b"%PDF-1.4 browser"
+    assert os.listdir(slotPath) == []
+
+    print("✅ Test Browser Download passed")
+
+
+def TestImageExtraction(basePath: str):
+    """Test image extraction: original bytes fetched in chunks, or drawn on canvas if fetch fails."""
+
+    # fetched image: original bytes and extension, transferred in chunks, released from the page
+    files.IMAGE_CHUNK_SIZE = 1000
+    image = os.urandom(2500)
+    driver = FakeImageBrowser(image, "image/jpeg")
+    result = DownloadImage(driver, "img#product", f"{basePath}/images/A/image.{{ext}}") # type: ignore
+    assert result.get("result") == "success" and result.get("method") == "image" and result.get("size") == 2500
+    assert result.get("path", "").endswith("image.jpg") and pl.Path(result.get("path", "")).read_bytes() == image
+    assert driver.chunks == 3 and driver.images == {} and not driver.canvas
+    assert not pl.Path(result.get("path", "") + ".part").exists()
+
+    # fetch failed (e.g. cross-origin image): drawn on canvas, as PNG
+    driver = FakeImageBrowser(image, "image/jpeg", fetchError="TypeError: NetworkError")
+    result = DownloadImage(driver, "img#product", f"{basePath}/images/B/image.{{ext}}") # type: ignore
+    assert result.get("result") == "success" and driver.canvas and result.get("url") == "https://example.com/image.jpg"
+    assert result.get("path", "").endswith("image.png") and pl.Path(result.get("path", "")).read_bytes() == b"\x89PNG canvas"
+    files.IMAGE_CHUNK_SIZE = 2**20
+
+    print("✅ Test Image Extraction passed")
+
+
+if __name__ == "__main__":
+
+    server = StartServer()
+    with tempfile.TemporaryDirectory() as basePath:
+        cache.CACHE_FILE = pl.Path(basePath) / "cache-test.sqlite"
+        TestBrowserCookies(server.server_port, basePath)
+        TestParallelDownloads(server.server_port, basePath)
+        TestResumeDownloads(server.server_port, basePath)
+        TestBlobStore(server.server_port, basePath)
+        TestRevalidation(server.server_port, basePath)
+        TestDownloadWatcher(basePath)
+        TestBrowserDownload(basePath)
+        TestImageExtraction(basePath)
+    server.shutdown()
@@ -0,0 +1,81 @@
+"""Tests for the extraction of elements data from HTML source."""
+
+import sys
+import pathlib as pl
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+from src.extraction import ParseHtml, ParseElements
+
+
+# sample page, for testing
+PAGE_URL = "https://www.example.com/en/product-1234.html"
+PAGE_HTML = """
+<html>
+<head><title>Product 1234</title><style>h1 { color: red; }</style></head>
+<body>
+  <h1> Connector   <b>1234</b> </h1>
+  <div class="details">
+    <p>Ways: 2</p>
+    <ul><li>Black</li><li>Sealed</li></ul>
+    <script>var tracking = true;</script>
+  </div>
+  <a class="datasheet" href="/docs/1234.pdf">Datasheet</a>
+  <a class="drawing" href="https://cdn.example.com/1234.pdf"></a>
+  <img class="image" src="img/1234.jpg">
+  <a class="empty" href="">Empty</a>
+</body>
+</html>
+"""
+
+
+def TestParseElements():
+    """Test the extraction of elements data from HTML source."""
+
+    document = ParseHtml(PAGE_HTML)
+    elements = ParseElements(document,
+        ["h1", ".details", ".datasheet", ".drawing", ".image", ".empty", ".missing"], PAGE_URL)
+
+    # text with collapsed whitespace, and block elements on their own lines
+    assert elements["h1"] is not None
+    assert elements["h1"]["tagName"] == "h1"
+    assert elements["h1"]["text"] == "Connector 1234"
+    assert elements["h1"]["html"] == " Connector   <b>1234</b> "
+    assert elements[".details"] is not None
+    assert elements[".details"]["text"] == "Ways: 2\nBlack\nSealed"
+
+    # urls resolved against page url
+    assert elements[".datasheet"] is not None
+    assert elements[".datasheet"]["href"] == "https://www.example.com/docs/1234.pdf"
+    assert elements[".datasheet"]["src"] is None
+    assert elements[".drawing"] is not None
+    assert elements[".drawing"]["href"] == "https://cdn.example.com/1234.pdf"
+    assert elements[".drawing"]["text"] == ""
+    assert elements[".image"] is not None
+    assert elements[".image"]["tagName"] == "img"
+    assert elements[".image"]["src"] == "https://www.example.com/en/img/1234.jpg"
+    assert elements[".empty"] is not None
+    assert elements[".empty"]["href"] == PAGE_URL
+
+    # missing element
+    assert elements[".missing"] is None
+
+    print("✅ Test Parse Elements passed")
+
+
+def TestParseBaseUrl():
+    """Test the resolution of urls with a base url declared in the page."""
+
+    document = ParseHtml('<head><base href="https://files.example.com/"></head>'
+        '<body><a href="1234.pdf">Datasheet</a></body>')
+    elements = ParseElements(document, ["a"], PAGE_URL)
+    assert elements["a"] is not None
+    assert elements["a"]["href"] == "https://files.example.com/1234.pdf"
+
+    print("✅ Test Parse Base Url passed")
+
+
+if __name__ == "__main__":
+    TestParseElements()
+    TestParseBaseUrl()
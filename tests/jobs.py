@@ -0,0 +1,88 @@
+"""Tests for checkpointed batch jobs."""
+
+import sys
+import tempfile
+import pathlib as pl
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+import src.jobs as jobs
+import src.config as config
+import src.scraper as scraper
+from src.jobs import StartJob, GetJournalPath
+from src.scraper import ScrapeComponents, IterScrapeComponents
+from src.type_hints import ScrapedComponentData
+
+# patches journals directory and config file path to temporary ones
+jobs.JOBS_DIR = pl.Path(tempfile.mkdtemp())
+config.CONFIG_FILE = pl.Path(tempfile.mkdtemp()) / "config.json"
+
+# patches scraping with a fake, failing for codes starting with "X", and counting scrapes
+scrapes: list[str] = []
+
+def FakeScrape(manuCode: str, *args) -> ScrapedComponentData:
+    scrapes.append(manuCode)
+    if manuCode.startswith("X"):
+        return {"manuCode": manuCode, "result": "error: browser crashed"}
+    return {"manuCode": manuCode, "fields": {"description": f"Component {manuCode}"},
+        "files": {"drawing": {"result": "success", "path": f"files/{manuCode}.pdf"}}}
+
+scraper.ScrapeComponentWithTimings = FakeScrape
+
+
+def TestResume():
+    """Test resuming a job interrupted midway, skipping completed components."""
+
+    # interrupts the job after 2 components
+    manuCodes = ["A", "B", "X1", "C", "D"]
+    iterator = IterScrapeComponents(manuCodes, ["molex.com"], closeBrowser=False, workers=1, jobId="test-job")
+    assert [next(iterator).get("manuCode") for _ in range(2)] == ["A", "B"]
+    iterator.close() # type: ignore  # generator
+
+    # simulates a crash while writing the next result
+    with open(GetJournalPath("test-job"), "a") as file:
+        file.write('{"manuCode": "X1", "resu')
+
+    # resumes the job: skips completed components, returning their recorded results
+    scrapes.clear()
+    results = ScrapeComponents(manuCodes, ["molex.com"], closeBrowser=False, jobId="test-job")
+    assert scrapes == ["X1", "C", "D"]
+    assert [result.get("manuCode") for result in results] == manuCodes
+    assert results[0].get("files", {})["drawing"].get("path") == "files/A.pdf"
+
+    # resumes again: failed components are scraped again
+    scrapes.clear()
+    results = ScrapeComponents(manuCodes, ["molex.com"], closeBrowser=False, workers=2, jobId="test-job")
+    assert scrapes == ["X1"]
+    assert results[2].get("result") == "error: browser crashed"
+
+    print("✅ Test Resume passed")
+
+
+def TestJobErrors():
+    """Test invalid job ids, and jobs resumed with different parameters."""
+
+    # job id must be a valid file name
+    for jobId in ["../escape", "a/b", ".hidden", ""]:
+        try:
+            StartJob(jobId, {})
+            assert False, f"Invalid job id accepted: {jobId}"
+        except ValueError:
+            pass
+
+    # same job, different parameters
+    StartJob("params-job", {"hints": ["molex.com"]})
+    assert StartJob("params-job", {"hints": ["molex.com"]}) == {}
+    try:
+        StartJob("params-job", {"hints": ["te.com"]})
+        assert False, "Job resumed with different parameters"
+    except ValueError:
+        pass
+
+    print("✅ Test Job Errors passed")
+
+
+if __name__ == "__main__":
+    TestResume()
+    TestJobErrors()
@@ -0,0 +1,88 @@
+"""Tests for politeness limits of websites, and interleaving of components."""
+
+import sys
+import time
+import threading
+import pathlib as pl
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+from src.politeness import GetLimiter, VisitWebsite, WaitForRequest, PickNextComponent
+from src.type_hints import WebsiteEntry
+
+
+def TestRateLimit():
+    """Test request rate of a website, for pages and downloads."""
+
+    entry: WebsiteEntry = {"rateLimit": 10}
+    GetLimiter("rate.test").Configure(entry)
+
+    # 1 second of requests is allowed at once, then 10 requests per second
+    start = time.monotonic()
+    for _ in range(15):
+        WaitForRequest("https://files.rate.test/datasheet.pdf")
+    assert 0.4 <= time.monotonic() - start < 0.8
+
+    # urls of other websites are not limited
+    start = time.monotonic()
+    for _ in range(50):
+        WaitForRequest("https://cdn.example.com/datasheet.pdf")
+    assert time.monotonic() - start < 0.1
+
+    print("✅ Test Rate Limit passed")
+
+
+def TestConcurrency():
+    """Test max concurrent visits of a website."""
+
+    entry: WebsiteEntry = {"maxConcurrency": 2}
+    active, maxActive = 0, 0
+    lock = threading.Lock()
+
+    def Visit() -> None:
+        nonlocal active, maxActive
+        with VisitWebsite("concurrency.test", entry):
+            with lock:
+                active += 1
+                maxActive = max(maxActive, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+
+    threads = [threading.Thread(target=Visit) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert maxActive == 2
+    assert GetLimiter("concurrency.test").active == 0
+
+    print("✅ Test Concurrency passed")
+
+
+def TestInterleaving():
+    """Test picking components of websites with free capacity."""
+
+    GetLimiter("busy.test").Configure({"maxConcurrency": 2})
+    GetLimiter("free.test").Configure({"maxConcurrency": 2})
+
+    # first component, while the website has capacity
+    queued = ["busy.test", "busy.test", "free.test", ""]
+    assert PickNextComponent(queued, {"busy.test": 1}) == 0
+
+    # skips components of busy websites
+    assert PickNextComponent(queued, {"busy.test": 2}) == 2
+    assert PickNextComponent(queued, {"busy.test": 2, "free.test": 2}) == 3
+
+    # all websites busy: the least busy one
+    queued = ["busy.test", "free.test"]
+    assert PickNextComponent(queued, {"busy.test": 3, "free.test": 2}) == 1
+
+    print("✅ Test Interleaving passed")
+
+
+if __name__ == "__main__":
+    TestRateLimit()
+    TestConcurrency()
+    TestInterleaving()
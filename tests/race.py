@@ -0,0 +1,91 @@
+"""Tests for racing candidate websites of a component."""
+
+import sys
+import time
+import threading
+import pathlib as pl
+import typing as t
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+import src.scraper as scraper
+from src.browser import GetCancelEvent, CheckCancelled
+from src.scraper import RaceCandidates, ComponentNotFoundError
+from src.website import CandidateWebsite
+from src.type_hints import ScrapedComponentData, WebsiteEntry
+
+
+# behaviour of every candidate website: seconds before completing, and error raised (if any)
+# candidates with negative delay wait until they are cancelled
+behaviours: dict[str, tuple[float, t.Optional[Exception]]] = {}
+cancelled: list[str] = []
+cancelledLock = threading.Lock()
+
+def FakeScrape(manuCode: str, entry: WebsiteEntry, *args, **kwargs) -> ScrapedComponentData:
+    domain = entry.get("url", "")
+    delay, error = behaviours[domain]
+
+    # waits for cancellation, recording it
+    if delay < 0:
+        event = GetCancelEvent()
+        assert event is not None and event.wait(5)
+        with cancelledLock:
+            cancelled.append(domain)
+        CheckCancelled()
+
+    time.sleep(max(delay, 0))
+    if error is not None:
+        raise error
+    return {"manuCode": manuCode, "result": "success", "url": domain}
+
+scraper.ScrapeFromWebsite = FakeScrape
+
+
+def Race(domains: list[str], attempts: dict[str, str]) -> t.Optional[ScrapedComponentData]:
+    """Races the candidate websites, in priority order."""
+    candidates = [(CandidateWebsite(domain, 1, []), domain, WebsiteEntry(url=domain)) for domain in domains]
+    return RaceCandidates("A", candidates, None, "", "txt", False, "bypass", attempts)
+
+
+def TestRaceWinner():
+    """Test that the highest-priority success wins, cancelling lower-priority attempts."""
+    cancelled.clear()
+
+    # a lower-priority candidate completes first, but the first one wins
+    behaviours.update({"a.com": (0.3, None), "b.com": (0.05, None), "c.com": (-1, None)})
+    attempts: dict[str, str] = {}
+    result = Race(["a.com", "b.com", "c.com"], attempts)
+    assert result is not None and result.get("url") == "a.com"
+    assert cancelled == ["c.com"] and attempts == {}
+
+    # the first candidate fails: the next successful one wins, with the error of the first
+    behaviours.update({"a.com": (0.05, RuntimeError("page error")), "b.com": (0.2, None)})
+    result = Race(["a.com", "b.com"], attempts)
+    assert result is not None and result.get("url") == "b.com"
+    assert attempts == {"a.com": "RuntimeError: page error"}
+
+    print("✅ Test Race Winner passed")
+
+
+def TestRaceErrors():
+    """Test that errors of all candidates are saved when every candidate fails."""
+    behaviours.update({
+        "a.com": (0.1, RuntimeError("page error")),
+        "b.com": (0, ComponentNotFoundError("Detected component-not-found page")),
+        "c.com": (0.05, TimeoutError("Page not loaded")),
+    })
+    attempts: dict[str, str] = {}
+    assert Race(["a.com", "b.com", "c.com"], attempts) is None
+    assert attempts == {
+        "a.com": "RuntimeError: page error",
+        "b.com": "ComponentNotFoundError: Detected component-not-found page",
+        "c.com": "TimeoutError: Page not loaded",
+    }
+
+    print("✅ Test Race Errors passed")
+
+
+if __name__ == "__main__":
+    TestRaceWinner()
+    TestRaceErrors()
@@ -2,6 +2,7 @@
 
 import sys
 import json
+import urllib.parse
 import typing as t
 import pathlib as pl
 
@@ -12,6 +13,8 @@ sys.path.append(str(pl.Path(__file__).parent.parent))
 from server import ReadDocs, ReadNewWebsiteGuide
 from src.config import ReadConfig, WriteConfig
 from src.scraper import ScrapeComponents, ScrapeComponent, GetCandidatesFromHints
+from src.browser import GetBrowser, NavigateTo, WaitElements, CloseBrowser
+from src.extraction import ExtractElements, ExtractElementWithDriver
 
 
 def TestReadDocs():
@@ -89,6 +92,33 @@ def TestNotFound():
     PretryPrintDict(result)
 
 
+def TestHiddenElements():
+    """Test that text extracted with a script matches selenium text, for elements hidden by css."""
+
+    # page with visible and hidden elements
+    page = """<html><body>
+        <p id="visible">Visible <span style="display: none">hidden</span>text</p>
+        <p id="none" style="display: none">Display none</p>
+        <p id="invisible" style="visibility: hidden">Visibility hidden</p>
+        <p id="transparent" style="opacity: 0">Opacity 0</p>
+        <div style="display: none"><p id="parent">Parent hidden</p></div>
+        <p id="end">End</p>
+    </body></html>"""
+    selectors = ["#visible", "#none", "#invisible", "#transparent", "#parent"]
+
+    driver = GetBrowser()
+    NavigateTo(driver, "data:text/html," + urllib.parse.quote(page))
+    WaitElements(driver, ["#end"], "normal")
+    elements = ExtractElements(driver, selectors)
+    for selector in selectors:
+        expected = ExtractElementWithDriver(driver, selector)
+        assert (elements[selector] or {}).get("text") == (expected or {}).get("text"), selector
+    assert (elements["#none"] or {}).get("text") == ""
+    CloseBrowser()
+
+    print("✅ Test Hidden Elements passed")
+
+
 if __name__ == "__main__":
 
     #TestReadDocs()
@@ -98,3 +128,4 @@ if __name__ == "__main__":
     #TestScraper()
     TestScrapeFiles()
     #TestNotFound()
+    TestHiddenElements()
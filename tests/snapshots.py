@@ -0,0 +1,108 @@
+"""Tests for the snapshots of rendered pages, and offline re-extraction."""
+
+import sys
+import shutil
+import pathlib as pl
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+import src.snapshots as snapshots
+from src.snapshots import SaveSnapshot, LoadSnapshot, ListSnapshots
+from src.scraper import ReExtractSnapshot
+from src.type_hints import WebsiteEntry
+
+# patches the snapshots directory to a test directory
+SNAPSHOT_DIR = snapshots.SNAPSHOT_DIR = pl.Path(__file__).parent.parent / "snapshots-test"
+
+
+# sample page, for testing
+html = """<html><body>
+    <h1>Connector <b>A</b></h1>
+    <a class="drawing" href="/files/A.pdf">Drawing</a>
+</body></html>"""
+entry: WebsiteEntry = {
+    "url": "https://www.molex.com/part/{manuCode}",
+    "wait": "h1",
+    "fields": {
+        "description": "h1",
+        "missing": "h2",
+    },
+    "files": {
+        "drawing": {
+            "selector": "a.drawing",
+            "path": "molex.com\\{manuCode}_drawing.pdf"
+        },
+        "photo": {
+            "selector": "img.photo",
+            "path": "molex.com\\{manuCode}_photo.{ext}"
+        },
+    },
+}
+
+
+def TestSnapshotStore():
+    """Test saving, loading and listing snapshots."""
+
+    # deletes old test snapshots
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+
+    # saves and loads back
+    hash = SaveSnapshot("molex.com", "A", "https://www.molex.com/part/A", html)
+    assert LoadSnapshot(hash) == html.encode("utf-8")
+
+    # identical pages are stored once
+    assert SaveSnapshot("molex.com", "B", "https://www.molex.com/part/B", html) == hash
+    assert len(list(SNAPSHOT_DIR.glob("objects/*/*.html.gz"))) == 1
+
+    # newer snapshot replaces the older one
+    newHash = SaveSnapshot("molex.com", "A", "https://www.molex.com/part/A", html + " ")
+    assert newHash != hash
+    assert [s.hash for s in ListSnapshots("molex.com", ["A"])] == [newHash]
+
+    # filters by domain and manuCodes
+    SaveSnapshot("te.com", "A", "https://www.te.com/part/A", html)
+    assert len(ListSnapshots()) == 3
+    assert [s.domain for s in ListSnapshots(manuCodes=["A"])] == ["molex.com", "te.com"]
+    assert [s.manuCode for s in ListSnapshots("molex.com")] == ["A", "B"]
+    assert ListSnapshots(manuCodes=[]) == []
+
+    # many manuCodes are queried in chunks, beyond the SQLite limit of variables in a query
+    manyCodes = [f"X{i}" for i in range(40000)] + ["B", "A", "A"]
+    assert [(s.domain, s.manuCode) for s in ListSnapshots(manuCodes=manyCodes)] == \
+        [("molex.com", "A"), ("molex.com", "B"), ("te.com", "A")]
+
+    print("✅ Test Snapshot Store passed")
+
+
+def TestReExtraction():
+    """Test re-extraction of fields and file urls from snapshots."""
+
+    snapshot = ListSnapshots("molex.com", ["B"])[0]
+
+    # extracts fields and file urls, without downloading files
+    result = ReExtractSnapshot(snapshot, entry, None, "txt")
+    files = result.get("files", {})
+    assert result.get("result") == "success"
+    assert result.get("fields") == {"description": "Connector A", "missing": None}
+    assert files["drawing"].get("url") == "https://www.molex.com/files/A.pdf"
+    assert files["drawing"].get("result", "").startswith("skipped")
+    assert files["photo"].get("result", "").startswith("error")
+
+    # filters files
+    result = ReExtractSnapshot(snapshot, entry, ["drawing"], "html")
+    assert list(result.get("files", {}).keys()) == ["drawing"]
+    assert result.get("fields", {}).get("description") == "Connector <b>A</b>"
+
+    # website not configured
+    assert ReExtractSnapshot(snapshot, None, None, "txt").get("result", "").startswith("error")
+
+    # removes test snapshots
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+
+    print("✅ Test Re-extraction passed")
+
+
+if __name__ == "__main__":
+    TestSnapshotStore()
+    TestReExtraction()
@@ -0,0 +1,93 @@
+"""Tests for the timings of scraping phases."""
+
+import sys
+import time
+import pathlib as pl
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+import src.scraper as scraper
+from src.timings import MeasurePhase, RemoveTimings, SummarizeTimings, Percentile
+from src.type_hints import ScrapedComponentData
+
+
+def TestMeasurePhase():
+    """Test measuring phases, also repeated and failed."""
+
+    timings: dict[str, float] = {}
+    with MeasurePhase(timings, "wait"):
+        time.sleep(0.05)
+    with MeasurePhase(timings, "wait"):
+        time.sleep(0.05)
+    assert 0.1 <= timings["wait"] < 0.2
+
+    # measures failed phases too
+    try:
+        with MeasurePhase(timings, "navigation"):
+            raise RuntimeError("failed")
+    except RuntimeError:
+        pass
+    assert "navigation" in timings
+
+    print("✅ Test Measure Phase passed")
+
+
+def TestSummary():
+    """Test removal of timings from results, and summary of timings."""
+
+    # sample results, with timings
+    results: list[ScrapedComponentData] = [{
+        "manuCode": f"A{i}",
+        "result": "success",
+        "url": f"https://www.molex.com/part/A{i}",
+        "files": {"drawing": {"result": "success", "timings": {"total": 1.0}}},
+        "timings": {"wait": float(i), "total": float(i + 1)},
+    } for i in range(1, 21)]
+    results.append({"manuCode": "B", "result": "error: not found", "timings": {"total": 5.0}})
+
+    # removes timings, also in files
+    result = RemoveTimings(results[0])
+    assert "timings" not in result and "timings" not in result.get("files", {})["drawing"]
+    assert "timings" in results[0]
+
+    # percentiles, with nearest-rank method
+    assert Percentile([3.0, 1.0, 2.0], 50) == 2.0
+    assert Percentile([1.0], 95) == 1.0
+
+    # summary for every domain and phase
+    summary = SummarizeTimings(results)
+    assert list(summary.keys()) == ["", "molex.com"]
+    assert summary["molex.com"]["wait"] == {"count": 20, "p50": 10.0, "p95": 19.0, "max": 20.0}
+    assert summary[""]["total"]["count"] == 1
+
+    print("✅ Test Summary passed")
+
+
+def TestReport():
+    """Test the summary of timings returned by ScrapeComponents, only with timings."""
+
+    # scrapes with a fake scraper, yielding results in reverse order
+    def IterScrapeResults(manuCodes: list[str], *args, **kwargs):
+        for index in reversed(range(len(manuCodes))):
+            yield index, {"manuCode": manuCodes[index], "url": "https://www.molex.com/part", "timings": {"total": 1.0}}
+    iterScrapeResults = scraper.IterScrapeResults
+    scraper.IterScrapeResults = IterScrapeResults # type: ignore
+
+    # results in input order, with summary of timings
+    report = scraper.ScrapeComponents(["A", "B"], timings=True)
+    assert [result.get("manuCode") for result in report["components"]] == ["A", "B"]
+    assert report["timings"]["molex.com"]["total"] == {"count": 2, "p50": 1.0, "p95": 1.0, "max": 1.0}
+
+    # only results, without timings
+    results = scraper.ScrapeComponents(["A", "B"])
+    assert isinstance(results, list) and len(results) == 2
+
+    scraper.IterScrapeResults = iterScrapeResults
+    print("✅ Test Report passed")
+
+
+if __name__ == "__main__":
+    TestMeasurePhase()
+    TestSummary()
+    TestReport()
@@ -0,0 +1,110 @@
+"""Tests for tracing of scraping operations, and the trace analyzer."""
+
+import sys
+import time
+import tempfile
+import threading
+import pathlib as pl
+
+# adds the parent directory to the path
+# this allows to run tests with the IDE play button
+sys.path.append(str(pl.Path(__file__).parent.parent))
+import src.tracing as tracing
+from src.tracing import Traced, TraceSpan, SetSpanAttributes, GetCurrentSpan, SetCurrentSpan
+from src.tracing import CloseTracing, ReadSpans, FoldStacks, SummarizeSpans
+
+
+@Traced("manuCode")
+def Scrape(manuCode: str, domain: str) -> dict:
+    SetSpanAttributes(domain=domain)
+    time.sleep(0.02)
+    return {"manuCode": manuCode, "files": Download("https://example.com/file.pdf")}
+
+
+@Traced("url")
+def Download(url: str) -> dict:
+    time.sleep(0.01)
+    return {"result": "error: download failed"}
+
+
+def TestSpans():
+    """Test spans: parents, inherited attributes, outcomes, and other threads."""
+
+    # writes spans to a temporary file
+    tracing.TRACING = True
+    tracing.TRACE_FILE = pl.Path(tempfile.mkdtemp()) / "trace.jsonl"
+    CloseTracing()
+
+    Scrape("ABC", "example.com")
+
+    # errors are recorded in the outcome, and raised again
+    try:
+        with TraceSpan("failing", manuCode="XYZ"):
+            raise ValueError("failed")
+    except ValueError:
+        pass
+
+    # continues the trace in another thread
+    with TraceSpan("parent", manuCode="DEF") as parent:
+        def Worker() -> None:
+            SetCurrentSpan(parent)
+            with TraceSpan("child"):
+                pass
+        thread = threading.Thread(target=Worker)
+        thread.start()
+        thread.join()
+    assert GetCurrentSpan() is None
+
+    CloseTracing()
+    spans = {span["name"]: span for span in ReadSpans([tracing.TRACE_FILE])}
+    assert len(spans) == 5
+
+    # child of Scrape: same trace, inherited attributes, outcome from result
+    scrape, download = spans["Scrape"], spans["Download"]
+    assert download["parent"] == scrape["id"] and download["trace"] == scrape["trace"]
+    assert scrape["parent"] is None and scrape["outcome"] == "ok"
+    assert download["attributes"] == {"url": "https://example.com/file.pdf", "manuCode": "ABC", "domain": "example.com"}
+    assert download["outcome"] == "error"
+    assert spans["failing"]["outcome"] == "error" and spans["failing"]["attributes"]["error"] == "ValueError"
+    assert spans["child"]["parent"] == spans["parent"]["id"]
+    assert spans["child"]["attributes"]["manuCode"] == "DEF"
+
+    tracing.TRACING = False
+    print("✅ Test Spans passed")
+
+
+def TestAnalyzer():
+    """Test folded stacks (self time) and summary of spans."""
+
+    spans = [
+        {"trace": "a", "id": "1", "parent": None, "name": "ScrapeComponent", "duration": 5.0,
+            "outcome": "ok", "attributes": {"manuCode": "ABC"}},
+        {"trace": "a", "id": "2", "parent": "1", "name": "ScrapeFromWebsite", "duration": 4.0,
+            "outcome": "ok", "attributes": {"domain": "molex.com"}},
+        {"trace": "a", "id": "3", "parent": "2", "name": "WaitElements", "duration": 3.0,
+            "outcome": "ok", "attributes": {"domain": "molex.com"}},
+        {"trace": "b", "id": "4", "parent": "missing", "name": "WaitElements", "duration": 1.0,
+            "outcome": "error", "attributes": {"domain": "molex.com"}},
+    ]
+
+    # self time of every stack, also for spans with missing parents (e.g. rotated files)
+    stacks = FoldStacks(spans)
+    assert stacks == {
+        "ScrapeComponent": 1.0,
+        "ScrapeComponent;ScrapeFromWebsite": 1.0,
+        "ScrapeComponent;ScrapeFromWebsite;WaitElements": 3.0,
+        "WaitElements": 1.0,
+    }
+
+    # summary for each domain and operation
+    summary = SummarizeSpans(spans)
+    assert summary[""]["ScrapeComponent"]["count"] == 1
+    wait = summary["molex.com"]["WaitElements"]
+    assert wait["count"] == 2 and wait["errors"] == 1 and wait["total"] == 4.0 and wait["max"] == 3.0
+
+    print("✅ Test Analyzer passed")
+
+
+if __name__ == "__main__":
+    TestSpans()
+    TestAnalyzer()